@@ -0,0 +1,142 @@
+import numpy as np
+
+# Métodos de alineación aceptados por align_vertices
+ALIGNMENT_METHODS = (None, "anchor", "procrustes", "gpa")
+
+# Convergencia de GPA: cambio RMS de la forma media entre iteraciones (m)
+GPA_TOLERANCE = 1e-7
+GPA_MAX_ITERATIONS = 50
+
+
+def align_to_anchor(vertices, anchor, batch_size=4096):
+    """
+    Translates every model so its anchor vertex sits at the origin, like set_origin.py
+    does in Blender (origin at the vertex, object moved to (0, 0, 0)).
+
+    :param vertices: Array of shape (N_models, N_vertices, 3) (may be memory-mapped).
+    :param anchor: Index of the anchor vertex (e.g. 128 knee, 268 elbow).
+    :param batch_size: Number of models translated per step.
+    :return: float32 array of shape (N_models, N_vertices, 3).
+    """
+    aligned = np.empty(vertices.shape, dtype=np.float32)
+    for start in range(0, len(vertices), batch_size):
+        batch = np.asarray(vertices[start:start + batch_size], dtype=np.float32)
+        aligned[start:start + batch_size] = batch - batch[:, anchor:anchor + 1]
+    return aligned
+
+
+def kabsch(source, target):
+    """
+    Optimal rotations and translations taking every source model onto the target (batched Kabsch).
+
+    :param source: Array of shape (N_models, N_vertices, 3).
+    :param target: Array of shape (N_vertices, 3).
+    :return: Tuple (rotations (N_models, 3, 3), translations (N_models, 3)) such that
+             source @ R.T + t approximates the target.
+    """
+    source = np.asarray(source, dtype=np.float64)
+    target = np.asarray(target, dtype=np.float64)
+    source_centroid = source.mean(axis=1)
+    target_centroid = target.mean(axis=0)
+
+    covariance = np.einsum("nvi,vj->nij", source - source_centroid[:, None], target - target_centroid)
+    u, _, vt = np.linalg.svd(covariance)
+    # Corregir reflexiones para obtener rotaciones propias
+    d = np.sign(np.linalg.det(np.matmul(vt.transpose(0, 2, 1), u.transpose(0, 2, 1))))
+    correction = np.tile(np.eye(3), (len(source), 1, 1))
+    correction[:, 2, 2] = d
+    rotations = vt.transpose(0, 2, 1) @ correction @ u.transpose(0, 2, 1)
+    translations = target_centroid - np.einsum("nij,nj->ni", rotations, source_centroid)
+    return rotations, translations
+
+
+def procrustes_align(vertices, reference=None, batch_size=4096):
+    """
+    Rigidly aligns every model to a reference shape (rotation and translation, no scaling),
+    one batched SVD per batch of models.
+
+    :param vertices: Array of shape (N_models, N_vertices, 3) (may be memory-mapped).
+    :param reference: Array of shape (N_vertices, 3). Defaults to the mean of the
+                      centroid-centered models.
+    :param batch_size: Number of models aligned per step.
+    :return: Tuple (aligned float32 array of shape (N_models, N_vertices, 3), rotations, translations).
+    """
+    n_models = len(vertices)
+    if reference is None:
+        reference = np.zeros(vertices.shape[1:], dtype=np.float64)
+        for start in range(0, n_models, batch_size):
+            batch = np.asarray(vertices[start:start + batch_size], dtype=np.float64)
+            reference += (batch - batch.mean(axis=1, keepdims=True)).sum(axis=0)
+        reference /= n_models
+
+    aligned = np.empty(vertices.shape, dtype=np.float32)
+    rotations = np.empty((n_models, 3, 3))
+    translations = np.empty((n_models, 3))
+    for start in range(0, n_models, batch_size):
+        batch = np.asarray(vertices[start:start + batch_size], dtype=np.float64)
+        rotation, translation = kabsch(batch, reference)
+        aligned[start:start + batch_size] = batch @ rotation.transpose(0, 2, 1) + translation[:, None]
+        rotations[start:start + batch_size] = rotation
+        translations[start:start + batch_size] = translation
+    return aligned, rotations, translations
+
+
+def generalized_procrustes(vertices, tolerance=GPA_TOLERANCE, max_iterations=GPA_MAX_ITERATIONS, batch_size=4096):
+    """
+    Generalized Procrustes analysis (rigid): aligns every model to the mean shape, recomputes
+    the mean from the aligned models and repeats until the mean stops changing. The new mean
+    is itself aligned to the previous one so the frame does not drift.
+
+    :param vertices: Array of shape (N_models, N_vertices, 3) (may be memory-mapped).
+    :param tolerance: RMS change of the mean shape below which the iteration stops.
+    :param max_iterations: Maximum number of iterations.
+    :param batch_size: Number of models aligned per step.
+    :return: Dictionary with aligned (float32), mean, rotations, translations, iterations and converged.
+    """
+    aligned, rotations, translations = procrustes_align(vertices, batch_size=batch_size)
+    mean = aligned.mean(axis=0, dtype=np.float64)
+    converged = False
+    iteration = 0
+    for iteration in range(1, max_iterations + 1):
+        aligned, rotations, translations = procrustes_align(vertices, mean, batch_size)
+        new_mean = aligned.mean(axis=0, dtype=np.float64)
+        rotation, translation = kabsch(new_mean[None], mean)
+        new_mean = new_mean @ rotation[0].T + translation[0]
+        change = np.sqrt(((new_mean - mean) ** 2).sum(axis=1).mean())
+        mean = new_mean
+        if change < tolerance:
+            converged = True
+            break
+
+    return {
+        "aligned": aligned,
+        "mean": mean,
+        "rotations": rotations,
+        "translations": translations,
+        "iterations": iteration,
+        "converged": converged,
+    }
+
+
+def align_vertices(vertices, method=None, anchor=None, reference=None):
+    """
+    Aligns the vertex tensor of a segment before the analysis.
+
+    :param vertices: Array of shape (N_models, N_vertices, 3).
+    :param method: None (unchanged), 'anchor', 'procrustes' (to the mean shape in one pass)
+                   or 'gpa' (generalized Procrustes, iterated to convergence).
+    :param anchor: Anchor vertex for the 'anchor' method.
+    :param reference: Reference shape for the 'procrustes' method (defaults to the mean shape).
+    :return: Aligned array of shape (N_models, N_vertices, 3).
+    """
+    if method is None:
+        return vertices
+    if method == "anchor":
+        if anchor is None:
+            raise ValueError("Anchor alignment needs an anchor vertex.")
+        return align_to_anchor(vertices, anchor)
+    if method == "procrustes":
+        return procrustes_align(vertices, reference)[0]
+    if method == "gpa":
+        return generalized_procrustes(vertices)["aligned"]
+    raise ValueError(f"Unknown alignment method '{method}'. Available: {list(ALIGNMENT_METHODS)}")
@@ -0,0 +1,218 @@
+import os
+import json
+import pickle
+import hashlib
+import numpy as np
+
+# Tamaño máximo por defecto de la caché en disco (bytes)
+DEFAULT_MAX_BYTES = 2 * 2**30
+
+# Índice de huellas de archivos ya leídos: ruta -> [tamaño, mtime, hash del contenido]
+FINGERPRINTS_FILE = "fingerprints.json"
+
+
+def hash_file(path, chunk_size=2**20):
+    """
+    SHA-1 of a file's contents.
+
+    :param path: Path to the file.
+    :param chunk_size: Bytes read per step.
+    :return: Hexadecimal digest.
+    """
+    digest = hashlib.sha1()
+    with open(path, "rb") as file:
+        for chunk in iter(lambda: file.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def parameters_hash(*parts):
+    """
+    Stable hash of JSON-like parameters (dictionaries, lists, numbers, strings, numpy scalars).
+
+    :param parts: Values to hash.
+    :return: Hexadecimal digest.
+    """
+    def default(value):
+        if isinstance(value, np.generic):
+            return value.item()
+        if isinstance(value, np.ndarray):
+            return value.tolist()
+        return str(value)
+
+    text = json.dumps(parts, sort_keys=True, default=default)
+    return hashlib.sha1(text.encode()).hexdigest()
+
+
+class ArtifactCache:
+    """
+    Content-addressed disk cache of pipeline artifacts with least-recently-used eviction.
+    Keys hash the contents of the input files and the parameters of the stage, so a result
+    is reused only when nothing it depends on has changed. Arrays are stored as .npy
+    (opened memory-mapped) and everything else is pickled.
+    """
+
+    def __init__(self, directory, max_bytes=DEFAULT_MAX_BYTES):
+        """
+        :param directory: Cache directory (created if needed).
+        :param max_bytes: Total size above which the least recently used artifacts are removed.
+        """
+        self.directory = directory
+        self.max_bytes = max_bytes
+        os.makedirs(directory, exist_ok=True)
+        self._fingerprints_path = os.path.join(directory, FINGERPRINTS_FILE)
+        try:
+            with open(self._fingerprints_path) as file:
+                self._fingerprints = json.load(file)
+        except (OSError, ValueError):
+            self._fingerprints = {}
+        # Las entradas de otro formato (índices antiguos) se descartan y se vuelven a calcular
+        self._fingerprints = {path: entry for path, entry in self._fingerprints.items() if isinstance(entry, list)}
+        self._fingerprints_changed = False
+        self.hits = 0
+        self.misses = 0
+
+    def fingerprint(self, path):
+        """
+        Content hash of a file or of every file under a directory. File hashes are remembered
+        by (path, size, modification time), so unchanged inputs are not read again; the index is
+        written once per call, after every new file has been hashed.
+
+        :param path: File or directory.
+        :return: Hexadecimal digest.
+        """
+        digest = self._fingerprint(path)
+        if self._fingerprints_changed:
+            self._save_fingerprints()
+        return digest
+
+    def _fingerprint(self, path):
+        if os.path.isdir(path):
+            entries = []
+            for root, _, files in sorted(os.walk(path)):
+                for name in sorted(files):
+                    file_path = os.path.join(root, name)
+                    entries.append((os.path.relpath(file_path, path), self._fingerprint(file_path)))
+            return parameters_hash(entries)
+
+        status = os.stat(path)
+        absolute_path = os.path.abspath(path)
+        stamp = [status.st_size, status.st_mtime_ns]
+        entry = self._fingerprints.get(absolute_path)
+        if entry is None or entry[:2] != stamp:
+            # Una marca distinta reemplaza la entrada anterior de la misma ruta
+            self._fingerprints[absolute_path] = stamp + [hash_file(path)]
+            self._fingerprints_changed = True
+        return self._fingerprints[absolute_path][2]
+
+    def _save_fingerprints(self):
+        """
+        Writes the fingerprint index (atomically), dropping the files that no longer exist.
+        """
+        self._fingerprints = {path: entry for path, entry in self._fingerprints.items() if os.path.exists(path)}
+        temporary_path = self._fingerprints_path + ".tmp"
+        with open(temporary_path, "w") as file:
+            json.dump(self._fingerprints, file)
+        os.replace(temporary_path, self._fingerprints_path)
+        self._fingerprints_changed = False
+
+    def key(self, stage, *parts):
+        """
+        Cache key of a stage: its name plus the hash of its inputs (fingerprints, upstream keys)
+        and parameters.
+
+        :param stage: Stage name, used as a readable file name prefix.
+        :param parts: Fingerprints, upstream keys and parameters.
+        :return: Key string.
+        """
+        return f"{stage}-{parameters_hash(stage, *parts)[:20]}"
+
+    def _paths(self, key):
+        return os.path.join(self.directory, key + ".npy"), os.path.join(self.directory, key + ".pkl")
+
+    def get(self, key):
+        """
+        Loads an artifact and marks it as recently used.
+
+        :param key: Key returned by key().
+        :return: Tuple (found, value).
+        """
+        for path in self._paths(key):
+            if os.path.exists(path):
+                os.utime(path)
+                self.hits += 1
+                if path.endswith(".npy"):
+                    return True, np.load(path, mmap_mode="r")
+                with open(path, "rb") as file:
+                    return True, pickle.load(file)
+        self.misses += 1
+        return False, None
+
+    def put(self, key, value):
+        """
+        Stores an artifact (atomically) and evicts old artifacts if the cache is over its size.
+
+        :param key: Key returned by key().
+        :param value: numpy array or any picklable object.
+        :return: The value.
+        """
+        array_path, pickle_path = self._paths(key)
+        path = array_path if isinstance(value, np.ndarray) else pickle_path
+        temporary_path = path + ".tmp"
+        with open(temporary_path, "wb") as file:
+            if isinstance(value, np.ndarray):
+                np.save(file, value)
+            else:
+                pickle.dump(value, file, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(temporary_path, path)
+        self.evict()
+        return value
+
+    def cached(self, key, function, *args, **kwargs):
+        """
+        Returns the cached artifact of a key, computing and storing it on a miss.
+
+        :param key: Key returned by key().
+        :param function: Callable computing the artifact.
+        :return: The artifact.
+        """
+        found, value = self.get(key)
+        if found:
+            return value
+        return self.put(key, function(*args, **kwargs))
+
+    def size(self):
+        """
+        Total size of the stored artifacts in bytes.
+        """
+        return sum(os.path.getsize(path) for path, _ in self._artifacts())
+
+    def _artifacts(self):
+        """
+        Lists (path, last use time) of every artifact.
+        """
+        artifacts = []
+        for name in os.listdir(self.directory):
+            if name.endswith((".npy", ".pkl")):
+                path = os.path.join(self.directory, name)
+                artifacts.append((path, os.stat(path).st_mtime))
+        return artifacts
+
+    def evict(self):
+        """
+        Removes the least recently used artifacts until the cache fits in max_bytes.
+        """
+        artifacts = sorted(self._artifacts(), key=lambda item: item[1])
+        total = sum(os.path.getsize(path) for path, _ in artifacts)
+        for path, _ in artifacts:
+            if total <= self.max_bytes:
+                break
+            total -= os.path.getsize(path)
+            os.remove(path)
+
+    def clear(self):
+        """
+        Removes every artifact.
+        """
+        for path, _ in self._artifacts():
+            os.remove(path)
@@ -0,0 +1,173 @@
+import os
+import json
+import time
+import shutil
+import argparse
+import platform
+import tempfile
+import tracemalloc
+import subprocess
+import numpy as np
+
+from obj_loader import load_obj_directory, models_directory
+from vertex_store import save_vertex_store, load_vertex_store
+from perimeter import ring_lengths
+from shape_space import fit_shape_space_from_obj, sample_population
+from sizing_pipeline import get_config, compute_landmarks, compute_features, assign_sizes, compute_vertex_stats_by_size
+from vertex_stats_accumulator import accumulate_vertices
+
+# Archivo donde se acumulan los resultados (una línea JSON por ejecución)
+results_file = "benchmark_results.jsonl"
+
+
+def measure(function, *args, memory=True, **kwargs):
+    """
+    Runs a function recording its wall time and, in a second traced run, its peak memory.
+    The time is measured without tracemalloc, which slows down Python-level allocations.
+
+    :param function: Callable to measure.
+    :param memory: Whether to run the function again under tracemalloc to record the peak memory.
+    :return: Tuple (result, seconds, peak memory in MB or None).
+    """
+    start = time.perf_counter()
+    result = function(*args, **kwargs)
+    elapsed = time.perf_counter() - start
+    if not memory:
+        return result, elapsed, None
+
+    del result
+    tracemalloc.start()
+    try:
+        result = function(*args, **kwargs)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return result, elapsed, peak / 2**20
+
+
+def git_revision():
+    """
+    Returns the current git commit of the repository, or None outside a git checkout.
+    """
+    try:
+        output = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                                cwd=os.path.dirname(os.path.abspath(__file__)), timeout=10)
+        return output.stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+
+def benchmark_stages(vertices, names, config, streaming_stats=True, memory=True):
+    """
+    Times every analysis stage on one vertex tensor.
+
+    :param vertices: Array of shape (N_models, N_vertices, 3).
+    :param names: List of model names.
+    :param config: Segment configuration of sizing_pipeline.
+    :param streaming_stats: Whether to include the one-pass statistics accumulator.
+    :param memory: Whether to record the peak memory of every stage.
+    :return: List of dictionaries with stage, seconds and peak_mb.
+    """
+    records = []
+
+    def record(stage, function, *args, **kwargs):
+        result, seconds, peak = measure(function, *args, memory=memory, **kwargs)
+        records.append({"stage": stage, "seconds": seconds, "peak_mb": peak})
+        return result
+
+    # Guardar y abrir el almacén binario
+    store_path = tempfile.mkdtemp(prefix="vertex_store_")
+    try:
+        record("save_store", save_vertex_store, store_path, vertices, names)
+        record("open_store", load_vertex_store, store_path)
+    finally:
+        shutil.rmtree(store_path, ignore_errors=True)
+
+    record("landmarks", compute_landmarks, vertices, names, config)
+    record("perimeters", ring_lengths, vertices, config["rings"])
+    features = record("features", compute_features, vertices, names, config)
+    features = record("kmeans_sizing", assign_sizes, features, config)
+    record("stats_by_size", compute_vertex_stats_by_size, vertices, features["size"])
+    if streaming_stats:
+        record("streaming_stats", accumulate_vertices, vertices)
+    return records
+
+
+def run_benchmark(segments=("arm", "leg"), population_sizes=(10000, 100000), streaming_stats=True,
+                  output_path=results_file, random_state=0, memory=True):
+    """
+    Benchmarks the pipeline on the shipped models and on synthetic populations of each size,
+    and appends the results to a JSON lines file.
+
+    :param segments: Segments to benchmark.
+    :param population_sizes: Sizes of the synthetic populations generated with shape_space.
+    :param streaming_stats: Whether to include the one-pass statistics accumulator.
+    :param output_path: JSON lines file where the run is appended.
+    :param random_state: Seed of the synthetic populations.
+    :param memory: Whether to record the peak memory of every stage (runs each stage twice).
+    :return: Dictionary with the run metadata and results.
+    """
+    results = []
+    for segment in segments:
+        config = get_config(segment)
+        obj_directory = os.path.join(models_directory, segment)
+
+        (vertices, names), seconds, peak = measure(load_obj_directory, obj_directory, memory=memory)
+        dataset = f"{segment}_shipped"
+        results.append({"dataset": dataset, "models": len(names), "stage": "load_obj",
+                        "seconds": seconds, "peak_mb": peak})
+        for row in benchmark_stages(vertices, names, config, streaming_stats, memory):
+            results.append({"dataset": dataset, "models": len(names), **row})
+        print(f"{dataset}: done")
+
+        shape_model = fit_shape_space_from_obj(obj_directory)
+        for n_models in population_sizes:
+            (vertices, _, _), seconds, peak = measure(sample_population, shape_model, n_models, random_state, memory=memory)
+            names = [f"synthetic_model_{i}" for i in range(n_models)]
+            dataset = f"{segment}_synthetic_{n_models}"
+            results.append({"dataset": dataset, "models": n_models, "stage": "synthesize",
+                            "seconds": seconds, "peak_mb": peak})
+            for row in benchmark_stages(vertices, names, config, streaming_stats, memory):
+                results.append({"dataset": dataset, "models": n_models, **row})
+            del vertices
+            print(f"{dataset}: done")
+
+    run = {
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "revision": git_revision(),
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "machine": platform.machine(),
+        "cpus": os.cpu_count(),
+        "results": results,
+    }
+    with open(output_path, "a") as file:
+        file.write(json.dumps(run) + "\n")
+    return run
+
+
+def print_results(run):
+    """
+    Prints a run as a table.
+
+    :param run: Dictionary returned by run_benchmark.
+    """
+    print(f"\nRevision {run['revision']} ({run['timestamp']})")
+    print(f"{'dataset':<24}{'models':>8}  {'stage':<16}{'seconds':>10}{'peak MB':>10}")
+    for row in run["results"]:
+        peak = "-" if row["peak_mb"] is None else f"{row['peak_mb']:.1f}"
+        print(f"{row['dataset']:<24}{row['models']:>8}  {row['stage']:<16}{row['seconds']:>10.4f}{peak:>10}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark de las etapas del análisis.")
+    parser.add_argument("--segments", nargs="+", default=["arm", "leg"])
+    parser.add_argument("--sizes", type=int, nargs="*", default=[10000, 100000],
+                        help="Tamaños de las poblaciones sintéticas")
+    parser.add_argument("--no-streaming", action="store_true", help="Omitir el acumulador de estadísticas")
+    parser.add_argument("--no-memory", action="store_true", help="No medir la memoria (cada etapa se ejecuta una vez)")
+    parser.add_argument("--output", default=results_file)
+    args = parser.parse_args()
+
+    run = run_benchmark(args.segments, args.sizes, not args.no_streaming, args.output, memory=not args.no_memory)
+    print_results(run)
@@ -1,88 +1,49 @@
 import bpy
-import csv
+import sys
 import os
+import json
 
-# Ruta al archivo CSV
-csv_path = r"C:\Users\oscar\OneDrive - Universidad de los andes\Universidad\TESIS\Proyecto\leg_vertex_statistics.csv"
-
-
-# Función para importar datos de los vértices y su desviación estándar
-def import_vertices_from_csv(csv_path):
-    vertices = []
-    std_devs = []
-
-    with open(csv_path, 'r') as file:
-        reader = csv.DictReader(file)
-        for row in reader:
-            try:
-                x = float(row['X'])
-                y = float(row['Y'])
-                z = float(row['Z'])
-                std_dev = float(row['Std_Combined'])  # Extraer desviación estándar
-
-                vertices.append((x, y, z))
-                std_devs.append(std_dev)
-            except ValueError:
-                continue  # Omitir filas con errores
-
-    print(f"Loaded {len(vertices)} vertices from CSV.")
-    
-    return vertices, std_devs
+# Directory configuration
+script_dir = r"C:\Users\oscar\OneDrive - Universidad de los andes\Universidad\TESIS\Proyecto"
+sys.path.append(script_dir)
 
-# Función para escalar los valores de desviación estándar a [0,1]
-def scale_weights(std_devs):
+from size_meshes import load_mean_mesh, fit_weight_mapping, apply_weight_mapping, save_weight_mapping, quantize_weights
+from functions import set_mesh_vertices, paint_vertex_weights
 
-    # Obtener valores mínimo y máximo
-    min_std = 0.000
-    max_std = 0.024
-    print(f"MIN_Std = {min_std}", f"MAX_Std = {max_std}")
-
-    if max_std == min_std:  # Evitar división por cero
-        return [0.5] * len(std_devs)
+# Ruta al archivo CSV
+csv_path = r"C:\Users\oscar\OneDrive - Universidad de los andes\Universidad\TESIS\Proyecto\leg_vertex_statistics.csv"
 
-    weights = [(std - min_std) / (max_std - min_std) for std in std_devs]  # Normalización
+# Normalización de los pesos: percentiles de Std_Combined que van a 0 y 1, y escala logarítmica
+percentiles = (1.0, 99.0)
+log_scale = False
 
-    return weights
 
-# Actualizar la malla con los nuevos vértices
-def update_mesh_vertices(mesh_name, vertices):
+# Actualizar la malla con los vértices medios y pintar los pesos de la desviación estándar
+def update_mesh(mesh_name, vertices, weights, mapping):
     obj = bpy.data.objects.get(mesh_name)
-    if obj and obj.type == 'MESH':
-        mesh = obj.data
-        for i, vert in enumerate(mesh.vertices):
-            if i < len(vertices):
-                vert.co = vertices[i]
-        mesh.update()
-        print(f"Updated {len(vertices)} vertices in {mesh_name}.")
-    else:
+    if not (obj and obj.type == 'MESH'):
         print(f"Mesh '{mesh_name}' not found.")
+        return
 
-# Aplicar "Weight Painting" basado en los valores escalados
-def apply_weight_paint(mesh_name, weights):
-    obj = bpy.data.objects.get(mesh_name)
-    if obj and obj.type == 'MESH':
-        if not obj.vertex_groups:
-            obj.vertex_groups.new(name="Std_Deviation_Weights")
-        
-        vgroup = obj.vertex_groups.active
+    set_mesh_vertices(obj, vertices)
+    print(f"Updated {len(vertices)} vertices in {mesh_name}.")
 
-        for i, weight in enumerate(weights):
-            vgroup.add([i], weight, 'REPLACE')
+    weight_groups = quantize_weights(weights)
+    paint_vertex_weights(obj, weight_groups)
+    # Guardar la normalización usada en el objeto
+    obj["weight_mapping"] = json.dumps(mapping)
+    print(f"Applied weight painting to {len(weights)} vertices ({len(weight_groups)} distinct weights).")
 
-        print("\nFinal Weights Applied")
-        for i in range(min(592, len(weights))):
-            print(f"Vertex {i}: Std_Dev = {std_devs[i]:.6f}, Weight = {weights[i]:.6f}")
-
-        print(f"Applied weight painting to {len(weights)} vertices.")
-    else:
-        print(f"Mesh '{mesh_name}' not found.")
 
 # Ejecutar todo
 mesh_name = "SMPLX-mesh"
-vertices, std_devs = import_vertices_from_csv(csv_path)
-weights = scale_weights(std_devs)  # Escalar con factor
-update_mesh_vertices(mesh_name, vertices)
-apply_weight_paint(mesh_name, weights)
-
+# Las columnas X/Y/Z que leía el script original son las últimas del encabezado de dos niveles (max)
+vertices, std_devs = load_mean_mesh(csv_path, statistic="max")
+print(f"Loaded {len(vertices)} vertices from CSV.")
 
+mapping = fit_weight_mapping(std_devs, percentiles=percentiles, log=log_scale)
+minimum, maximum = mapping["ranges"]["all"]
+print(f"MIN_Std = {minimum:.6f}, MAX_Std = {maximum:.6f}")
+save_weight_mapping(os.path.splitext(csv_path)[0] + "_weight_mapping.json", mapping)
 
+update_mesh(mesh_name, vertices, apply_weight_mapping(std_devs, mapping), mapping)
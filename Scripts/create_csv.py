@@ -1,31 +1,20 @@
-import csv
+from vertex_groups import VertexGroupRegistry
 
 def save_vertex_groups_to_csv(vertex_groups, file_path="vertex_groups.csv"):
     """
     Saves vertex groups into a CSV file, organizing each group into columns.
+    A binary copy of the groups (same name, '.npz') is written next to it.
 
     :param vertex_groups: Dictionary where keys are group names and values are lists of vertex indices.
     :param file_path: Name of the CSV file.
     """
-    # Get the longest list to determine row count
-    max_length = max(len(v) for v in vertex_groups.values())
-
-    # Prepare rows by padding shorter lists with empty strings
-    rows = []
-    for i in range(max_length):
-        row = [vertex_groups[group][i] if i < len(vertex_groups[group]) else "" for group in vertex_groups]
-        rows.append(row)
-
-    # Write to CSV
-    with open(file_path, mode='w', newline='') as file:
-        writer = csv.writer(file)
-        writer.writerow(vertex_groups.keys())  # Write headers
-        writer.writerows(rows)  # Write data rows
+    registry = VertexGroupRegistry(vertex_groups)
+    registry.save_csv(file_path)
+    registry.save(file_path[:-len(".csv")] + ".npz" if file_path.endswith(".csv") else file_path + ".npz")
     
     print(f"Vertex groups saved to '{file_path}' successfully!")
 
 
-
 vertex_groups = {
     "left_arm": [3234, 3235, 3256, 3257, 3258, 3259, 3264, 3265, 3266, 3267, 3302, 3303, 3304, 3305, 3310, 3311, 3312, 3313, 3342, 3343, 3344, 3345, 3346, 3347, 3348, 3349, 3385, 3386, 3387, 3388, 3401, 3402, 3403, 3404, 3405, 3406, 3407, 3408, 3409, 3410, 3411, 3412, 3416, 3417, 3418, 3419, 3420, 3421, 3422, 3423, 3424, 3425, 3834, 3835, 3868, 3869, 3870, 3871, 3898, 3899, 3900, 3901, 3911, 3912, 3913, 3920, 3921, 3922, 3923, 3924, 3925, 3926, 3927, 3947, 3948, 3951, 3952, 3973, 3974, 3975, 3976, 3987, 3988, 3989, 3990, 4007, 4008, 4009, 4010, 4011, 4012, 4013, 4014, 4015, 4016, 4017, 4018, 4019, 4020, 4021, 4022, 4023, 4024, 4025, 4026, 4027, 4028, 4029, 4030, 4031, 4032, 4033, 4034, 4035, 4036, 4037, 4038, 4039, 4040, 4042, 4043, 4044, 4045, 4046, 4047, 4048, 4060, 4061, 4062, 4063, 4064, 4067, 4072, 4073, 4074, 4075, 4076, 4077, 4078, 4079, 4135, 4138, 4139, 4140, 4141, 4142, 4143, 4168, 4169, 4170, 4171, 4172, 4173, 4174, 4175, 4249, 4250, 4251, 4252, 4261, 4262, 4263, 4264, 4265, 4266, 4267, 4268, 4269, 4270, 4271, 4272, 4275, 4276, 4277, 4278, 4281, 4282, 4283, 4284, 4285, 4286, 4287, 4288, 4289, 4290, 4295, 4296, 4301, 4302, 4303, 4304, 4305, 4306, 4307, 4308, 4309, 4310, 4311, 4312, 4313, 4314, 4315, 4316, 4317, 4318, 4319, 4322, 4334, 4335, 4336, 4341, 4342, 4343, 4344, 4345, 4346, 4347, 4348, 4349, 4350, 4351, 4352, 4353, 4354, 4355, 4356, 4357, 4358, 4363, 4369, 4370, 4371, 4372, 4373, 4375, 4377, 4378, 4383, 4384, 4385, 4386, 4387, 4389, 4397, 4398, 4447, 4448, 4449, 4450, 4458, 4459, 4460, 4461, 4462, 4463, 4464, 4465, 4466, 4468, 4469, 4470, 4471, 4472, 4473, 4474, 4475, 4476, 4477, 4478, 4479, 4480, 4483, 4484, 4485, 4486, 4487, 4488, 4489, 4490, 4492, 4493, 4494, 4495, 4496, 4497, 4498, 4499, 4500, 4501, 4502, 4503, 4504, 4505, 4506, 4507, 4508, 4509, 4510, 4514, 4516, 4518, 4519, 4520, 4521, 4522, 4523, 5397, 5398, 5399, 5400, 5467, 5468, 5469, 5470, 5471, 5472, 5473, 5474, 5475, 5476, 5477, 5478, 5479, 5480, 5539, 5540, 5541, 5542, 5543, 5544, 5572, 5573, 5576, 5577, 5578, 5579, 5580, 5581, 5582, 5583, 5584, 5585, 5586, 5587, 5588, 5589, 5590, 5591, 5592, 5593, 5594, 5595, 5597, 5602, 5605, 5606, 5607, 5608, 5609, 5624, 5625, 5626, 5627, 5628],
     "left_forearm": [4176, 4177, 4178, 4179, 4180, 4181, 4182, 4183, 4184, 4185, 4186, 4187, 4188, 4189, 4190, 4191, 4192, 4193, 4194, 4195, 4196, 4197, 4198, 4199, 4200, 4201, 4202, 4203, 4204, 4205, 4206, 4207, 4208, 4209, 4210, 4211, 4212, 4213, 4214, 4215, 4216, 4217, 4218, 4219, 4220, 4221, 4222, 4223, 4224, 4225, 4226, 4227, 4228, 4229, 4230, 4231, 4232, 4233, 4234, 4235, 4236, 4237, 4238, 4239, 4240, 4241, 4242, 4243, 4244, 4245, 4246, 4247, 4248, 4251, 4252, 4253, 4254, 4255, 4256, 4257, 4258, 4259, 4260, 4273, 4274, 4277, 4278, 4283, 4284, 4287, 4288, 4289, 4290, 4293, 4294, 4295, 4296, 4299, 4300, 4301, 4302, 4323, 4324, 4325, 4326, 4327, 4328, 4329, 4330, 4331, 4332, 4333, 4337, 4338, 4339, 4340, 4359, 4360, 4361, 4362, 4363, 4364, 4365, 4366, 4367, 4368, 4371, 4374, 4376, 4379, 4380, 4381, 4382, 4388, 4390, 4518, 4523, 4524, 4525, 4526, 4527, 4528, 4529, 4530, 4531, 4532, 4533, 4534, 4535, 4536, 4537, 4538, 4539, 4540, 4541, 4542, 4543, 4544, 4545, 4546, 4547, 4548, 4549, 4550, 4551, 4552, 4553, 4554, 4555, 4556, 4557, 4558, 4559, 4560, 4561, 4562, 4563, 4564, 4565, 4566, 4567, 4568, 4569, 4570, 4571, 4572, 4573, 4574, 4575, 4576, 4577, 4578, 4579, 4580, 4581, 4582, 4583, 4584, 4585, 4586, 4587, 4588, 4589, 4590, 4591, 4592, 4593, 4594, 4632, 4673, 4674, 4686, 4703, 4712, 4713, 4714, 4715, 4716, 4717, 4718, 4719, 4720, 4721, 4722, 4723, 4724, 4725, 4726, 4761, 4762, 4820, 4821, 4822, 4823, 4842, 4844, 4848, 4849, 4855, 4856, 4857, 4858, 4893, 4900, 5377, 5451, 5452],
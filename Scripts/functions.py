@@ -4,31 +4,19 @@ import random
 import bmesh
 import numpy as np
 
+from vertex_groups import load_vertex_groups
+
 
 def load_csv(file_path):
     """
     Reads a CSV file and converts it back into a dictionary of vertex groups.
+    The groups are parsed with numpy (see vertex_groups.load_vertex_groups), which also keeps a
+    binary copy next to the CSV for the following runs.
     
     :param file_path: Path to the CSV file.
     :return: Dictionary where keys are group names and values are lists of vertex indices.
     """
-    vertex_groups = {}
-
-    with open(file_path, mode='r', newline='') as file:
-        reader = csv.reader(file)
-        headers = next(reader)  # Read column names (group names)
-
-        # Initialize empty lists for each group
-        for group in headers:
-            vertex_groups[group] = []
-
-        # Read each row and append values to the correct group
-        for row in reader:
-            for i, value in enumerate(row):
-                if value.isdigit():  # Ensure the value is a number
-                    vertex_groups[headers[i]].append(int(value))
-
-    return vertex_groups
+    return load_vertex_groups(file_path).to_dict()
 
 
 def create_vertex_group(mesh_name, group_name, vertex_list):
@@ -63,12 +51,39 @@ def create_vertex_group(mesh_name, group_name, vertex_list):
         print(f"Object '{mesh_name}' not found or is not a mesh.")
         
 
-def split_part(obj_name, group_names):
+def select_vertices(obj, mask):
+    """
+    Sets the selection of a mesh in bulk: the masked vertices, and the edges and faces whose
+    vertices are all masked. Must be called in object mode.
+
+    :param obj: Mesh object.
+    :param mask: Boolean array with one entry per vertex.
+    """
+    mesh = obj.data
+    mask = np.asarray(mask, dtype=bool)
+    mesh.vertices.foreach_set("select", mask)
+
+    edge_vertices = np.empty(len(mesh.edges) * 2, dtype=np.int32)
+    mesh.edges.foreach_get("vertices", edge_vertices)
+    mesh.edges.foreach_set("select", mask[edge_vertices].reshape(-1, 2).all(axis=1))
+
+    if len(mesh.polygons):
+        loop_vertices = np.empty(len(mesh.loops), dtype=np.int32)
+        mesh.loops.foreach_get("vertex_index", loop_vertices)
+        loop_starts = np.empty(len(mesh.polygons), dtype=np.int32)
+        mesh.polygons.foreach_get("loop_start", loop_starts)
+        mesh.polygons.foreach_set("select", np.logical_and.reduceat(mask[loop_vertices], loop_starts))
+
+
+def split_part(obj_name, group_names, vertex_groups=None):
     """
     Clones and separates vertices from specified vertex groups in a given object.
 
     :param obj_name: Name of the object in the scene.
     :param group_names: List of vertex group names to clone and separate.
+    :param vertex_groups: Precomputed group indices (dictionary name -> vertex indices, e.g. from
+                          load_csv, or a vertex_groups.VertexGroupRegistry). The selection is then
+                          set in bulk; without it the object's vertex groups are scanned.
     """
     # Get the object by its name
     obj = bpy.data.objects.get(obj_name)
@@ -83,28 +98,23 @@ def split_part(obj_name, group_names):
     bpy.context.view_layer.objects.active = obj
     obj.select_set(True)
 
-    # Switch to edit mode
-    bpy.ops.object.mode_set(mode='EDIT')
-
-    # Deselect all vertices
-    bpy.ops.mesh.select_all(action='DESELECT')
-
-    # Switch back to object mode to manipulate vertex selection
-    bpy.ops.object.mode_set(mode='OBJECT')
-
-    # Select vertices belonging to the specified vertex groups
+    # Mask of the vertices belonging to the specified vertex groups
+    mask = np.zeros(len(obj.data.vertices), dtype=bool)
     for group_name in group_names:
-        if group_name in obj.vertex_groups:
+        if vertex_groups is not None and group_name in vertex_groups:
+            mask[np.asarray(vertex_groups[group_name], dtype=np.int64)] = True
+        elif group_name in obj.vertex_groups:
             group_index = obj.vertex_groups[group_name].index
-
             for v in obj.data.vertices:
-                for g in v.groups:
-                    if g.group == group_index:
-                        v.select = True
+                if any(g.group == group_index for g in v.groups):
+                    mask[v.index] = True
         else:
             print(f"Vertex group '{group_name}' not found in object '{obj_name}'.")
 
-    # Return to edit mode to perform mesh operations
+    # Select them in bulk (this also deselects everything else)
+    select_vertices(obj, mask)
+
+    # Switch to edit mode to perform mesh operations
     bpy.ops.object.mode_set(mode='EDIT')
 
     # Duplicate and separate the selected vertices
@@ -117,14 +127,52 @@ def split_part(obj_name, group_names):
     print(f"Vertex groups {group_names} have been cloned.")
 
 
+def set_mesh_vertices(obj, vertices):
+    """
+    Replaces the vertex coordinates of a mesh in one foreach_set call.
+
+    :param obj: Mesh object.
+    :param vertices: Array of shape (N, 3). If N differs from the mesh, only the first min(N, mesh) vertices change.
+    """
+    mesh = obj.data
+    n_vertices = len(mesh.vertices)
+    vertices = np.asarray(vertices, dtype=np.float32)
+    if len(vertices) != n_vertices:
+        coordinates = np.empty(n_vertices * 3, dtype=np.float32)
+        mesh.vertices.foreach_get("co", coordinates)
+        coordinates = coordinates.reshape(-1, 3)
+        count = min(len(vertices), n_vertices)
+        coordinates[:count] = vertices[:count]
+        vertices = coordinates
+    mesh.vertices.foreach_set("co", vertices.ravel())
+    mesh.update()
+
+
+def paint_vertex_weights(obj, weight_groups, group_name="Std_Deviation_Weights"):
+    """
+    Writes vertex group weights with one vertex_group.add call per distinct weight.
+
+    :param obj: Mesh object.
+    :param weight_groups: List of (weight, vertex indices) pairs (see size_meshes.quantize_weights).
+    :param group_name: Vertex group created when the object has none; otherwise the active group is used.
+    :return: The painted vertex group.
+    """
+    if not obj.vertex_groups:
+        obj.vertex_groups.new(name=group_name)
+    vgroup = obj.vertex_groups.active
+    for weight, indices in weight_groups:
+        vgroup.add(indices.tolist(), weight, 'REPLACE')
+    return vgroup
+
+
 def delete_object(obj):
     if obj and obj.name in bpy.data.objects:
         bpy.data.objects.remove(obj)
         print(f"Deleted: {obj_name}")
         
         
-def export_model(filepath):
-    bpy.ops.wm.obj_export(filepath=filepath)
+def export_model(filepath, selected_only=False):
+    bpy.ops.wm.obj_export(filepath=filepath, export_selected_objects=selected_only)
         
 
 def get_model_metadata():
@@ -0,0 +1,52 @@
+import os
+import sys
+import glob
+import argparse
+
+# Este script se ejecuta dentro de Blender:
+#   blender --background --python generator_worker.py -- --start 0 --stop 50 --output-dir models --worker 0
+script_dir = os.path.dirname(os.path.abspath(__file__))
+sys.path.append(script_dir)
+
+from models_generator import generate_models, read_metadata_keys, get_vertex_groups, model_segments, METADATA_FILE
+
+
+def parse_worker_args(argv):
+    """
+    Parses the arguments given to Blender after '--'.
+
+    :param argv: Full sys.argv of the Blender process.
+    :return: argparse.Namespace with the worker options.
+    """
+    argv = argv[argv.index("--") + 1:] if "--" in argv else []
+    parser = argparse.ArgumentParser(description="Worker de generación de modelos SMPL-X.")
+    parser.add_argument("--start", type=int, required=True)
+    parser.add_argument("--stop", type=int, required=True)
+    parser.add_argument("--output-dir", required=True)
+    parser.add_argument("--worker", type=int, default=0)
+    parser.add_argument("--seed", type=int, default=None)
+    parser.add_argument("--genders", nargs="+", default=["male", "female"])
+    parser.add_argument("--segments", nargs="+", default=None, help="Segmentos a exportar (por defecto todos)")
+    parser.add_argument("--vertex-groups", default=None, help="vertex_groups.csv (por defecto el de este directorio)")
+    return parser.parse_args(argv)
+
+
+args = parse_worker_args(sys.argv)
+
+# Modelos ya registrados por cualquier ejecución anterior (archivo final o fragmentos de otros workers)
+metadata_paths = [os.path.join(args.output_dir, METADATA_FILE)]
+metadata_paths += glob.glob(os.path.join(args.output_dir, "model_metadata.part*.csv"))
+done_keys = read_metadata_keys(metadata_paths)
+segments = model_segments(get_vertex_groups(args.vertex_groups))
+
+generated = generate_models(
+    range(args.start, args.stop),
+    genders=tuple(args.genders),
+    output_dir=args.output_dir,
+    metadata_path=os.path.join(args.output_dir, f"model_metadata.part{args.worker}.csv"),
+    done_keys=done_keys,
+    seed=args.seed,
+    segments={segment: segments[segment] for segment in args.segments} if args.segments else None,
+    vertex_groups_path=args.vertex_groups,
+)
+print(f"Worker {args.worker}: generated {generated} models in [{args.start}, {args.stop})")
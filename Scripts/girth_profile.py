@@ -0,0 +1,235 @@
+import os
+import numpy as np
+import pandas as pd
+
+from obj_loader import load_obj_faces, list_model_files
+
+# Número de estaciones del perfil por defecto
+DEFAULT_STATIONS = 100
+
+# Aristas de cada triángulo como pares de posiciones (0-1, 1-2, 2-0)
+TRIANGLE_EDGES = np.array([[0, 1], [1, 2], [2, 0]])
+
+
+def segment_mesh_file(source):
+    """
+    OBJ file whose faces are used for a segment: the file itself, or the first model of a directory.
+
+    :param source: OBJ file or directory of model OBJ files.
+    :return: Path of the OBJ file.
+    """
+    if os.path.isdir(source):
+        files = list_model_files(source)
+        if not files:
+            raise FileNotFoundError(f"No model OBJ files in {source}")
+        return files[0]
+    return source
+
+
+def load_segment_faces(source):
+    """
+    Faces of a segment, shared by every model (same SMPL-X topology).
+
+    :param source: OBJ file or directory of model OBJ files.
+    :return: int32 array of shape (N_triangles, 3).
+    """
+    return load_obj_faces(segment_mesh_file(source))
+
+
+def station_fractions(n_stations):
+    """
+    Positions of the stations along the axis, as fractions of its length (centres of N equal bins).
+
+    :param n_stations: Number of stations.
+    :return: Array of shape (n_stations,).
+    """
+    return (np.arange(n_stations) + 0.5) / n_stations
+
+
+def limb_axes(vertices, start, end):
+    """
+    Axis of the limb of every model, from one landmark vertex to another.
+
+    :param vertices: Array of shape (N_models, N_vertices, 3).
+    :param start: Index of the proximal landmark vertex (e.g. shoulder 367).
+    :param end: Index of the distal landmark vertex (e.g. wrist 530).
+    :return: Tuple (origins (N_models, 3), unit directions (N_models, 3), lengths (N_models,)).
+    """
+    origins = np.asarray(vertices[:, start], dtype=np.float64)
+    directions = np.asarray(vertices[:, end], dtype=np.float64) - origins
+    lengths = np.linalg.norm(directions, axis=1)
+    return origins, directions / lengths[:, None], lengths
+
+
+def boundary_edges(faces):
+    """
+    Edges of every triangle that belong to a single face (the open borders of the mesh, such
+    as the cut ends of a segment).
+
+    :param faces: Zero-based int array of shape (N_triangles, 3).
+    :return: Boolean array of shape (N_triangles, 3), in the order of TRIANGLE_EDGES.
+    """
+    edges = np.sort(np.asarray(faces)[:, TRIANGLE_EDGES], axis=2).reshape(-1, 2)
+    _, inverse, counts = np.unique(edges, axis=0, return_inverse=True, return_counts=True)
+    return (counts[inverse.ravel()] == 1).reshape(-1, 3)
+
+
+def slice_sections(vertices, faces, origins, directions, lengths, n_stations=DEFAULT_STATIONS):
+    """
+    Cross-sections of every model by N planes perpendicular to its axis: perimeter and centroid
+    (the length-weighted mean of the section's segments) at every station.
+    Only the (triangle, station) pairs where the plane actually crosses the triangle are
+    evaluated, so the cost grows with the number of faces and not with faces x stations.
+    Where a plane cuts several loops (e.g. a bent joint) they are merged. Sections that cross an
+    open border of the mesh (see boundary_edges; e.g. stations that only clip the oblique cut end
+    of a segment) are partial perimeters, so they are returned as NaN.
+
+    :param vertices: Array of shape (N_models, N_vertices, 3).
+    :param faces: Zero-based int array of shape (N_triangles, 3).
+    :param origins: Axis origins of shape (N_models, 3).
+    :param directions: Unit axis directions of shape (N_models, 3).
+    :param lengths: Axis lengths of shape (N_models,).
+    :param n_stations: Number of planes, evenly spaced along the axis.
+    :return: Tuple (girths of shape (N_models, n_stations), centroids of shape (N_models, n_stations, 3));
+             stations the mesh does not reach have zero girth and NaN centroid, and open sections
+             NaN girth and centroid.
+    """
+    vertices = np.asarray(vertices, dtype=np.float64)
+    n_models = len(vertices)
+    spacing = 1.0 / n_stations
+    first = 0.5 * spacing
+
+    # Altura de cada vértice a lo largo del eje, como fracción de la longitud: (modelos, vértices)
+    heights = np.einsum("nvi,ni->nv", vertices - origins[:, None], directions) / lengths[:, None]
+    face_heights = heights[:, faces]
+    low = face_heights.min(axis=2).ravel()
+    high = face_heights.max(axis=2).ravel()
+
+    # Estaciones k con low < s_k <= high para cada triángulo de cada modelo
+    first_station = np.clip(np.floor((low - first) / spacing).astype(np.int64) + 1, 0, n_stations)
+    last_station = np.clip(np.floor((high - first) / spacing).astype(np.int64), -1, n_stations - 1)
+    counts = np.maximum(last_station - first_station + 1, 0)
+
+    # Expandir los pares (triángulo, estación) que se cortan
+    owners = np.repeat(np.arange(len(counts)), counts)
+    offsets = np.arange(len(owners)) - np.repeat(np.cumsum(counts) - counts, counts)
+    stations = first_station[owners] + offsets
+    models, triangles = np.divmod(owners, len(faces))
+    levels = first + stations * spacing
+
+    # Puntos de corte en las aristas que cruzan el plano (exactamente dos por triángulo)
+    corner_heights = face_heights[models, triangles]
+    corners = vertices[models[:, None], faces[triangles]]
+    above = corner_heights >= levels[:, None]
+    a, b = TRIANGLE_EDGES[:, 0], TRIANGLE_EDGES[:, 1]
+    crosses = above[:, a] != above[:, b]
+    denominator = np.where(crosses, corner_heights[:, b] - corner_heights[:, a], 1.0)
+    t = np.where(crosses, (levels[:, None] - corner_heights[:, a]) / denominator, 0.0)
+    points = corners[:, a] + t[..., None] * (corners[:, b] - corners[:, a])
+
+    # Un corte que atraviesa una arista del borde de la malla deja el contorno abierto
+    crosses_border = (crosses & boundary_edges(faces)[triangles]).any(axis=1)
+
+    # La arista que no cruza determina el segmento: une los puntos de las otras dos
+    starts, ends = points[:, [1, 2, 0]], points[:, [2, 0, 1]]
+    segment = np.linalg.norm(starts - ends, axis=2) * ~crosses
+    segment_lengths = segment.sum(axis=1)
+    midpoints = (0.5 * (starts + ends) * segment[..., None]).sum(axis=1)
+
+    bins = models * n_stations + stations
+    size = n_models * n_stations
+    girths = np.bincount(bins, weights=segment_lengths, minlength=size)
+    moments = np.stack([np.bincount(bins, weights=midpoints[:, axis], minlength=size) for axis in range(3)], axis=1)
+    girths[np.bincount(bins, weights=crosses_border, minlength=size) > 0] = np.nan
+    with np.errstate(invalid="ignore", divide="ignore"):
+        centroids = moments / girths[:, None]
+    return girths.reshape(n_models, n_stations), centroids.reshape(n_models, n_stations, 3)
+
+
+def slice_girths(vertices, faces, origins, directions, lengths, n_stations=DEFAULT_STATIONS):
+    """
+    Perimeter of the cross-sections of every model by N planes perpendicular to its axis
+    (see slice_sections).
+
+    :return: Array of shape (N_models, n_stations) with the girth at every station (NaN where open).
+    """
+    return slice_sections(vertices, faces, origins, directions, lengths, n_stations)[0]
+
+
+def girth_profiles(vertices, faces, start, end, n_stations=DEFAULT_STATIONS, batch_size=64):
+    """
+    Girth profile of every model of a segment, batched over models.
+
+    :param vertices: Array of shape (N_models, N_vertices, 3) (may be memory-mapped).
+    :param faces: Zero-based int array of shape (N_triangles, 3).
+    :param start: Index of the proximal landmark vertex.
+    :param end: Index of the distal landmark vertex.
+    :param n_stations: Number of stations along the axis.
+    :param batch_size: Number of models sliced per step.
+    :return: Tuple (girths of shape (N_models, n_stations), NaN at open sections, and axis lengths
+             of shape (N_models,)).
+    """
+    faces = np.asarray(faces, dtype=np.int64)
+    girths = np.empty((len(vertices), n_stations))
+    lengths = np.empty(len(vertices))
+    for begin in range(0, len(vertices), batch_size):
+        batch = np.asarray(vertices[begin:begin + batch_size], dtype=np.float64)
+        origins, directions, batch_lengths = limb_axes(batch, start, end)
+        girths[begin:begin + batch_size] = slice_girths(batch, faces, origins, directions, batch_lengths, n_stations)
+        lengths[begin:begin + batch_size] = batch_lengths
+    return girths, lengths
+
+
+def profile_dataframe(names, girths, lengths):
+    """
+    Girth profiles as a table: one row per model, one 'girth_XX' column per station.
+
+    :param names: List of model names.
+    :param girths: Array of shape (N_models, N_stations).
+    :param lengths: Axis lengths of shape (N_models,).
+    :return: DataFrame with ObjectName, axis_length and the girth columns.
+    """
+    width = len(str(girths.shape[1] - 1))
+    profile = pd.DataFrame(girths, columns=[f"girth_{k:0{width}d}" for k in range(girths.shape[1])])
+    profile.insert(0, "axis_length", lengths)
+    profile.insert(0, "ObjectName", names)
+    return profile
+
+
+def profile_summary(girths):
+    """
+    Summary features of the profiles: maximum and minimum girth and their positions along the axis,
+    over the closed sections only (NaN for a model without any).
+
+    :param girths: Array of shape (N_models, N_stations).
+    :return: DataFrame with max_girth, max_girth_position, min_girth and min_girth_position.
+    """
+    positions = station_fractions(girths.shape[1])
+    # Las estaciones sin corte (fuera de la malla) o con la sección abierta (NaN) no cuentan
+    closed = np.nan_to_num(girths, nan=0.0) > 0
+    largest = np.where(closed, girths, -np.inf)
+    smallest = np.where(closed, girths, np.inf)
+    maximum, minimum = largest.argmax(axis=1), smallest.argmin(axis=1)
+    rows = np.arange(len(girths))
+    any_closed = closed.any(axis=1)
+    return pd.DataFrame({
+        "max_girth": np.where(any_closed, largest[rows, maximum], np.nan),
+        "max_girth_position": np.where(any_closed, positions[maximum], np.nan),
+        "min_girth": np.where(any_closed, smallest[rows, minimum], np.nan),
+        "min_girth_position": np.where(any_closed, positions[minimum], np.nan),
+    })
+
+
+if __name__ == "__main__":
+    import time
+    from obj_loader import load_obj_directory, models_directory
+
+    for segment, (start, end) in {"arm": (367, 530), "leg": (8, 332)}.items():
+        directory = os.path.join(models_directory, segment)
+        vertices, names = load_obj_directory(directory)
+        faces = load_segment_faces(directory)
+        begin = time.perf_counter()
+        girths, lengths = girth_profiles(vertices, faces, start, end)
+        elapsed = time.perf_counter() - begin
+        print(f"{segment}: {len(names)} models x {girths.shape[1]} stations in {elapsed:.2f} s")
+        print(profile_summary(girths).describe())
@@ -0,0 +1,312 @@
+import numpy as np
+import pandas as pd
+
+from girth_profile import slice_sections, station_fractions
+
+# Estaciones usadas para la línea central y fracción recortada en cada extremo (cortes irregulares)
+DEFAULT_STATIONS = 60
+DEFAULT_TRIM = 0.2
+
+# Fracción mínima del eje a cada lado de la articulación y número de cortes candidatos
+MIN_PART_FRACTION = 0.25
+DEFAULT_CANDIDATES = 201
+
+
+def principal_axes(vertices):
+    """
+    Long axis of every model (principal direction of its vertices) and its extent.
+
+    :param vertices: Array of shape (N_models, N_vertices, 3), only vertices used by the faces.
+    :return: Tuple (origins (N_models, 3) at the lowest projection, unit directions (N_models, 3),
+             lengths (N_models,)).
+    """
+    centroids = vertices.mean(axis=1)
+    centered = vertices - centroids[:, None]
+    covariance = np.einsum("nvi,nvj->nij", centered, centered)
+    directions = np.linalg.eigh(covariance)[1][:, :, -1]
+    heights = np.einsum("nvi,ni->nv", centered, directions)
+    low, high = heights.min(axis=1), heights.max(axis=1)
+    return centroids + low[:, None] * directions, directions, high - low
+
+
+def side_fractions(heights, breaks):
+    """
+    Fraction of every station on the distal side of a break. Each station stands for the bin of
+    the axis around it, so the station the break falls in is split between both sides and the fit
+    changes continuously with the break instead of jumping at station boundaries.
+
+    :param heights: Station heights as fractions of the axis, shape (N_stations,), evenly spaced.
+    :param breaks: Break positions, any shape.
+    :return: Array of shape breaks.shape + (N_stations,) in [0, 1].
+    """
+    spacing = heights[1] - heights[0] if len(heights) > 1 else 1.0
+    return np.clip((heights + 0.5 * spacing - np.asarray(breaks)[..., None]) / spacing, 0.0, 1.0)
+
+
+def fit_side_lines(heights, points, weights, distal):
+    """
+    Weighted least-squares line (point at height 0 and slope) of the centerline on each side.
+    Every break candidate of every model is solved at once from 2x2 normal equations.
+
+    :param heights: Station heights, shape (N_stations,).
+    :param points: Section points of shape (N_models, N_stations, D) (0 where the weight is 0).
+    :param weights: Weight of every station, shape (N_models, N_stations).
+    :param distal: Distal fraction of every station, shape (N_models, N_candidates, N_stations).
+    :return: Tuple (proximal lines, distal lines, residuals), the lines of shape
+             (N_models, N_candidates, 2, D) and the total weighted residual of shape (N_models, N_candidates).
+    """
+    design = np.stack([np.ones_like(heights), heights], axis=1)
+    # Regularización mínima por si un lado se queda sin estaciones válidas
+    ridge = 1e-12 * np.eye(2)
+    lines, residuals = [], 0.0
+    for side in (1 - distal, distal):
+        side_weights = side * weights[:, None]
+        normal = np.einsum("nks,si,sj->nkij", side_weights, design, design) + ridge
+        moments = np.einsum("nks,si,nsj->nkij", side_weights, design, points)
+        coefficients = np.linalg.solve(normal, moments)
+        # Residuo ponderado = sum(w |y|^2) - tr(beta^T X^T W y)
+        total = np.einsum("nks,nsj,nsj->nk", side_weights, points, points)
+        residuals = residuals + total - np.einsum("nkij,nkij->nk", coefficients, moments)
+        lines.append(coefficients)
+    return lines[0], lines[1], residuals
+
+
+def fit_centerline_joints(heights, centroids, weights, n_candidates=DEFAULT_CANDIDATES,
+                          min_fraction=MIN_PART_FRACTION):
+    """
+    Fits one line to the centerline on each side of a break (least squares of the section points
+    on their height along the axis) and finds the break with the smallest total residual: a grid
+    search over candidate breaks, refined with a parabola through the residuals around the best
+    candidate, and the lines refitted at the refined break.
+
+    :param heights: Station heights as fractions of the axis, shape (N_stations,), evenly spaced.
+    :param centroids: Section points of shape (N_models, N_stations, D), proximal first (centroids,
+                      optionally with extra coordinates such as the section radius).
+    :param weights: Weight of every station (0 for stations to ignore), shape (N_models, N_stations).
+    :param n_candidates: Number of candidate breaks, evenly spaced.
+    :param min_fraction: Minimum fraction of the axis on each side of the break.
+    :return: Tuple (breaks (N_models,) as fractions of the axis, proximal lines, distal lines), where
+             each line is an array of shape (N_models, 2, D) with the point at height 0 and the slope.
+    """
+    points = np.where(weights[..., None] > 0, centroids, 0.0)
+    candidates = np.linspace(min_fraction, 1 - min_fraction, n_candidates)
+    distal = np.broadcast_to(side_fractions(heights, candidates), (len(points), n_candidates, len(heights)))
+    residuals = fit_side_lines(heights, points, weights, distal)[2]
+
+    # Vértice de la parábola por el mejor candidato y sus vecinos (a lo sumo un paso de la rejilla)
+    rows = np.arange(len(points))
+    best = np.clip(np.argmin(residuals, axis=1), 1, n_candidates - 2)
+    before, at, after = residuals[rows, best - 1], residuals[rows, best], residuals[rows, best + 1]
+    curvature = before - 2 * at + after
+    offset = np.where(curvature > 0, 0.5 * (before - after) / np.where(curvature > 0, curvature, 1.0), 0.0)
+    step = candidates[1] - candidates[0]
+    breaks = np.clip(candidates[best] + np.clip(offset, -1, 1) * step, min_fraction, 1 - min_fraction)
+
+    proximal, distal_lines, _ = fit_side_lines(heights, points, weights, side_fractions(heights, breaks)[:, None])
+    return breaks, proximal[:, 0], distal_lines[:, 0]
+
+
+def detect_joints(vertices, faces, n_stations=DEFAULT_STATIONS, trim=DEFAULT_TRIM,
+                  n_candidates=DEFAULT_CANDIDATES, min_fraction=MIN_PART_FRACTION, girth_weight=0.0,
+                  batch_size=64):
+    """
+    Estimates the proximal end, middle joint (elbow/knee) and distal end of every model from its
+    geometry alone: the segment is sliced perpendicular to its long axis, the section centroids
+    form its centerline, and the joint is the break between the two lines that best fit the
+    centerline. The proximal end is the one with the larger sections; the ends are the fitted
+    lines at the extremes of the mesh. Where the bend is gradual (e.g. the elbow) the taper of
+    the sections also locates the joint, and can be added to the fit with girth_weight.
+
+    :param vertices: Array of shape (N_models, N_vertices, 3) (may be memory-mapped).
+    :param faces: Zero-based int array of shape (N_triangles, 3).
+    :param n_stations: Number of centerline stations.
+    :param trim: Fraction of the stations ignored at each end.
+    :param n_candidates: Number of candidate joint positions along the axis.
+    :param min_fraction: Minimum fraction of the axis on each side of the joint.
+    :param girth_weight: Weight of the section radius (girth / 2 pi) fitted along with the centroids;
+                         0 uses the centerline only.
+    :param batch_size: Number of models processed per step.
+    :return: Dictionary with proximal, joint and distal points (N_models, 3), the axis
+             directions (N_models, 3), proximal to distal, and the joint position as a
+             fraction of the axis (break, (N_models,)).
+    """
+    faces = np.asarray(faces, dtype=np.int64)
+    # Los vértices sueltos (sin caras) no cuentan para el eje
+    used = np.unique(faces)
+    n_models = len(vertices)
+    result = {name: np.empty((n_models, 3)) for name in ("proximal", "joint", "distal", "axis")}
+    result["break"] = np.empty(n_models)
+    trimmed = int(round(trim * n_stations))
+    heights = station_fractions(n_stations)
+    for begin in range(0, n_models, batch_size):
+        batch = np.asarray(vertices[begin:begin + batch_size], dtype=np.float64)
+        origins, directions, lengths = principal_axes(batch[:, used])
+        girths, centroids = slice_sections(batch, faces, origins, directions, lengths, n_stations)
+
+        # Orientar de proximal (secciones mayores) a distal
+        half = n_stations // 2
+        flip = np.nansum(girths[:, :half], axis=1) < np.nansum(girths[:, -half:], axis=1)
+        girths = np.where(flip[:, None], girths[:, ::-1], girths)
+        centroids = np.where(flip[:, None, None], centroids[:, ::-1], centroids)
+        directions = np.where(flip[:, None], -directions, directions)
+
+        weights = (girths > 0).astype(np.float64)
+        weights[:, :trimmed] = 0
+        weights[:, n_stations - trimmed:] = 0
+        points = centroids
+        if girth_weight:
+            points = np.concatenate([centroids, girth_weight * girths[..., None] / (2 * np.pi)], axis=2)
+        breaks, proximal, distal = fit_centerline_joints(heights, points, weights, n_candidates, min_fraction)
+        proximal, distal = proximal[..., :3], distal[..., :3]
+
+        # Extremos: cada recta en su extremo del eje. Articulación: punto medio de las dos rectas
+        # en la altura del corte (estable aunque sean casi paralelas, donde su intersección no lo es)
+        window = slice(begin, begin + batch_size)
+        result["proximal"][window] = proximal[:, 0]
+        result["distal"][window] = distal[:, 0] + distal[:, 1]
+        result["joint"][window] = 0.5 * (proximal[:, 0] + distal[:, 0] + breaks[:, None] * (proximal[:, 1] + distal[:, 1]))
+        result["axis"][window] = directions
+        result["break"][window] = breaks
+    return result
+
+
+def joint_lengths(joints):
+    """
+    True 3D lengths between the detected points.
+
+    :param joints: Dictionary returned by detect_joints.
+    :return: Tuple (proximal lengths, distal lengths) of shape (N_models,).
+    """
+    return (np.linalg.norm(joints["joint"] - joints["proximal"], axis=1),
+            np.linalg.norm(joints["distal"] - joints["joint"], axis=1))
+
+
+def joints_dataframe(names, joints, point_names=("proximal", "joint", "distal")):
+    """
+    Detected points as a table with one X/Y/Z column per point (e.g. X_elbow).
+
+    :param names: List of model names.
+    :param joints: Dictionary returned by detect_joints.
+    :param point_names: Names given to the proximal, joint and distal points (e.g. shoulder, elbow, wrist).
+    :return: DataFrame with ObjectName and the coordinate columns.
+    """
+    table = pd.DataFrame({"ObjectName": names})
+    for axis_index, axis in enumerate("XYZ"):
+        for key, name in zip(("proximal", "joint", "distal"), point_names):
+            table[f"{axis}_{name}"] = joints[key][:, axis_index]
+    return table
+
+
+def bent_cylinder(upper_length, lower_length, angle, radii=(0.05, 0.04, 0.03), n_rings=60, n_sides=32):
+    """
+    Synthetic limb with a known joint: two tapered tubes along z joined at the origin, the distal
+    one bent by an angle about x. The rings next to the joint are mitred on the bisecting plane so
+    the surface does not fold. Used to check detect_joints.
+
+    :param upper_length: Length of the proximal tube (m).
+    :param lower_length: Length of the distal tube (m).
+    :param angle: Bend angle (radians).
+    :param radii: Radius at the proximal end, at the joint and at the distal end (m).
+    :param n_rings: Number of rings along the whole limb.
+    :param n_sides: Vertices per ring.
+    :return: Tuple (vertices (N_vertices, 3), faces (N_triangles, 3), dictionary with the true
+             proximal, joint and distal points).
+    """
+    total = upper_length + lower_length
+    arc = np.linspace(0.0, total, n_rings)
+    radius = np.interp(arc, [0.0, upper_length, total], radii)
+    direction = np.array([0.0, np.sin(angle), -np.cos(angle)])
+    # Secciones: perpendiculares a cada tubo, en el plano bisector cerca de la articulación
+    miter = np.tan(0.5 * angle) * radii[1]
+    bisector = np.array([0.0, np.sin(0.5 * angle), -np.cos(0.5 * angle)])
+    angles = np.linspace(0.0, 2 * np.pi, n_sides, endpoint=False)
+    circle = np.stack([np.cos(angles), np.sin(angles), np.zeros(n_sides)], axis=1)
+
+    rings = []
+    for position, ring_radius in zip(arc, radius):
+        offset = position - upper_length
+        if abs(offset) <= miter:
+            # Anillo de inglete: círculo del tubo proyectado sobre el plano bisector
+            normal, center = bisector, np.zeros(3)
+        elif offset < 0:
+            normal, center = np.array([0.0, 0.0, -1.0]), np.array([0.0, 0.0, -offset])
+        else:
+            normal, center = direction, offset * direction
+        y_axis = np.cross(normal, [1.0, 0.0, 0.0])
+        y_axis /= np.linalg.norm(y_axis)
+        frame = np.stack([[1.0, 0.0, 0.0], y_axis, normal])
+        rings.append(center + ring_radius * circle @ frame)
+    vertices = np.concatenate(rings)
+
+    ring_index = np.arange(n_rings - 1)[:, None] * n_sides
+    side = np.arange(n_sides)[None, :]
+    a, b = ring_index + side, ring_index + (side + 1) % n_sides
+    faces = np.concatenate([np.stack([a, b, a + n_sides], axis=-1).reshape(-1, 3),
+                            np.stack([b, b + n_sides, a + n_sides], axis=-1).reshape(-1, 3)])
+    truth = {"proximal": np.array([0.0, 0.0, upper_length]), "joint": np.zeros(3),
+             "distal": lower_length * direction}
+    return vertices, faces.astype(np.int32), truth
+
+
+def check_bent_cylinders(n_models=50, seed=0):
+    """
+    Runs detect_joints on random bent cylinders (lengths, bend, taper, pose) and measures the
+    distance from the detected points to the true ones.
+
+    :param n_models: Number of synthetic limbs.
+    :param seed: Random seed.
+    :return: Dictionary point name -> distances (m) of shape (n_models,), plus 'break'
+             (detected minus true joint position, as a fraction of the limb length).
+    """
+    rng = np.random.default_rng(seed)
+    shapes, truths = [], []
+    faces = None
+    for _ in range(n_models):
+        upper, lower = rng.uniform(0.25, 0.35), rng.uniform(0.22, 0.30)
+        radii = (rng.uniform(0.05, 0.07), rng.uniform(0.035, 0.045), rng.uniform(0.02, 0.03))
+        vertices, faces, truth = bent_cylinder(upper, lower, np.radians(rng.uniform(10, 35)), radii)
+        truth["break"] = upper / (upper + lower)
+        shapes.append(vertices)
+        truths.append(truth)
+    shapes = np.stack(shapes)
+
+    # Pose aleatoria: la detección no debe depender de la orientación ni de la posición
+    rotations, upper = np.linalg.qr(rng.normal(size=(n_models, 3, 3)))
+    rotations *= np.sign(np.diagonal(upper, axis1=1, axis2=2))[:, None]
+    rotations[np.linalg.det(rotations) < 0, :, 0] *= -1
+    translations = rng.normal(scale=0.5, size=(n_models, 3))
+    shapes = np.einsum("nij,nvj->nvi", rotations, shapes) + translations[:, None]
+    joints = detect_joints(shapes, faces)
+
+    errors = {}
+    for key in ("proximal", "joint", "distal"):
+        expected = np.einsum("nij,nj->ni", rotations, np.stack([t[key] for t in truths])) + translations
+        errors[key] = np.linalg.norm(joints[key] - expected, axis=1)
+    errors["break"] = joints["break"] - np.array([t["break"] for t in truths])
+    return errors
+
+
+if __name__ == "__main__":
+    import os
+    import time
+    from obj_loader import load_obj_directory, models_directory
+    from girth_profile import load_segment_faces
+
+    # Comprobación sintética: cilindros doblados con la articulación conocida
+    errors = check_bent_cylinders()
+    print("bent cylinders: " + ", ".join(f"{key} {errors[key].mean() * 1000:.1f} mm (max {errors[key].max() * 1000:.1f})"
+                                         for key in ("proximal", "joint", "distal")))
+
+    # Opciones de detección de sizing_pipeline.SEGMENT_CONFIGS
+    options = {"arm": {"trim": 0.25, "girth_weight": 0.5}, "leg": {}}
+    for segment, landmarks in {"arm": (367, 264, 530), "leg": (8, 95, 332)}.items():
+        directory = os.path.join(models_directory, segment)
+        vertices, names = load_obj_directory(directory)
+        faces = load_segment_faces(directory)
+        start = time.perf_counter()
+        joints = detect_joints(vertices, faces, **options[segment])
+        elapsed = time.perf_counter() - start
+        upper, lower = joint_lengths(joints)
+        along = np.einsum("ni,ni->n", joints["joint"] - vertices[:, landmarks[1]], joints["axis"])
+        print(f"{segment}: {len(names)} models in {elapsed:.2f} s; lengths {upper.mean():.3f} + {lower.mean():.3f} m; "
+              f"joint {along.mean() * 1000:.1f} ± {along.std() * 1000:.1f} mm along the axis from vertex {landmarks[1]}")
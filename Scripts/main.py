@@ -7,14 +7,12 @@ import bpy
 script_dir = r"C:\Users\oscar\OneDrive - Universidad de los andes\Universidad\TESIS\Proyecto"
 sys.path.append(script_dir)
 
-from models_generator import generate_smplx_model, generate_metadata
+from models_generator import generate_models
 
 # Generate Models
+# The metadata of each model is appended to model_metadata.csv as soon as it is exported,
+# and models already exported are skipped, so an interrupted run can simply be restarted.
+# Every segment (arm, leg, ...) is exported from the same body into its own subdirectory.
+# For several Blender processes in parallel use parallel_generation.py.
 num_models = 200 #Number of models to generate for each gender
-metadata_dict = {"index": [], "gender": []} # Metadata dict
-for index in range(num_models):
-    generate_smplx_model("male", index, metadata_dict)
-    generate_smplx_model("female", index, metadata_dict)
-    
-# Guardar los metadatos
-generate_metadata(metadata_dict)
+generate_models(range(num_models), genders=("male", "female"))
@@ -2,33 +2,72 @@ import bpy
 import os
 import sys
 import csv
+import random
 import numpy as np
 
-# Directory configuration
-script_dir = r"C:\Users\oscar\OneDrive - Universidad de los andes\Universidad\TESIS\Proyecto"
-sys.path.append(script_dir)
+# Directory configuration: the directory of this script, which also holds vertex_groups.csv
+script_dir = os.path.dirname(os.path.abspath(__file__))
+if script_dir not in sys.path:
+    sys.path.append(script_dir)
 
 from functions import load_csv, create_vertex_group, split_part, delete_object, export_model, get_model_metadata
+from segment_extraction import SEGMENT_GROUPS
 
-# Output directory
-output_directory = r"C:\Users\oscar\OneDrive - Universidad de los andes\Universidad\TESIS\Proyecto\models\leg"
-if not os.path.exists(output_directory):
-    os.makedirs(output_directory)
-    
-# Input directory
-csv_file = os.path.join(script_dir, "vertex_groups.csv")
-vertex_groups = load_csv(csv_file)
+# Output directory (one subdirectory per segment, shared model_metadata.csv); created when exporting
+output_directory = os.path.join(script_dir, "models")
 
+METADATA_FILE = "model_metadata.csv"
 
-def generate_smplx_model(gender, index, metadata_dict):
+# Input file; read on first use, not on import
+vertex_groups_file = os.path.join(script_dir, "vertex_groups.csv")
+_loaded_vertex_groups = {}
+
+
+def get_vertex_groups(path=None):
+    """
+    Vertex groups of the body, read once per file.
+
+    :param path: (str) Path of vertex_groups.csv. Defaults to the one next to this script.
+    :return: (dict) Group name -> vertex indices.
+    """
+    path = path or vertex_groups_file
+    if path not in _loaded_vertex_groups:
+        _loaded_vertex_groups[path] = load_csv(path)
+    return _loaded_vertex_groups[path]
+
+
+def model_segments(vertex_groups, segment_groups=SEGMENT_GROUPS):
+    """
+    Segments exported from every body: the known segments (e.g. arm = left_arm + left_forearm)
+    whose groups are all defined, plus one segment per group not used by any of them.
+
+    :param vertex_groups: (dict) Group name -> vertex indices.
+    :param segment_groups: (dict) Segment name -> group names.
+    :return: (dict) Segment name -> group names.
+    """
+    segments = {segment: groups for segment, groups in segment_groups.items()
+                if all(group in vertex_groups for group in groups)}
+    used = {group for groups in segments.values() for group in groups}
+    segments.update({group: [group] for group in vertex_groups if group not in used})
+    return segments
+
+
+def generate_smplx_model(gender, index, metadata_dict, output_dir=None, segments=None, vertex_groups=None):
     """
-    Generates a random SMPL-X model with the specified gender, separates specific body parts,
-    and removes unnecessary objects (original mesh and armature).
+    Generates a random SMPL-X model with the specified gender, separates every segment from the
+    same body and exports each one to its own subdirectory, removing the original mesh and armature.
 
     :param gender (str): Gender of the model. Accepted values: "male", "female".
     :param index (int): Model index number for identification.
+    :param metadata_dict (dict): Metadata dict where the index, gender and betas are appended.
+    :param output_dir (str): Base export directory. Defaults to output_directory.
+    :param segments (dict): Segment name -> vertex group names. Defaults to every segment of vertex_groups.csv.
+    :param vertex_groups (dict): Group name -> vertex indices. Defaults to get_vertex_groups().
+    :return: True if the model was exported.
     """
     print(f"Generating {gender} model {index}...")
+    vertex_groups = vertex_groups or get_vertex_groups()
+    segments = segments or model_segments(vertex_groups)
 
     # Clean the scene by removing all existing objects
     bpy.ops.object.select_all(action='SELECT')
@@ -67,8 +106,16 @@ def generate_smplx_model(gender, index, metadata_dict):
         for group_name, vertices in vertex_groups.items():
             create_vertex_group(mesh_name, group_name, vertices)
 
-        groups = ["left_thigh", "left_leg"]
-        separated_parts = split_part(mesh_name, groups)
+        # Separar todos los segmentos del mismo cuerpo; cada separación crea un objeto nuevo
+        separated = {}
+        for segment, groups in segments.items():
+            existing = set(bpy.data.objects.keys())
+            split_part(mesh_name, groups, vertex_groups)
+            new_objects = [name for name in bpy.data.objects.keys() if name not in existing]
+            if new_objects:
+                separated[segment] = new_objects[0]
+            else:
+                print(f"Error: segment '{segment}' could not be separated.")
 
         bpy.ops.object.select_all(action='DESELECT')
         if mesh_name in bpy.data.objects:
@@ -79,15 +126,138 @@ def generate_smplx_model(gender, index, metadata_dict):
         
         bpy.ops.object.select_by_type(type="ARMATURE")
         bpy.ops.object.delete()
-        
-        export_path = os.path.join(output_directory, f"{gender}_model_{index}.obj")
-        export_model(export_path)
-        print(f"Exported: {export_path}")
+
+        for segment, object_name in separated.items():
+            bpy.ops.object.select_all(action='DESELECT')
+            part = bpy.data.objects[object_name]
+            part.select_set(True)
+            bpy.context.view_layer.objects.active = part
+
+            export_path = model_export_path(gender, index, output_dir, segment)
+            os.makedirs(os.path.dirname(export_path), exist_ok=True)
+            export_model(export_path, selected_only=True)
+            print(f"Exported: {export_path}")
         
         bpy.ops.object.select_all(action='SELECT')
         bpy.ops.object.delete()
+        return len(separated) == len(segments)
     else:
         print("Error: Model generation failed!")
+        return False
+
+
+def model_export_path(gender, index, output_dir=None, segment=None):
+    """
+    Returns the OBJ path of a model.
+
+    :param gender: (str) Gender of the model.
+    :param index: (int) Model index.
+    :param output_dir: (str) Base export directory. Defaults to output_directory.
+    :param segment: (str) Segment subdirectory (e.g. "arm"). None for the base directory.
+    """
+    directory = output_dir or output_directory
+    if segment is not None:
+        directory = os.path.join(directory, segment)
+    return os.path.join(directory, f"{gender}_model_{index}.obj")
+
+
+def read_metadata_keys(metadata_paths):
+    """
+    Reads the (gender, index) pairs already recorded in one or more metadata files.
+
+    :param metadata_paths: (list) Paths of metadata CSV files; missing files are ignored.
+    :return: (set) Pairs (gender, index) of the recorded models.
+    """
+    keys = set()
+    for path in metadata_paths:
+        if not os.path.exists(path):
+            continue
+        with open(path, mode='r', newline='') as csv_file:
+            for row in csv.DictReader(csv_file):
+                keys.add((row["gender"], int(row["index"])))
+    return keys
+
+
+def append_metadata_row(metadata_path, row, replace=False):
+    """
+    Appends the metadata of one model to a CSV file, writing the header if the file is new.
+
+    :param metadata_path: (str) Path of the metadata CSV.
+    :param row: (dict) Metadata of the model (index, gender, beta_0, ...).
+    :param replace: (bool) Whether the model may already be recorded (regenerated model); its
+                    previous row is then removed, so there is one row per (index, gender).
+    """
+    if replace and os.path.exists(metadata_path):
+        key = (str(row["gender"]), int(row["index"]))
+        with open(metadata_path, mode='r', newline='') as csv_file:
+            reader = csv.DictReader(csv_file)
+            fieldnames = reader.fieldnames or list(row.keys())
+            rows = [old for old in reader if (old["gender"], int(old["index"])) != key]
+        temporary_path = metadata_path + ".tmp"
+        with open(temporary_path, mode='w', newline='') as csv_file:
+            writer = csv.DictWriter(csv_file, fieldnames=fieldnames)
+            writer.writeheader()
+            writer.writerows(rows + [row])
+            csv_file.flush()
+            os.fsync(csv_file.fileno())
+        os.replace(temporary_path, metadata_path)
+        return
+
+    write_header = not os.path.exists(metadata_path) or os.path.getsize(metadata_path) == 0
+    with open(metadata_path, mode='a', newline='') as csv_file:
+        writer = csv.DictWriter(csv_file, fieldnames=list(row.keys()))
+        if write_header:
+            writer.writeheader()
+        writer.writerow(row)
+        csv_file.flush()
+        os.fsync(csv_file.fileno())
+
+
+def generate_models(indices, genders=("male", "female"), output_dir=None, metadata_path=None,
+                    done_keys=None, seed=None, segments=None, vertex_groups_path=None):
+    """
+    Generates a range of models, exporting every segment of each body and appending the body's
+    metadata as soon as all its segments are exported. Models that are already recorded and
+    exported are skipped (so an interrupted run can resume).
+
+    :param indices: (iterable) Model indices to generate.
+    :param genders: (tuple) Genders generated for every index.
+    :param output_dir: (str) Base export directory (one subdirectory per segment). Defaults to output_directory.
+    :param metadata_path: (str) Metadata CSV where rows are appended. Defaults to model_metadata.csv in output_dir.
+    :param done_keys: (set) Pairs (gender, index) already recorded. Read from metadata_path if None.
+    :param seed: (int) Base seed; each model is seeded from it so regenerating is reproducible.
+    :param segments: (dict) Segment name -> vertex group names. Defaults to every segment of vertex_groups.csv.
+    :param vertex_groups_path: (str) Path of vertex_groups.csv. Defaults to the one next to this script.
+    :return: (int) Number of models generated in this call.
+    """
+    output_dir = output_dir or output_directory
+    vertex_groups = get_vertex_groups(vertex_groups_path)
+    segments = segments or model_segments(vertex_groups)
+    os.makedirs(output_dir, exist_ok=True)
+    metadata_path = metadata_path or os.path.join(output_dir, METADATA_FILE)
+    if done_keys is None:
+        done_keys = read_metadata_keys([metadata_path])
+
+    generated = 0
+    for index in indices:
+        for gender in genders:
+            exported = all(os.path.exists(model_export_path(gender, index, output_dir, segment)) for segment in segments)
+            if (gender, index) in done_keys and exported:
+                print(f"Skipping {gender} model {index} (already exported)")
+                continue
+
+            if seed is not None:
+                model_seed = seed + index * len(genders) + genders.index(gender)
+                random.seed(model_seed)
+                np.random.seed(model_seed)
+
+            metadata_dict = {"index": [], "gender": []}
+            if generate_smplx_model(gender, index, metadata_dict, output_dir, segments, vertex_groups):
+                append_metadata_row(metadata_path, {key: values[0] for key, values in metadata_dict.items()},
+                                    replace=(gender, index) in done_keys)
+                done_keys.add((gender, index))
+                generated += 1
+    return generated
 
 def generate_metadata(metadata_dict):
     """
@@ -95,7 +265,8 @@ def generate_metadata(metadata_dict):
 
     :param metadata_dict: (dict) Diccionario con metadatos de los modelos
     """
-    filepath = os.path.join(output_directory, "model_metadata.csv")
+    os.makedirs(output_directory, exist_ok=True)
+    filepath = os.path.join(output_directory, METADATA_FILE)
     with open(filepath, mode='w', newline='') as csv_file:
         writer = csv.DictWriter(csv_file, fieldnames=metadata_dict.keys())
         writer.writeheader()
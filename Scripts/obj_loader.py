@@ -0,0 +1,157 @@
+import io
+import os
+import re
+import glob
+import numpy as np
+import pandas as pd
+from concurrent.futures import ProcessPoolExecutor
+
+# Directorio con los segmentos exportados desde Blender
+models_directory = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "Modelos SMPL-X")
+
+
+def model_sort_key(name):
+    """
+    Sort key that orders model names like 'female_model_10' naturally (gender, then index).
+
+    :param name: Model name (file name without extension).
+    :return: Tuple usable as a sort key.
+    """
+    match = re.match(r"(.+)_model_(\d+)$", name)
+    if match:
+        return (match.group(1), int(match.group(2)))
+    return (name, -1)
+
+
+def extract_vertex_lines(data):
+    """
+    Keeps only the 'v x y z' records of an OBJ file.
+
+    :param data: Raw bytes of the OBJ file.
+    :return: Bytes with one 'v x y z' line per vertex.
+    """
+    lines = [line for line in data.splitlines() if line.startswith(b"v ")]
+    return b"\n".join(lines) + b"\n"
+
+
+def parse_vertex_lines(buffer):
+    """
+    Parses a block of 'v x y z' lines with the pandas C parser.
+
+    :param buffer: Bytes with one 'v x y z' line per vertex.
+    :return: float32 array of shape (N_vertices, 3).
+    """
+    if not buffer.strip():
+        return np.empty((0, 3), dtype=np.float32)
+    df = pd.read_csv(io.BytesIO(buffer), sep=" ", header=None, usecols=[1, 2, 3],
+                     dtype=np.float32, engine="c")
+    return df.to_numpy()
+
+
+def load_obj_vertices(file_path):
+    """
+    Reads only the vertex coordinates of a single OBJ file.
+
+    :param file_path: Path to the OBJ file.
+    :return: float32 array of shape (N_vertices, 3).
+    """
+    with open(file_path, "rb") as file:
+        data = file.read()
+    return parse_vertex_lines(extract_vertex_lines(data))
+
+
+def load_obj_faces(file_path):
+    """
+    Reads the faces of a single OBJ file as zero-based vertex indices.
+    Polygons with more than three vertices are split into a triangle fan.
+
+    :param file_path: Path to the OBJ file.
+    :return: int32 array of shape (N_triangles, 3).
+    """
+    with open(file_path, "rb") as file:
+        data = file.read()
+
+    triangles = []
+    for line in data.splitlines():
+        if not line.startswith(b"f "):
+            continue
+        # 'f v/vt/vn ...': sólo interesa el índice del vértice
+        polygon = [int(token.split(b"/")[0]) - 1 for token in line.split()[1:]]
+        triangles.extend((polygon[0], polygon[i], polygon[i + 1]) for i in range(1, len(polygon) - 1))
+    return np.array(triangles, dtype=np.int32).reshape(-1, 3)
+
+
+def _load_chunk(file_paths):
+    """
+    Loads several OBJ files with a single parser call (worker function).
+
+    :param file_paths: List of OBJ paths.
+    :return: Tuple (vertices as (N_files * N_vertices, 3) array, vertex count per file).
+    """
+    blocks = []
+    counts = []
+    for file_path in file_paths:
+        with open(file_path, "rb") as file:
+            block = extract_vertex_lines(file.read())
+        blocks.append(block)
+        counts.append(block.count(b"\n") if block.strip() else 0)
+    return parse_vertex_lines(b"".join(blocks)), counts
+
+
+def list_model_files(directory, pattern="*_model_*.obj"):
+    """
+    Lists the model OBJ files in a directory ordered by gender and index.
+
+    :param directory: Directory containing the OBJ files.
+    :param pattern: Glob pattern of the model files.
+    :return: List of file paths.
+    """
+    files = glob.glob(os.path.join(directory, pattern))
+    return sorted(files, key=lambda f: model_sort_key(os.path.splitext(os.path.basename(f))[0]))
+
+
+def load_obj_directory(directory, pattern="*_model_*.obj", workers=None):
+    """
+    Loads every model OBJ in a directory into a single contiguous vertex tensor.
+    Only the 'v' records are parsed; normals, UVs and faces are skipped.
+
+    :param directory: Directory containing the OBJ files (e.g. 'Modelos SMPL-X/arm').
+    :param pattern: Glob pattern of the model files.
+    :param workers: Number of worker processes. None uses all CPUs, 1 loads serially.
+    :return: Tuple (vertices, names) where vertices is a float32 array of shape
+             (N_models, N_vertices, 3) and names is the list of model names.
+    """
+    files = list_model_files(directory, pattern)
+    if not files:
+        raise FileNotFoundError(f"No files matching '{pattern}' in {directory}")
+
+    if workers is None:
+        workers = os.cpu_count() or 1
+    workers = max(1, min(workers, len(files)))
+
+    # Repartir los archivos en bloques contiguos, uno por proceso
+    chunks = [list(chunk) for chunk in np.array_split(np.array(files, dtype=object), workers) if len(chunk)]
+    if workers == 1:
+        results = [_load_chunk(chunk) for chunk in chunks]
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            results = list(executor.map(_load_chunk, chunks))
+
+    counts = [count for _, chunk_counts in results for count in chunk_counts]
+    if len(set(counts)) != 1:
+        raise ValueError(f"All models must have the same number of vertices, found {sorted(set(counts))}")
+
+    vertices = np.concatenate([chunk_vertices for chunk_vertices, _ in results])
+    vertices = np.ascontiguousarray(vertices.reshape(len(files), counts[0], 3))
+    names = [os.path.splitext(os.path.basename(f))[0] for f in files]
+    return vertices, names
+
+
+if __name__ == "__main__":
+    import time
+
+    for segment in ["arm", "leg"]:
+        start = time.perf_counter()
+        vertices, names = load_obj_directory(os.path.join(models_directory, segment))
+        elapsed = time.perf_counter() - start
+        print(f"{segment}: {vertices.shape[0]} models x {vertices.shape[1]} vertices loaded in {elapsed:.3f} s")
@@ -0,0 +1,309 @@
+import numpy as np
+import pandas as pd
+
+# Factor de Tukey para las vallas del IQR
+IQR_FACTOR = 1.5
+
+# Umbral del z-score robusto (Iglewicz y Hoaglin): 0.6745 * (x - mediana) / MAD
+Z_THRESHOLD = 3.5
+MAD_SCALE = 0.6745
+
+
+def sort_by_group(values, groups, n_groups):
+    """
+    Sorts every feature column by group and, within each group, by value.
+
+    :param values: Array of shape (N_models, N_features).
+    :param groups: Group index (0..n_groups-1) of every model.
+    :param n_groups: Number of groups.
+    :return: Tuple (sorted values (N_models, N_features), first row of every group, models per group).
+    """
+    order = np.argsort(values, axis=0)
+    order = np.take_along_axis(order, np.argsort(groups[order], axis=0, kind="stable"), axis=0)
+    counts = np.bincount(groups, minlength=n_groups)
+    starts = np.concatenate([[0], np.cumsum(counts)[:-1]])
+    return np.take_along_axis(values, order, axis=0), starts, counts
+
+
+def sorted_quantile(sorted_values, starts, counts, q):
+    """
+    Linear-interpolated quantile (as numpy and pandas) of every group and feature of a
+    group-sorted array.
+
+    :param sorted_values: Array returned by sort_by_group.
+    :param starts: First row of every group.
+    :param counts: Models per group.
+    :param q: Quantile in [0, 1].
+    :return: Array of shape (N_groups, N_features); NaN for empty groups.
+    """
+    position = q * np.maximum(counts - 1, 0)
+    lower = np.floor(position).astype(np.int64)
+    fraction = (position - lower)[:, None]
+    lower_rows = np.minimum(starts + lower, len(sorted_values) - 1)
+    upper_rows = np.minimum(lower_rows + 1, starts + np.maximum(counts - 1, 0))
+    result = sorted_values[lower_rows] * (1 - fraction) + sorted_values[upper_rows] * fraction
+    result[counts == 0] = np.nan
+    return result
+
+
+def group_thresholds(values, groups, n_groups, iqr_factor=IQR_FACTOR):
+    """
+    Computes the IQR fences, median and MAD of every feature in every group.
+
+    :param values: Array of shape (N_models, N_features).
+    :param groups: Group index of every model.
+    :param n_groups: Number of groups.
+    :param iqr_factor: Multiple of the IQR beyond the quartiles that marks an outlier.
+    :return: Dictionary of (N_groups, N_features) arrays: q1, q3, low, high, median, mad, count (N_groups,).
+    """
+    values = np.asarray(values, dtype=np.float64)
+    groups = np.asarray(groups, dtype=np.int64)
+    sorted_values, starts, counts = sort_by_group(values, groups, n_groups)
+    q1 = sorted_quantile(sorted_values, starts, counts, 0.25)
+    median = sorted_quantile(sorted_values, starts, counts, 0.5)
+    q3 = sorted_quantile(sorted_values, starts, counts, 0.75)
+
+    # MAD: mediana de las desviaciones absolutas a la mediana de su grupo
+    deviations = np.abs(values - median[groups])
+    sorted_deviations, _, _ = sort_by_group(deviations, groups, n_groups)
+    mad = sorted_quantile(sorted_deviations, starts, counts, 0.5)
+
+    iqr = q3 - q1
+    return {
+        "q1": q1,
+        "q3": q3,
+        "low": q1 - iqr_factor * iqr,
+        "high": q3 + iqr_factor * iqr,
+        "median": median,
+        "mad": mad,
+        "count": counts,
+    }
+
+
+def flag_values(values, groups, thresholds, z_threshold=Z_THRESHOLD):
+    """
+    Flags the values outside the IQR fences or beyond the robust z-score threshold of their group.
+
+    :param values: Array of shape (N_models, N_features).
+    :param groups: Group index of every model.
+    :param thresholds: Dictionary returned by group_thresholds.
+    :param z_threshold: Absolute robust z-score above which a value is an outlier.
+    :return: Tuple (IQR flags, MAD flags, robust z-scores), each of shape (N_models, N_features).
+    """
+    values = np.asarray(values, dtype=np.float64)
+    groups = np.asarray(groups, dtype=np.int64)
+    iqr_flags = (values < thresholds["low"][groups]) | (values > thresholds["high"][groups])
+
+    mad = thresholds["mad"][groups]
+    with np.errstate(divide="ignore", invalid="ignore"):
+        robust_z = MAD_SCALE * (values - thresholds["median"][groups]) / mad
+    # Con MAD nula sólo son atípicos los valores distintos de la mediana
+    robust_z = np.where(mad > 0, robust_z, np.where(values == thresholds["median"][groups], 0.0, np.inf))
+    return iqr_flags, np.abs(robust_z) > z_threshold, robust_z
+
+
+def outside_all_groups(values, thresholds):
+    """
+    Marks the models that are inside the IQR fences of no group on every feature,
+    i.e. the bodies that no size fits.
+
+    :param values: Array of shape (N_models, N_features).
+    :param thresholds: Dictionary returned by group_thresholds.
+    :return: Boolean array of shape (N_models,).
+    """
+    values = np.asarray(values, dtype=np.float64)[:, None, :]
+    inside = (values >= thresholds["low"][None]) & (values <= thresholds["high"][None])
+    return ~np.any(np.all(inside, axis=2), axis=1)
+
+
+def flags_to_dataframe(index, columns, iqr_flags, mad_flags, robust_z, outside=None):
+    """
+    Builds the per-model flag table.
+
+    :return: DataFrame with '{feature}_iqr', '{feature}_mad' and '{feature}_z' columns, 'outlier_iqr',
+             'outlier_mad' (any feature) and, if given, 'outside_all_sizes'.
+    """
+    table = {}
+    for position, column in enumerate(columns):
+        table[f"{column}_iqr"] = iqr_flags[:, position]
+        table[f"{column}_mad"] = mad_flags[:, position]
+        table[f"{column}_z"] = robust_z[:, position]
+    table["outlier_iqr"] = iqr_flags.any(axis=1)
+    table["outlier_mad"] = mad_flags.any(axis=1)
+    if outside is not None:
+        table["outside_all_sizes"] = outside
+    return pd.DataFrame(table, index=index)
+
+
+def flag_outliers(features, columns=None, group="size", iqr_factor=IQR_FACTOR, z_threshold=Z_THRESHOLD):
+    """
+    Flags the IQR and robust z-score outliers of every feature within every size in one pass.
+
+    :param features: DataFrame with one row per model and a group column.
+    :param columns: Features to analyze. Defaults to every numeric column.
+    :param group: Column with the size of every model.
+    :param iqr_factor: Multiple of the IQR beyond the quartiles that marks an outlier.
+    :param z_threshold: Absolute robust z-score above which a value is an outlier.
+    :return: Tuple (flag DataFrame aligned with features, thresholds dictionary with a 'groups' entry).
+    """
+    if columns is None:
+        columns = [column for column in features.select_dtypes("number").columns if column != "cluster"]
+    labels, groups = np.unique(features[group].to_numpy(), return_inverse=True)
+    values = features[columns].to_numpy(dtype=np.float64)
+
+    thresholds = group_thresholds(values, groups, len(labels), iqr_factor)
+    iqr_flags, mad_flags, robust_z = flag_values(values, groups, thresholds, z_threshold)
+    outside = outside_all_groups(values, thresholds)
+    thresholds.update({"groups": labels, "columns": list(columns)})
+    return flags_to_dataframe(features.index, columns, iqr_flags, mad_flags, robust_z, outside), thresholds
+
+
+def summarize_outliers(features, flags, group="size"):
+    """
+    Counts the outliers of every feature and size.
+
+    :param features: DataFrame with the group column.
+    :param flags: DataFrame returned by flag_outliers.
+    :param group: Column with the size of every model.
+    :return: DataFrame with one row per size and one count column per flag.
+    """
+    counted = flags[[column for column in flags.columns if not column.endswith("_z")]]
+    return counted.groupby(features[group].to_numpy()).sum().astype(int).rename_axis(group).reset_index()
+
+
+def sorted_median_deviation(sorted_values, center):
+    """
+    Median absolute deviation from a center of every column of a column-wise sorted array,
+    without computing the deviations. The k-th smallest deviation is the smallest half-width of a
+    window of k + 1 consecutive sorted values around the center, min_j max(c - s[j], s[j+k] - c),
+    and the optimal j is where s[j] + s[j+k] crosses 2c, found by bisection (O(log n) per column).
+
+    :param sorted_values: Array of shape (N, N_features), every column sorted; N >= 1.
+    :param center: Array of shape (N_features,) (e.g. the median of every column).
+    :return: Array of shape (N_features,), interpolated as numpy.median for even N.
+    """
+    n, n_features = sorted_values.shape
+    columns = np.arange(n_features)
+
+    def kth_deviation(k):
+        low = np.zeros(n_features, dtype=np.int64)
+        high = np.full(n_features, n - k, dtype=np.int64)
+        while np.any(low < high):
+            active = low < high
+            middle = np.minimum((low + high) // 2, n - k - 1)
+            crossed = sorted_values[middle, columns] + sorted_values[middle + k, columns] >= 2 * center
+            high = np.where(active & crossed, middle, high)
+            low = np.where(active & ~crossed, middle + 1, low)
+        best = np.full(n_features, np.inf)
+        for start in (low - 1, low):
+            valid = (start >= 0) & (start <= n - k - 1)
+            start = np.clip(start, 0, n - k - 1)
+            width = np.maximum(center - sorted_values[start, columns], sorted_values[start + k, columns] - center)
+            best = np.where(valid, np.minimum(best, width), best)
+        return best
+
+    if n % 2:
+        return kth_deviation(n // 2)
+    return 0.5 * (kth_deviation(n // 2 - 1) + kth_deviation(n // 2))
+
+
+class OutlierMonitor:
+    """
+    Incremental outlier analysis for populations that arrive in batches. The feature
+    values of every size are kept column-wise sorted (a few floats per model) and every batch
+    is merged into them, so the thresholds after each batch are exact and equal to a single
+    flag_outliers call. Only the sizes present in a batch are recomputed, from their sorted
+    values: quartiles by index and MAD by bisection, without a pass over the history.
+    """
+
+    def __init__(self, columns, group="size", iqr_factor=IQR_FACTOR, z_threshold=Z_THRESHOLD):
+        """
+        :param columns: Features to analyze.
+        :param group: Column with the size of every model.
+        :param iqr_factor: Multiple of the IQR beyond the quartiles that marks an outlier.
+        :param z_threshold: Absolute robust z-score above which a value is an outlier.
+        """
+        self.columns = list(columns)
+        self.group = group
+        self.iqr_factor = iqr_factor
+        self.z_threshold = z_threshold
+        self.sorted_values = {}
+        self.group_statistics = {}
+        self.thresholds = None
+
+    @property
+    def count(self):
+        return sum(len(values) for values in self.sorted_values.values())
+
+    def _merge(self, label, batch):
+        """
+        Merges a batch of one size into its sorted values (column by column, searchsorted + insert).
+        """
+        batch = np.sort(batch, axis=0)
+        if label not in self.sorted_values:
+            self.sorted_values[label] = batch
+            return
+        history = self.sorted_values[label]
+        self.sorted_values[label] = np.stack([
+            np.insert(history[:, column], np.searchsorted(history[:, column], batch[:, column], side="right"),
+                      batch[:, column])
+            for column in range(history.shape[1])
+        ], axis=1)
+
+    def _refresh(self, labels):
+        """
+        Recomputes the quartiles, median and MAD of the given sizes and rebuilds the thresholds.
+        """
+        for label in labels:
+            values = self.sorted_values[label]
+            starts, counts = np.array([0]), np.array([len(values)])
+            q1, median, q3 = (sorted_quantile(values, starts, counts, q)[0] for q in (0.25, 0.5, 0.75))
+            self.group_statistics[label] = (q1, median, q3, sorted_median_deviation(values, median))
+
+        labels = sorted(self.group_statistics)
+        q1, median, q3, mad = (np.stack(statistic) for statistic in zip(*(self.group_statistics[label]
+                                                                           for label in labels)))
+        iqr = q3 - q1
+        self.thresholds = {
+            "q1": q1, "q3": q3,
+            "low": q1 - self.iqr_factor * iqr, "high": q3 + self.iqr_factor * iqr,
+            "median": median, "mad": mad,
+            "count": np.array([len(self.sorted_values[label]) for label in labels]),
+            "groups": np.array(labels), "columns": self.columns,
+        }
+
+    def update(self, features):
+        """
+        Adds a batch of models and flags it against the updated thresholds.
+
+        :param features: DataFrame with the feature columns and the group column.
+        :return: Flag DataFrame of the batch (see flag_outliers).
+        """
+        values = features[self.columns].to_numpy(dtype=np.float64)
+        labels = features[self.group].to_numpy()
+        batch_labels = np.unique(labels)
+        for label in batch_labels:
+            self._merge(label, values[labels == label])
+        self._refresh(batch_labels)
+        return self.flag(features)
+
+    def flag(self, features):
+        """
+        Flags models against the current thresholds without adding them.
+
+        :param features: DataFrame with the feature columns and the group column.
+        :return: Flag DataFrame (see flag_outliers).
+        """
+        if self.thresholds is None:
+            raise ValueError("The monitor has no models yet; call update() first.")
+        values = features[self.columns].to_numpy(dtype=np.float64)
+        labels = features[self.group].to_numpy()
+        known = self.thresholds["groups"]
+        groups = np.minimum(np.searchsorted(known, labels), len(known) - 1)
+        unknown = known[groups] != labels
+        if np.any(unknown):
+            raise ValueError(f"Unknown {self.group} {np.unique(labels[unknown]).tolist()}; "
+                             f"the monitor has seen {known.tolist()}.")
+        iqr_flags, mad_flags, robust_z = flag_values(values, groups, self.thresholds, self.z_threshold)
+        outside = outside_all_groups(values, self.thresholds)
+        return flags_to_dataframe(features.index, self.columns, iqr_flags, mad_flags, robust_z, outside)
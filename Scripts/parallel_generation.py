@@ -0,0 +1,136 @@
+import os
+import sys
+import csv
+import glob
+import time
+import argparse
+import subprocess
+
+METADATA_FILE = "model_metadata.csv"
+worker_script = os.path.join(os.path.dirname(os.path.abspath(__file__)), "generator_worker.py")
+
+
+def shard_indices(num_models, workers):
+    """
+    Splits the model index range into contiguous shards, one per worker.
+
+    :param num_models: (int) Number of models per gender.
+    :param workers: (int) Number of Blender processes.
+    :return: (list) Pairs (start, stop) of non-empty shards.
+    """
+    workers = max(1, min(workers, num_models))
+    bounds = [round(i * num_models / workers) for i in range(workers + 1)]
+    return [(start, stop) for start, stop in zip(bounds[:-1], bounds[1:]) if stop > start]
+
+
+def worker_command(blender, start, stop, output_dir, worker, seed=None, genders=("male", "female"), segments=None):
+    """
+    Builds the command line of a headless Blender worker.
+
+    :return: (list) Command arguments for subprocess.
+    """
+    command = [blender, "--background", "--python", worker_script, "--",
+               "--start", str(start), "--stop", str(stop),
+               "--output-dir", output_dir, "--worker", str(worker),
+               "--genders", *genders]
+    if seed is not None:
+        command += ["--seed", str(seed)]
+    if segments:
+        command += ["--segments", *segments]
+    return command
+
+
+def merge_metadata(output_dir, genders=("male", "female")):
+    """
+    Merges the per-worker metadata fragments into model_metadata.csv, ordered by index
+    and gender as the serial generator writes it, and removes the fragments.
+
+    :param output_dir: (str) Directory with the exported models.
+    :param genders: (tuple) Gender order within each index.
+    :return: (int) Number of rows in the merged file.
+    """
+    metadata_path = os.path.join(output_dir, METADATA_FILE)
+    parts = sorted(glob.glob(os.path.join(output_dir, "model_metadata.part*.csv")))
+
+    rows = {}
+    fieldnames = None
+    for path in ([metadata_path] if os.path.exists(metadata_path) else []) + parts:
+        with open(path, mode='r', newline='') as csv_file:
+            reader = csv.DictReader(csv_file)
+            fieldnames = fieldnames or reader.fieldnames
+            for row in reader:
+                rows[(row["gender"], int(row["index"]))] = row
+
+    if fieldnames is None:
+        return 0
+
+    gender_order = {gender: position for position, gender in enumerate(genders)}
+    ordered = sorted(rows.items(), key=lambda item: (item[0][1], gender_order.get(item[0][0], len(genders))))
+
+    temporary_path = metadata_path + ".tmp"
+    with open(temporary_path, mode='w', newline='') as csv_file:
+        writer = csv.DictWriter(csv_file, fieldnames=fieldnames)
+        writer.writeheader()
+        writer.writerows(row for _, row in ordered)
+    os.replace(temporary_path, metadata_path)
+
+    for path in parts:
+        os.remove(path)
+    return len(ordered)
+
+
+def run_parallel_generation(blender, num_models, output_dir, workers=None, seed=None, genders=("male", "female"),
+                            segments=None):
+    """
+    Generates num_models models per gender with several headless Blender processes.
+    Each worker appends its metadata as models finish; rerunning skips exported models.
+
+    :param blender: (str) Path of the Blender executable.
+    :param num_models: (int) Number of models per gender.
+    :param output_dir: (str) Base export directory (one subdirectory per segment, shared metadata).
+    :param workers: (int) Number of Blender processes. Defaults to the number of CPUs.
+    :param seed: (int) Base seed for reproducible shapes.
+    :param genders: (tuple) Genders generated for every index.
+    :param segments: (list) Segments to export. Defaults to every segment of vertex_groups.csv.
+    :return: (list) Return codes of the workers.
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    shards = shard_indices(num_models, workers or os.cpu_count() or 1)
+
+    start_time = time.perf_counter()
+    processes = []
+    for worker, (start, stop) in enumerate(shards):
+        log_path = os.path.join(output_dir, f"worker{worker}.log")
+        log_file = open(log_path, "a")
+        command = worker_command(blender, start, stop, output_dir, worker, seed, genders, segments)
+        processes.append((subprocess.Popen(command, stdout=log_file, stderr=subprocess.STDOUT), log_file))
+        print(f"Worker {worker}: models [{start}, {stop}) -> {log_path}")
+
+    return_codes = []
+    for process, log_file in processes:
+        return_codes.append(process.wait())
+        log_file.close()
+
+    merged = merge_metadata(output_dir, genders)
+    print(f"{merged} models recorded in {os.path.join(output_dir, METADATA_FILE)} "
+          f"({time.perf_counter() - start_time:.1f} s)")
+    failed = [worker for worker, code in enumerate(return_codes) if code != 0]
+    if failed:
+        print(f"Workers {failed} failed; run again to resume the missing models.")
+    return return_codes
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Generación paralela y reanudable de modelos SMPL-X.")
+    parser.add_argument("--blender", default="blender", help="Ejecutable de Blender")
+    parser.add_argument("--num-models", type=int, default=200, help="Número de modelos por género")
+    parser.add_argument("--output-dir", required=True)
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--seed", type=int, default=None)
+    parser.add_argument("--segments", nargs="+", default=None, help="Segmentos a exportar (por defecto todos)")
+    args = parser.parse_args()
+
+    codes = run_parallel_generation(args.blender, args.num_models, args.output_dir, args.workers, args.seed,
+                                    segments=args.segments)
+    # Un worker terminado por una señal devuelve un código negativo
+    sys.exit(1 if any(codes) else 0)
@@ -0,0 +1,65 @@
+import numpy as np
+
+
+def ring_segments(ring, closed=False):
+    """
+    Returns the start and end vertex indices of every segment of a ring.
+
+    :param ring: Ordered list of vertex indices.
+    :param closed: Whether the last vertex is joined back to the first one.
+    :return: Tuple (start, end) of int arrays.
+    """
+    ring = np.asarray(ring, dtype=np.intp)
+    if closed and len(ring) > 2:
+        return ring, np.roll(ring, -1)
+    return ring[:-1], ring[1:]
+
+
+def ring_length(vertices, ring, closed=False):
+    """
+    Computes the length of a vertex ring for every model at once.
+
+    :param vertices: Array of shape (N_models, N_vertices, 3).
+    :param ring: Ordered list of vertex indices (e.g. upper_arm_vertices).
+    :param closed: Whether the last vertex is joined back to the first one.
+    :return: Array of shape (N_models,) with the ring length of each model.
+    """
+    start, end = ring_segments(ring, closed)
+    vertices = np.asarray(vertices)
+    differences = vertices[:, end].astype(np.float64) - vertices[:, start]
+    return np.linalg.norm(differences, axis=2).sum(axis=1)
+
+
+def ring_lengths(vertices, rings, closed=False):
+    """
+    Computes the length of several vertex rings for every model with a single gather.
+
+    :param vertices: Array of shape (N_models, N_vertices, 3).
+    :param rings: Dictionary where keys are measurement names and values are ordered lists of vertex indices.
+    :param closed: Bool for all rings, or dictionary of bools by ring name.
+    :return: Dictionary where keys are measurement names and values are arrays of shape (N_models,).
+    """
+    names = list(rings)
+    starts, ends, owners = [], [], []
+    for column, name in enumerate(names):
+        ring_closed = closed.get(name, False) if isinstance(closed, dict) else closed
+        start, end = ring_segments(rings[name], ring_closed)
+        starts.append(start)
+        ends.append(end)
+        owners.append(np.full(len(start), column))
+
+    starts = np.concatenate(starts)
+    ends = np.concatenate(ends)
+    owners = np.concatenate(owners)
+
+    # Longitud de todos los segmentos de todos los anillos: (modelos, segmentos)
+    vertices = np.asarray(vertices)
+    differences = vertices[:, ends].astype(np.float64) - vertices[:, starts]
+    segment_lengths = np.linalg.norm(differences, axis=2)
+
+    # Sumar los segmentos de cada anillo con una matriz de pertenencia
+    membership = np.zeros((len(owners), len(names)), dtype=np.float64)
+    membership[np.arange(len(owners)), owners] = 1
+    totals = segment_lengths @ membership
+
+    return {name: totals[:, column] for column, name in enumerate(names)}
@@ -0,0 +1,489 @@
+import os
+import numpy as np
+import pandas as pd
+from scipy.spatial import cKDTree
+
+from alignment import kabsch
+from shape_model import load_or_fit_shape_model, fit_shape_model
+
+# ICP: iteraciones máximas, mejora mínima del error RMS (m) y descarte de correspondencias lejanas
+ICP_MAX_ITERATIONS = 30
+ICP_TOLERANCE = 1e-5
+ICP_TRIM = 2.5
+
+# Poses iniciales: giros alrededor del eje largo y puntos/iteraciones de la búsqueda gruesa
+ICP_ROLLS = 4
+COARSE_POINTS = 200
+COARSE_ITERATIONS = 5
+
+# Iteraciones máximas del ajuste conjunto de pose y forma
+JOINT_MAX_ITERATIONS = 15
+
+# Puntos del escaneo usados para el registro (submuestreo determinista) y ruido supuesto del escaneo (m)
+MAX_SCAN_POINTS = 3000
+SCAN_NOISE = 0.002
+
+# Subdivisiones por arista de las muestras de la superficie del modelo
+SURFACE_ORDER = 2
+
+# Vecinos usados para estimar las normales del escaneo (índices sin caras)
+NORMAL_NEIGHBOURS = 12
+
+# Modos del modelo de forma usados por el índice (los que explican el 99% no bastan para distinguir individuos)
+INDEX_COMPONENTS = 20
+
+# Claves del modelo de forma que se guardan con el índice
+INDEX_KEYS = ("mean", "components", "variances", "scores")
+
+
+def load_scan(path):
+    """
+    Reads a scanned point cloud: OBJ ('v' records), .npy, or a text file with x y z columns.
+
+    :param path: Path to the scan.
+    :return: float64 array of shape (N_points, 3).
+    """
+    if path.endswith(".obj"):
+        from obj_loader import load_obj_vertices
+        points = load_obj_vertices(path)
+    elif path.endswith(".npy"):
+        points = np.load(path)
+    else:
+        points = np.loadtxt(path, delimiter="," if path.endswith(".csv") else None, usecols=(0, 1, 2))
+    return np.asarray(points, dtype=np.float64).reshape(-1, 3)
+
+
+def subsample(points, max_points=MAX_SCAN_POINTS, seed=0):
+    """
+    Deterministic random subset of a point cloud.
+
+    :param points: Array of shape (N_points, 3).
+    :param max_points: Maximum number of points kept.
+    :return: Array of shape (min(N_points, max_points), 3).
+    """
+    if len(points) <= max_points:
+        return points
+    return points[np.random.default_rng(seed).choice(len(points), max_points, replace=False)]
+
+
+def principal_frame(points):
+    """
+    Centroid and principal axes (columns, largest variance first) of a point set.
+    """
+    centroid = points.mean(axis=0)
+    _, vectors = np.linalg.eigh(np.cov((points - centroid).T))
+    return centroid, vectors[:, ::-1]
+
+
+def axis_rotation(axis, angle):
+    """
+    Rotation matrix of an angle about a unit axis (Rodrigues).
+    """
+    cross = np.array([[0, -axis[2], axis[1]], [axis[2], 0, -axis[0]], [-axis[1], axis[0], 0]])
+    return np.eye(3) + np.sin(angle) * cross + (1 - np.cos(angle)) * cross @ cross
+
+
+def initial_poses(points, target, n_rolls=ICP_ROLLS):
+    """
+    Candidate rigid poses: the long axis of the scan on the long axis of the target, in both
+    directions, at n_rolls angles about it (limb sections are too round for the other principal
+    axes to fix the roll).
+
+    :return: List of (rotation, translation) tuples.
+    """
+    scan_centroid, scan_axes = principal_frame(points)
+    target_centroid, target_axes = principal_frame(target)
+    poses = []
+    for sign in (1, -1):
+        signs = np.array([sign, 1, sign * np.linalg.det(target_axes) * np.linalg.det(scan_axes)])
+        base = target_axes @ np.diag(signs) @ scan_axes.T
+        for angle in np.arange(n_rolls) * 2 * np.pi / n_rolls:
+            rotation = axis_rotation(target_axes[:, 0], angle) @ base
+            poses.append((rotation, target_centroid - rotation @ scan_centroid))
+    return poses
+
+
+def correspondence_mask(distances, trim=ICP_TRIM, min_distance=3 * SCAN_NOISE):
+    """
+    Correspondences kept for fitting: those within trim times the median distance, or within
+    min_distance (so that a near-perfect match does not discard most of them).
+
+    :param distances: Array of correspondence distances.
+    :param trim: Rejection threshold in medians; None keeps every correspondence.
+    :param min_distance: Distance always accepted (m).
+    :return: Boolean array.
+    """
+    if not trim:
+        return np.ones(len(distances), dtype=bool)
+    return distances <= max(trim * np.median(distances), min_distance)
+
+
+def rotation_from_vector(vector):
+    """
+    Rotation matrix of a rotation vector (axis times angle).
+    """
+    angle = np.linalg.norm(vector)
+    return axis_rotation(vector / angle, angle) if angle > 0 else np.eye(3)
+
+
+def point_to_plane_step(points, targets, normals):
+    """
+    Small rigid motion minimizing sum ((R p + t - q) . n)^2, linearized in the rotation.
+
+    :param points: Current positions of the moving points, shape (N, 3).
+    :param targets: Matched target points, shape (N, 3).
+    :param normals: Unit normals at the targets, shape (N, 3).
+    :return: Tuple (rotation update, translation update) to apply as R' = U R, t' = U t + dt.
+    """
+    jacobian = np.hstack([np.cross(points, normals), normals])
+    residual = ((points - targets) * normals).sum(axis=1)
+    solution = np.linalg.solve(jacobian.T @ jacobian + 1e-12 * np.eye(6), -jacobian.T @ residual)
+    return rotation_from_vector(solution[:3]), solution[3:]
+
+
+def icp(points, target, tree=None, rotation=None, translation=None, max_iterations=ICP_MAX_ITERATIONS,
+        tolerance=ICP_TOLERANCE, trim=ICP_TRIM, normals=None):
+    """
+    Rigid iterative closest point registration of a point cloud to a target point set.
+    With target normals the point-to-plane distance is minimized, which slides along smooth
+    surfaces and converges in far fewer iterations; otherwise point-to-point (Kabsch).
+    Correspondences far from the rest are ignored (clutter, holes; see correspondence_mask).
+
+    :param points: Scan points of shape (N_points, 3).
+    :param target: Target points of shape (N_target, 3) (e.g. samples of the mean surface).
+    :param tree: Optional cKDTree of the target.
+    :param rotation: Initial rotation (defaults to the identity).
+    :param translation: Initial translation (defaults to zero).
+    :param max_iterations: Maximum number of iterations.
+    :param tolerance: Minimum improvement of the RMS distance to keep iterating.
+    :param trim: Rejection threshold in medians; None keeps every correspondence.
+    :param normals: Optional unit normals of the target points, shape (N_target, 3).
+    :return: Tuple (rotation, translation, RMS distance, iterations) with points @ R.T + t on the target.
+    """
+    tree = tree if tree is not None else cKDTree(target)
+    rotation = np.eye(3) if rotation is None else rotation
+    translation = np.zeros(3) if translation is None else translation
+    previous = np.inf
+    for iteration in range(1, max_iterations + 1):
+        moved = points @ rotation.T + translation
+        distances, indices = tree.query(moved)
+        error = np.sqrt(np.mean(distances ** 2))
+        if previous - error < tolerance:
+            break
+        previous = error
+        keep = correspondence_mask(distances, trim)
+        if normals is None:
+            rotations, translations = kabsch(points[keep][None], target[indices[keep]])
+            rotation, translation = rotations[0], translations[0]
+        else:
+            update, step = point_to_plane_step(moved[keep], target[indices[keep]], normals[indices[keep]])
+            rotation, translation = update @ rotation, update @ translation + step
+    return rotation, translation, error, iteration
+
+
+def surface_samples(faces, order=SURFACE_ORDER):
+    """
+    Fixed points on the surface of a mesh: a barycentric lattice of the given order on every
+    triangle (vertices and edge points shared by neighbouring triangles appear once). Every sample
+    is a fixed combination of three vertices, so the samples of any shape are linear in its vertices.
+
+    :param faces: Zero-based int array of shape (N_triangles, 3).
+    :param order: Lattice subdivisions per edge (1 gives the vertices only).
+    :return: Tuple (vertex indices (N_samples, 3), barycentric weights (N_samples, 3)).
+    """
+    faces = np.asarray(faces, dtype=np.int64)
+    lattice = np.array([(i, j, order - i - j) for i in range(order + 1) for j in range(order + 1 - i)])
+    indices = np.repeat(faces[:, None], len(lattice), axis=1).reshape(-1, 3)
+    weights = np.tile(lattice, (len(faces), 1))
+
+    # Clave canónica (vértice, peso) ordenada por vértice, sin los pesos nulos, para quitar repetidos
+    indices = np.where(weights > 0, indices, -1)
+    order_in_row = np.argsort(indices, axis=1)
+    indices = np.take_along_axis(indices, order_in_row, axis=1)
+    weights = np.take_along_axis(weights, order_in_row, axis=1)
+    _, unique = np.unique(np.concatenate([indices, weights], axis=1), axis=0, return_index=True)
+    indices, weights = indices[np.sort(unique)], weights[np.sort(unique)]
+    return np.maximum(indices, 0), weights / order
+
+
+def sample_shape(shapes, indices, weights):
+    """
+    Surface samples of one or several shapes (see surface_samples).
+
+    :param shapes: Array of shape (..., N_vertices, 3).
+    :return: Array of shape (..., N_samples, 3).
+    """
+    return (shapes[..., indices, :] * weights[..., None]).sum(axis=-2)
+
+
+def vertex_normals(vertices, faces):
+    """
+    Area-weighted unit vertex normals of a mesh.
+
+    :param vertices: Array of shape (N_vertices, 3).
+    :param faces: Zero-based int array of shape (N_triangles, 3).
+    :return: Array of shape (N_vertices, 3).
+    """
+    corners = vertices[faces]
+    face_normals = np.cross(corners[:, 1] - corners[:, 0], corners[:, 2] - corners[:, 0])
+    normals = np.zeros_like(vertices)
+    for corner in range(3):
+        np.add.at(normals, faces[:, corner], face_normals)
+    return normals / np.maximum(np.linalg.norm(normals, axis=1, keepdims=True), 1e-12)
+
+
+def point_normals(points, tree=None, k=NORMAL_NEIGHBOURS):
+    """
+    Unit normals of a point cloud: the direction of least variance of the k nearest points
+    (the sign is arbitrary, which does not matter for point-to-plane distances).
+
+    :param points: Array of shape (N_points, 3).
+    :param tree: Optional cKDTree of the points.
+    :param k: Number of neighbours.
+    :return: Array of shape (N_points, 3).
+    """
+    tree = tree if tree is not None else cKDTree(points)
+    _, neighbours = tree.query(points, k=min(k, len(points)))
+    local = points[neighbours] - points[neighbours].mean(axis=1, keepdims=True)
+    return np.linalg.eigh(np.einsum("nki,nkj->nij", local, local))[1][:, :, 0]
+
+
+def pose_and_shape_step(points, translation, mean, normal_components, normals, variances, noise):
+    """
+    One Gauss-Newton step of the joint fit of pose and mode scores, in point-to-plane form:
+    minimizes sum ((R y + t - (mean + C s)) . n)^2 + noise^2 sum s_k^2 / variance_k, linearized in
+    the rotation. The scores are solved in full, not as an increment.
+
+    :param points: Scan points matched to the model points, rotated by the current rotation, shape (N, 3).
+    :param translation: Current translation, shape (3,).
+    :param mean: Mean shape at the matched model points, shape (N, 3).
+    :param normal_components: Modes at the matched model points projected on their normals, shape (N, K).
+    :param normals: Unit normals at the matched model points, shape (N, 3).
+    :param variances: Variance of every mode, shape (K,).
+    :param noise: Assumed standard deviation of the scan (m).
+    :return: Tuple (rotation update, translation update, scores (K,)).
+    """
+    jacobian = np.hstack([np.cross(points, normals), normals, -normal_components])
+    residual = ((points + translation - mean) * normals).sum(axis=1)
+    normal = jacobian.T @ jacobian
+    normal[6:, 6:] += np.diag(noise ** 2 / np.maximum(variances, 1e-12))
+    normal[:6, :6] += 1e-12 * np.eye(6)
+    solution = np.linalg.solve(normal, -jacobian.T @ residual)
+    return rotation_from_vector(solution[:3]), solution[3:6], solution[6:]
+
+
+class ScanIndex:
+    """
+    Nearest-body and nearest-size lookup for scanned limbs. A scan is registered rigidly to the
+    segment's statistical shape model (ICP against a KD-tree of points sampled on the mean surface,
+    then on the fitted surface), projected onto its modes, and the population members closest in
+    mode space are found with a KD-tree over the precomputed scores.
+    """
+
+    def __init__(self, model, names, sizes=None, faces=None, order=SURFACE_ORDER):
+        """
+        :param model: Shape model dictionary with mean, components, variances and scores.
+        :param names: Model names, in the order of the scores.
+        :param sizes: Optional size label of every model (e.g. from '<prefix>_sizes.csv').
+        :param faces: Faces of the segment; without them only the vertices are matched to the scan.
+        :param order: Surface sampling order (see surface_samples).
+        """
+        self.model = {key: np.asarray(model[key], dtype=np.float64) for key in INDEX_KEYS}
+        self.names = np.asarray(names, dtype=str)
+        self.sizes = None if sizes is None else np.asarray(sizes, dtype=str)
+        self.faces = None if faces is None else np.asarray(faces, dtype=np.int32)
+        self.tree = cKDTree(self.model["scores"])
+
+        # Modelo de forma evaluado en las muestras de la superficie
+        if self.faces is None:
+            indices, weights = np.arange(len(self.model["mean"]))[:, None], np.ones((len(self.model["mean"]), 1))
+            self.normals = None
+        else:
+            indices, weights = surface_samples(self.faces, order)
+            normals = sample_shape(vertex_normals(self.model["mean"], self.faces), indices, weights)
+            self.normals = normals / np.maximum(np.linalg.norm(normals, axis=1, keepdims=True), 1e-12)
+        self.mean = sample_shape(self.model["mean"], indices, weights)
+        self.components = sample_shape(self.model["components"], indices, weights)
+        self.mean_tree = cKDTree(self.mean)
+        if self.normals is not None:
+            self.normal_components = np.einsum("kni,ni->nk", self.components, self.normals)
+
+    @classmethod
+    def build(cls, vertices, names, sizes=None, faces=None, n_components=INDEX_COMPONENTS, cache_dir=None):
+        """
+        Fits (or loads from the cache) the shape model of a population and indexes its scores.
+
+        :param vertices: Array of shape (N_models, N_vertices, 3).
+        :param names: Model names.
+        :param sizes: Optional size label of every model.
+        :param faces: Faces of the segment (see load_segment_faces).
+        :param n_components: Number of modes (None keeps those explaining 99% of the variance).
+        :param cache_dir: Optional shape model cache directory (see shape_model.load_or_fit_shape_model).
+        :return: ScanIndex.
+        """
+        if cache_dir:
+            model = load_or_fit_shape_model(vertices, cache_dir, n_components)
+        else:
+            model = fit_shape_model(vertices, n_components)
+        return cls(model, names, sizes, faces)
+
+    def save(self, path):
+        """
+        Saves the index (shape model, names, sizes and faces) as a .npz file.
+
+        :param path: Output path.
+        """
+        extra = {key: value for key, value in (("sizes", self.sizes), ("faces", self.faces)) if value is not None}
+        np.savez(path, names=self.names, **self.model, **extra)
+
+    @classmethod
+    def load(cls, path):
+        """
+        Loads an index saved with save().
+
+        :param path: Path of the .npz file.
+        :return: ScanIndex.
+        """
+        with np.load(path) as data:
+            optional = {key: data[key] if key in data.files else None for key in ("sizes", "faces")}
+            return cls({key: data[key] for key in INDEX_KEYS}, data["names"], **optional)
+
+    def register(self, points, max_iterations=JOINT_MAX_ITERATIONS, tolerance=ICP_TOLERANCE, max_points=MAX_SCAN_POINTS,
+                 noise=SCAN_NOISE):
+        """
+        Registers a scan to the shape model and estimates its mode scores: rigid ICP to the mean
+        shape, then a joint Gauss-Newton fit of pose and scores (regularized point-to-plane least
+        squares over the correspondences of the model points). Without faces the model points are
+        the vertices and the normals are estimated on the scan (point_normals).
+
+        :param points: Scan points of shape (N_points, 3), in meters.
+        :param max_iterations: Maximum number of joint iterations.
+        :param tolerance: Minimum improvement of the RMS distance (m) to keep iterating.
+        :param max_points: Maximum number of scan points used.
+        :param noise: Assumed standard deviation of the scan (m).
+        :return: Dictionary with rotation, translation, rmse, iterations and scores.
+        """
+        points = subsample(np.asarray(points, dtype=np.float64), max_points)
+
+        # Pose inicial: ICP grueso (pocos puntos e iteraciones) desde cada pose candidata, y ICP
+        # completo desde la mejor
+        coarse = subsample(points, COARSE_POINTS)
+        best = min((icp(coarse, self.mean, self.mean_tree, rotation, translation, COARSE_ITERATIONS, normals=self.normals)
+                    for rotation, translation in initial_poses(points, self.mean)), key=lambda candidate: candidate[2])
+        rotation, translation, error, iterations = icp(points, self.mean, self.mean_tree, best[0], best[1],
+                                                       normals=self.normals)
+
+        # Ajuste conjunto de pose y forma: cada punto del modelo se empareja con el punto del escaneo
+        # más cercano (árbol del escaneo, construido una vez) y se da un paso de Gauss-Newton
+        scores = np.zeros(len(self.model["variances"]))
+        scan_tree = cKDTree(points)
+        scan_normals = point_normals(points, scan_tree) if self.normals is None else None
+        previous = np.inf
+        for _ in range(max_iterations):
+            shape = self.mean + (scores @ self.components.reshape(len(scores), -1)).reshape(self.mean.shape)
+            distances, indices = scan_tree.query((shape - translation) @ rotation)
+            observed = correspondence_mask(distances, min_distance=3 * noise)
+            error = np.sqrt(np.mean(distances[observed] ** 2))
+            if previous - error < tolerance:
+                break
+            previous = error
+            matched = points[indices[observed]]
+            if self.normals is not None:
+                update, step, scores = pose_and_shape_step(
+                    matched @ rotation.T, translation, self.mean[observed],
+                    self.normal_components[observed], self.normals[observed], self.model["variances"], noise)
+                rotation, translation = update @ rotation, translation + step
+            else:
+                # Sin caras, la distancia se mide sobre la normal del escaneo en el punto emparejado
+                normals = scan_normals[indices[observed]] @ rotation.T
+                update, step, scores = pose_and_shape_step(
+                    matched @ rotation.T, translation, self.mean[observed],
+                    np.einsum("kni,ni->nk", self.components[:, observed], normals), normals,
+                    self.model["variances"], noise)
+                rotation, translation = update @ rotation, translation + step
+            iterations += 1
+
+        return {"rotation": rotation, "translation": translation, "rmse": error,
+                "iterations": iterations, "scores": scores}
+
+    def query_scores(self, scores, k=5):
+        """
+        Nearest population members of one or several score vectors.
+
+        :param scores: Array of shape (K,) or (N_queries, K).
+        :param k: Number of neighbours (at most the population size).
+        :return: Tuple (distances, indices), each of shape (N_queries, k).
+        """
+        k = min(k, len(self.names))
+        distances, indices = self.tree.query(np.atleast_2d(scores), k=k)
+        return distances.reshape(-1, k), indices.reshape(-1, k)
+
+    def query(self, points, k=5, **kwargs):
+        """
+        Top-k nearest models and sizes of a scan.
+
+        :param points: Scan points of shape (N_points, 3), in meters.
+        :param k: Number of neighbours (at most the population size).
+        :param kwargs: Options of register().
+        :return: Dictionary with names, sizes, distances (in mode space, m), size (of the nearest model),
+                 size_votes (share of each size among the neighbours), scores and registration details.
+        """
+        k = min(k, len(self.names))
+        registration = self.register(points, **kwargs)
+        distances, indices = self.query_scores(registration["scores"], k)
+        result = dict(registration, names=self.names[indices[0]].tolist(), distances=distances[0])
+        if self.sizes is not None:
+            sizes = self.sizes[indices[0]]
+            labels, counts = np.unique(sizes, return_counts=True)
+            result.update(sizes=sizes.tolist(), size=sizes[0],
+                          size_votes={label: float(count) / k for label, count in zip(labels.tolist(), counts)})
+        return result
+
+
+def load_model_sizes(names, sizes_path):
+    """
+    Size label of every model, from the '<prefix>_sizes.csv' table of the sizing pipeline.
+
+    :param names: Model names.
+    :param sizes_path: Path to the sizes CSV (ObjectName and size columns).
+    :return: Array of labels (empty for models missing from the table).
+    """
+    sizes = pd.read_csv(sizes_path, usecols=["ObjectName", "size"]).set_index("ObjectName")["size"]
+    return sizes.reindex(names).fillna("").to_numpy(dtype=str)
+
+
+if __name__ == "__main__":
+    import time
+    import argparse
+    from sizing_pipeline import SEGMENT_CONFIGS, load_segment_vertices
+    from girth_profile import load_segment_faces
+
+    parser = argparse.ArgumentParser(description="Modelo y talla más cercanos a un escaneo de brazo o pierna.")
+    parser.add_argument("segment", choices=list(SEGMENT_CONFIGS))
+    parser.add_argument("scan", help="Nube de puntos (OBJ, .npy o texto x y z) en metros")
+    parser.add_argument("--source", help="CSV largo, almacén de vértices o directorio de OBJ de la población")
+    parser.add_argument("--sizes", help="Tabla '<prefijo>_sizes.csv' del pipeline de tallas")
+    parser.add_argument("--index", help="Índice .npz; se crea si no existe")
+    parser.add_argument("-k", type=int, default=5)
+    args = parser.parse_args()
+
+    if args.index and os.path.exists(args.index):
+        index = ScanIndex.load(args.index)
+    else:
+        vertices, names = load_segment_vertices(args.source or SEGMENT_CONFIGS[args.segment]["data"])
+        sizes = load_model_sizes(names, args.sizes) if args.sizes else None
+        faces = load_segment_faces(SEGMENT_CONFIGS[args.segment]["mesh"])
+        index = ScanIndex.build(vertices, names, sizes, faces, cache_dir="shape_model_cache")
+        if args.index:
+            index.save(args.index)
+
+    start = time.perf_counter()
+    result = index.query(load_scan(args.scan), args.k)
+    elapsed = time.perf_counter() - start
+    print(f"Registration RMSE {result['rmse'] * 1000:.2f} mm in {result['iterations']} ICP iterations")
+    for rank, name in enumerate(result["names"]):
+        size = f"  {result['sizes'][rank]}" if "sizes" in result else ""
+        print(f"{rank + 1}. {name}  {result['distances'][rank] * 1000:.2f} mm{size}")
+    if "size" in result:
+        print(f"Size: {result['size']}  votes: {result['size_votes']}")
+    print(f"Query time: {elapsed * 1000:.1f} ms")
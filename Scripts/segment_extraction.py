@@ -0,0 +1,82 @@
+import numpy as np
+
+# Este módulo sólo depende de numpy para poder importarse desde el Python de Blender
+
+# Grupos de vértices (vertex_groups.csv) que forman cada segmento exportado
+SEGMENT_GROUPS = {
+    "arm": ["left_arm", "left_forearm"],
+    "leg": ["left_thigh", "left_leg"],
+}
+
+
+def segment_indices(vertex_groups, group_names):
+    """
+    Sorted indices of the full-body vertices in any of the groups, i.e. the vertices of the
+    segment in the order Blender keeps when separating them.
+
+    :param vertex_groups: VertexGroupRegistry or dictionary name -> vertex indices.
+    :param group_names: Groups that form the segment.
+    :return: int32 array of vertex indices.
+    """
+    return np.unique(np.concatenate([np.asarray(vertex_groups[name], dtype=np.int64)
+                                     for name in group_names])).astype(np.int32)
+
+
+def segment_mask(indices, n_vertices):
+    """
+    Boolean mask of the segment vertices over the full body.
+
+    :param indices: Vertex indices of the segment.
+    :param n_vertices: Number of vertices of the full body.
+    :return: Boolean array of shape (n_vertices,).
+    """
+    mask = np.zeros(n_vertices, dtype=bool)
+    mask[indices] = True
+    return mask
+
+
+def segment_topology(faces, indices, n_vertices):
+    """
+    Faces of the segment (those whose vertices all belong to it) renumbered to the segment's
+    own vertex order. Computed once and reused for every body.
+
+    :param faces: Full-body zero-based int array of shape (N_faces, K).
+    :param indices: Sorted vertex indices of the segment.
+    :param n_vertices: Number of vertices of the full body.
+    :return: int32 array of shape (N_segment_faces, K).
+    """
+    faces = np.asarray(faces)
+    remap = np.full(n_vertices, -1, dtype=np.int64)
+    remap[indices] = np.arange(len(indices))
+    remapped = remap[faces]
+    return remapped[np.all(remapped >= 0, axis=1)].astype(np.int32)
+
+
+def extract_submesh(vertices, indices, segment_faces=None):
+    """
+    Extracts a segment from one body or a batch of bodies with a single gather.
+
+    :param vertices: Array of shape (N_vertices, 3) or (N_bodies, N_vertices, 3).
+    :param indices: Sorted vertex indices of the segment.
+    :param segment_faces: Optional faces returned by segment_topology, passed through.
+    :return: Tuple (segment vertices of shape (..., N_segment_vertices, 3), segment faces).
+    """
+    return np.take(vertices, indices, axis=-2), segment_faces
+
+
+def extract_segments(vertices, faces, vertex_groups, segments=None):
+    """
+    Extracts several segments of a full-body mesh (or batch of meshes).
+
+    :param vertices: Array of shape (N_vertices, 3) or (N_bodies, N_vertices, 3).
+    :param faces: Full-body zero-based int array of shape (N_faces, K).
+    :param vertex_groups: VertexGroupRegistry or dictionary name -> vertex indices.
+    :param segments: Dictionary segment -> group names. Defaults to SEGMENT_GROUPS.
+    :return: Dictionary segment -> (vertices, faces).
+    """
+    n_vertices = np.shape(vertices)[-2]
+    result = {}
+    for segment, group_names in (segments or SEGMENT_GROUPS).items():
+        indices = segment_indices(vertex_groups, group_names)
+        result[segment] = extract_submesh(vertices, indices, segment_topology(faces, indices, n_vertices))
+    return result
@@ -34,6 +34,7 @@ def align_all_objects(vertex_index=0):
         set_origin_to_vertex(obj, vertex_index)
 
 # Select Vertex
+# (sin Blender: alignment.align_to_anchor o sizing_pipeline con alignment="anchor")
 i_vertex = 128 # align respect knee
 #i_vertex = 268 # align respect elbow
 align_all_objects(vertex_index=i_vertex)
@@ -0,0 +1,199 @@
+import os
+import hashlib
+import numpy as np
+
+from alignment import generalized_procrustes, GPA_TOLERANCE
+
+# Fracción de la varianza que deben explicar los modos retenidos por defecto
+DEFAULT_EXPLAINED_VARIANCE = 0.99
+
+# Versión del formato del modelo en caché (cambiarla invalida los archivos anteriores)
+CACHE_VERSION = 1
+
+
+def fit_pca(aligned, n_components=None, explained_variance=DEFAULT_EXPLAINED_VARIANCE, batch_size=4096):
+    """
+    Principal component analysis of aligned shapes. The (3V x 3V) covariance is accumulated
+    batch by batch, so the cost in memory does not grow with the number of models.
+
+    :param aligned: Array of shape (N_models, N_vertices, 3).
+    :param n_components: Number of modes to keep. Defaults to the fewest explaining explained_variance.
+    :param explained_variance: Fraction of the variance to explain when n_components is None.
+    :param batch_size: Number of models accumulated per step.
+    :return: Dictionary with mean (V, 3), components (K, V, 3), variances (K,),
+             explained_variance_ratio (K,) and scores (N_models, K).
+    """
+    n_models, n_vertices, _ = aligned.shape
+    flat = aligned.reshape(n_models, -1)
+    mean = np.zeros(flat.shape[1])
+    for start in range(0, n_models, batch_size):
+        mean += np.asarray(flat[start:start + batch_size], dtype=np.float64).sum(axis=0)
+    mean /= n_models
+
+    covariance = np.zeros((flat.shape[1], flat.shape[1]))
+    for start in range(0, n_models, batch_size):
+        centered = np.asarray(flat[start:start + batch_size], dtype=np.float64) - mean
+        covariance += centered.T @ centered
+    covariance /= max(n_models - 1, 1)
+
+    variances, vectors = np.linalg.eigh(covariance)
+    variances, vectors = np.maximum(variances[::-1], 0.0), vectors[:, ::-1]
+    # Una población sin variación (modelos idénticos) no tiene varianza que repartir: un solo modo nulo
+    total = variances.sum()
+    ratio = variances / total if total > 0 else np.zeros_like(variances)
+    if n_components is None:
+        n_components = int(np.searchsorted(np.cumsum(ratio), explained_variance) + 1) if total > 0 else 1
+    n_components = min(n_components, len(variances))
+    components = vectors[:, :n_components].T
+
+    # Signo determinista: la mayor componente de cada modo es positiva
+    signs = np.sign(components[np.arange(n_components), np.abs(components).argmax(axis=1)])
+    components *= signs[:, None]
+
+    scores = np.empty((n_models, n_components))
+    for start in range(0, n_models, batch_size):
+        scores[start:start + batch_size] = (np.asarray(flat[start:start + batch_size], dtype=np.float64) - mean) @ components.T
+
+    return {
+        "mean": mean.reshape(n_vertices, 3),
+        "components": components.reshape(n_components, n_vertices, 3),
+        "variances": variances[:n_components],
+        "explained_variance_ratio": ratio[:n_components],
+        "scores": scores,
+    }
+
+
+def fit_shape_model(vertices, n_components=None, explained_variance=DEFAULT_EXPLAINED_VARIANCE,
+                    tolerance=GPA_TOLERANCE, batch_size=4096):
+    """
+    Fits the statistical shape model of a segment population: generalized Procrustes alignment
+    followed by PCA of the aligned vertices.
+
+    :param vertices: Array of shape (N_models, N_vertices, 3).
+    :param n_components: Number of modes to keep (see fit_pca).
+    :param explained_variance: Fraction of the variance to explain when n_components is None.
+    :param tolerance: GPA convergence tolerance.
+    :param batch_size: Number of models processed per step.
+    :return: Dictionary with mean, components, variances, explained_variance_ratio, scores,
+             rotations, translations, gpa_iterations and residual_std (V,).
+    """
+    gpa = generalized_procrustes(vertices, tolerance, batch_size=batch_size)
+    model = fit_pca(gpa["aligned"], n_components, explained_variance, batch_size)
+
+    # Desviación que los modos retenidos no explican, por vértice
+    residual = np.zeros(vertices.shape[1])
+    for start in range(0, len(vertices), batch_size):
+        batch = gpa["aligned"][start:start + batch_size]
+        difference = batch - reconstruct(model, model["scores"][start:start + batch_size])
+        residual += (difference ** 2).sum(axis=(0, 2))
+    model["residual_std"] = np.sqrt(residual / max(len(vertices) - 1, 1))
+
+    model.update({
+        "rotations": gpa["rotations"],
+        "translations": gpa["translations"],
+        "gpa_iterations": np.array(gpa["iterations"]),
+    })
+    return model
+
+
+def project(model, vertices):
+    """
+    Scores of shapes in the model (the shapes must already be aligned to the model's frame).
+
+    :param model: Dictionary returned by fit_shape_model.
+    :param vertices: Array of shape (N, N_vertices, 3) or (N_vertices, 3).
+    :return: Array of shape (N, K).
+    """
+    vertices = np.asarray(vertices, dtype=np.float64).reshape(-1, model["mean"].size)
+    components = model["components"].reshape(len(model["components"]), -1)
+    return (vertices - model["mean"].ravel()) @ components.T
+
+
+def reconstruct(model, scores):
+    """
+    Shapes corresponding to mode scores.
+
+    :param model: Dictionary returned by fit_shape_model.
+    :param scores: Array of shape (N, K) or (K,).
+    :return: Array of shape (N, N_vertices, 3).
+    """
+    scores = np.atleast_2d(np.asarray(scores, dtype=np.float64))
+    components = model["components"].reshape(len(model["components"]), -1)
+    return (model["mean"].ravel() + scores @ components).reshape(len(scores), *model["mean"].shape)
+
+
+def vertices_fingerprint(vertices, batch_size=4096):
+    """
+    SHA-1 of the vertex tensor contents and shape, read in batches.
+
+    :param vertices: Array of shape (N_models, N_vertices, 3).
+    :return: Hexadecimal digest.
+    """
+    digest = hashlib.sha1(str((vertices.shape, np.dtype(vertices.dtype).str)).encode())
+    for start in range(0, len(vertices), batch_size):
+        digest.update(np.ascontiguousarray(vertices[start:start + batch_size]).tobytes())
+    return digest.hexdigest()
+
+
+def save_shape_model(model, path):
+    """
+    Saves a shape model as a .npz file.
+
+    :param model: Dictionary returned by fit_shape_model.
+    :param path: Output path.
+    """
+    np.savez(path, **model)
+
+
+def load_shape_model(path):
+    """
+    Loads a shape model saved with save_shape_model.
+
+    :param path: Path of the .npz file.
+    :return: Shape model dictionary.
+    """
+    with np.load(path) as data:
+        return {key: data[key] for key in data.files}
+
+
+def load_or_fit_shape_model(vertices, cache_dir, n_components=None, explained_variance=DEFAULT_EXPLAINED_VARIANCE,
+                            tolerance=GPA_TOLERANCE):
+    """
+    Returns the shape model of a population from the disk cache, fitting and caching it on a miss.
+    The cache file name hashes the vertex data and the fitting parameters.
+
+    :param vertices: Array of shape (N_models, N_vertices, 3).
+    :param cache_dir: Directory of the cached models.
+    :param n_components: Number of modes to keep (see fit_pca).
+    :param explained_variance: Fraction of the variance to explain when n_components is None.
+    :param tolerance: GPA convergence tolerance.
+    :return: Shape model dictionary.
+    """
+    parameters = f"v{CACHE_VERSION}-{n_components}-{explained_variance}-{tolerance}"
+    key = hashlib.sha1(f"{vertices_fingerprint(vertices)}-{parameters}".encode()).hexdigest()[:16]
+    path = os.path.join(cache_dir, f"shape_model_{key}.npz")
+    if os.path.exists(path):
+        return load_shape_model(path)
+
+    model = fit_shape_model(vertices, n_components, explained_variance, tolerance)
+    os.makedirs(cache_dir, exist_ok=True)
+    # Escribir a un archivo temporal y renombrar, para no dejar cachés a medio escribir
+    temporary_path = path + ".tmp.npz"
+    save_shape_model(model, temporary_path)
+    os.replace(temporary_path, path)
+    return model
+
+
+if __name__ == "__main__":
+    import time
+    from obj_loader import load_obj_directory, models_directory
+
+    for segment in ["arm", "leg"]:
+        vertices, _ = load_obj_directory(os.path.join(models_directory, segment))
+        start = time.perf_counter()
+        model = load_or_fit_shape_model(vertices, "shape_model_cache")
+        elapsed = time.perf_counter() - start
+        print(f"{segment}: {len(model['variances'])} modes explain "
+              f"{model['explained_variance_ratio'].sum():.1%} of the variance "
+              f"({int(model['gpa_iterations'])} GPA iterations, {elapsed:.2f} s)")
+        print(f"  residual std: mean {model['residual_std'].mean() * 1000:.3f} mm")
@@ -0,0 +1,160 @@
+import os
+import numpy as np
+
+from vertex_store import build_manifest, find_metadata
+from obj_loader import load_obj_directory, models_directory
+
+
+def beta_columns(manifest):
+    """
+    Returns the beta columns of a manifest that are not zero for every model.
+
+    :param manifest: DataFrame with beta_0, beta_1, ... columns.
+    :return: List of column names.
+    """
+    columns = [column for column in manifest.columns if column.startswith("beta_")]
+    return [column for column in columns if manifest[column].abs().max() > 0]
+
+
+def fit_shape_space(vertices, betas, genders):
+    """
+    Fits, for every gender, a linear shape model vertices = template + betas @ shapedirs
+    by least squares over the exported meshes.
+
+    :param vertices: Array of shape (N_models, N_vertices, 3).
+    :param betas: Array of shape (N_models, N_betas).
+    :param genders: Gender of every model.
+    :return: Dictionary with 'genders', 'template' (G, V, 3), 'shapedirs' (G, B, V, 3) and 'rms' (G,).
+    """
+    vertices = np.asarray(vertices, dtype=np.float64)
+    betas = np.asarray(betas, dtype=np.float64)
+    genders = np.asarray(genders)
+    n_models, n_vertices, _ = vertices.shape
+
+    names = sorted(set(genders.tolist()))
+    templates, shapedirs, rms = [], [], []
+    for gender in names:
+        mask = genders == gender
+        design = np.hstack([np.ones((mask.sum(), 1)), betas[mask]])
+        targets = vertices[mask].reshape(mask.sum(), -1)
+        coefficients, _, _, _ = np.linalg.lstsq(design, targets, rcond=None)
+
+        residuals = targets - design @ coefficients
+        templates.append(coefficients[0].reshape(n_vertices, 3))
+        shapedirs.append(coefficients[1:].reshape(betas.shape[1], n_vertices, 3))
+        rms.append(np.sqrt((residuals.reshape(-1, n_vertices, 3) ** 2).sum(axis=2).mean()))
+
+    return {
+        "genders": np.array(names),
+        "template": np.array(templates, dtype=np.float32),
+        "shapedirs": np.array(shapedirs, dtype=np.float32),
+        "rms": np.array(rms),
+    }
+
+
+def synthesize(shape_model, betas, gender):
+    """
+    Synthesizes the segment vertices of a batch of bodies with one matrix multiply.
+
+    :param shape_model: Dictionary returned by fit_shape_space or load_shape_space.
+    :param betas: Array of shape (N_bodies, N_betas) (or (N_betas,) for a single body).
+    :param gender: Gender of the bodies.
+    :return: float32 array of shape (N_bodies, N_vertices, 3).
+    """
+    position = list(shape_model["genders"]).index(gender)
+    template = shape_model["template"][position]
+    shapedirs = shape_model["shapedirs"][position]
+
+    betas = np.atleast_2d(np.asarray(betas, dtype=np.float32))
+    offsets = betas @ shapedirs.reshape(shapedirs.shape[0], -1)
+    return (offsets + template.reshape(1, -1)).reshape(len(betas), *template.shape)
+
+
+def sample_betas(n_bodies, n_betas, random_state=None, limit=1.0):
+    """
+    Samples beta vectors like the Blender add-on does: standard normal clipped to [-limit, limit]
+    (about a third of the exported betas sit exactly at ±1).
+
+    :param n_bodies: Number of beta vectors.
+    :param n_betas: Number of betas per vector.
+    :param random_state: Seed or numpy Generator.
+    :param limit: Clipping bound.
+    :return: float32 array of shape (n_bodies, n_betas).
+    """
+    rng = np.random.default_rng(random_state)
+    return np.clip(rng.standard_normal((n_bodies, n_betas)), -limit, limit).astype(np.float32)
+
+
+def sample_population(shape_model, n_bodies, random_state=None, batch_size=100000):
+    """
+    Samples a synthetic population with equal numbers of each gender.
+
+    :param shape_model: Dictionary returned by fit_shape_space or load_shape_space.
+    :param n_bodies: Total number of bodies.
+    :param random_state: Seed or numpy Generator.
+    :param batch_size: Number of bodies synthesized per matrix multiply.
+    :return: Tuple (vertices of shape (n_bodies, N_vertices, 3), betas, genders).
+    """
+    rng = np.random.default_rng(random_state)
+    genders = np.resize(shape_model["genders"], n_bodies)
+    betas = sample_betas(n_bodies, shape_model["shapedirs"].shape[1], rng)
+
+    vertices = np.empty((n_bodies, *shape_model["template"].shape[1:]), dtype=np.float32)
+    for gender in shape_model["genders"]:
+        indices = np.flatnonzero(genders == gender)
+        for start in range(0, len(indices), batch_size):
+            batch = indices[start:start + batch_size]
+            vertices[batch] = synthesize(shape_model, betas[batch], gender)
+    return vertices, betas, genders
+
+
+def fit_shape_space_from_obj(obj_directory, metadata_path=None):
+    """
+    Fits the shape model of a segment from its exported OBJ files and model_metadata.csv.
+
+    :param obj_directory: Directory with the '*_model_*.obj' files.
+    :param metadata_path: Path to 'model_metadata.csv'. Defaults to the one of obj_directory (see find_metadata).
+    :return: Dictionary returned by fit_shape_space.
+    """
+    if metadata_path is None:
+        metadata_path = find_metadata(obj_directory)
+    vertices, names = load_obj_directory(obj_directory)
+    manifest = build_manifest(names, metadata_path)
+    columns = beta_columns(manifest)
+    return fit_shape_space(vertices, manifest[columns].to_numpy(), manifest["gender"].to_numpy())
+
+
+def save_shape_space(shape_model, path):
+    """
+    Saves a shape model as a .npz file.
+
+    :param shape_model: Dictionary returned by fit_shape_space.
+    :param path: Output path.
+    """
+    np.savez(path, **shape_model)
+
+
+def load_shape_space(path):
+    """
+    Loads a shape model saved with save_shape_space.
+
+    :param path: Path of the .npz file.
+    :return: Dictionary with genders, template, shapedirs and rms.
+    """
+    with np.load(path) as data:
+        return {key: data[key] for key in data.files}
+
+
+if __name__ == "__main__":
+    import time
+
+    for segment in ["arm", "leg"]:
+        shape_model = fit_shape_space_from_obj(os.path.join(models_directory, segment))
+        save_shape_space(shape_model, f"{segment}_shape_space.npz")
+        for gender, rms in zip(shape_model["genders"], shape_model["rms"]):
+            print(f"{segment} ({gender}): RMS fit error {rms:.2e} m")
+
+        start = time.perf_counter()
+        vertices, _, _ = sample_population(shape_model, 100000, random_state=0)
+        elapsed = time.perf_counter() - start
+        print(f"{segment}: {len(vertices)} bodies synthesized in {elapsed:.3f} s")
@@ -0,0 +1,130 @@
+import os
+import numpy as np
+import pandas as pd
+from concurrent.futures import ProcessPoolExecutor
+from sklearn.cluster import KMeans, MiniBatchKMeans
+from sklearn.metrics import silhouette_score, calinski_harabasz_score, davies_bouldin_score
+
+# A partir de este número de modelos se usa MiniBatchKMeans
+MINIBATCH_THRESHOLD = 20000
+
+# Tolerancia de ajuste por defecto del exoesqueleto alrededor del centro de cada talla (m)
+DEFAULT_TOLERANCE = 0.01
+
+
+def fit_sizes(features, k, random_state=42, minibatch_threshold=MINIBATCH_THRESHOLD, batch_size=4096):
+    """
+    Clusters the models into k sizes, switching to mini-batch KMeans for large populations.
+
+    :param features: Array of shape (N_models, N_features).
+    :param k: Number of sizes.
+    :param random_state: Seed of the clustering.
+    :param minibatch_threshold: Number of models from which MiniBatchKMeans is used.
+    :param batch_size: Mini-batch size.
+    :return: Tuple (labels, centers, inertia, method name).
+    """
+    features = np.asarray(features, dtype=np.float64)
+    if len(features) >= minibatch_threshold:
+        model = MiniBatchKMeans(n_clusters=k, random_state=random_state, batch_size=batch_size, n_init=3)
+        method = "minibatch_kmeans"
+    else:
+        model = KMeans(n_clusters=k, random_state=random_state)
+        method = "kmeans"
+    labels = model.fit_predict(features)
+    return labels, model.cluster_centers_, float(model.inertia_), method
+
+
+def coverage(features, labels, centers, tolerance=DEFAULT_TOLERANCE):
+    """
+    Fraction of models whose every feature lies within the tolerance of their size center,
+    i.e. the share of the population a size with that adjustability would fit.
+
+    :param features: Array of shape (N_models, N_features).
+    :param labels: Cluster of every model.
+    :param centers: Array of shape (k, N_features).
+    :param tolerance: Scalar or per-feature half-width of the adjustability range.
+    :return: Fraction in [0, 1].
+    """
+    deviations = np.abs(np.asarray(features) - np.asarray(centers)[labels])
+    return float(np.mean(np.all(deviations <= np.asarray(tolerance), axis=1)))
+
+
+def score_clustering(features, labels, centers, tolerance=DEFAULT_TOLERANCE, silhouette_sample=10000,
+                     random_state=42):
+    """
+    Scores a clustering with silhouette (on a sample for large populations), Calinski-Harabasz,
+    Davies-Bouldin, coverage and size balance.
+
+    :param features: Array of shape (N_models, N_features).
+    :param labels: Cluster of every model.
+    :param centers: Array of shape (k, N_features).
+    :param tolerance: Adjustability half-width used by coverage.
+    :param silhouette_sample: Maximum number of models used by the silhouette score.
+    :param random_state: Seed of the silhouette sample.
+    :return: Dictionary of scores.
+    """
+    sample_size = silhouette_sample if len(features) > silhouette_sample else None
+    counts = np.bincount(labels, minlength=len(centers))
+    return {
+        "silhouette": float(silhouette_score(features, labels, sample_size=sample_size, random_state=random_state)),
+        "calinski_harabasz": float(calinski_harabasz_score(features, labels)),
+        "davies_bouldin": float(davies_bouldin_score(features, labels)),
+        "coverage": coverage(features, labels, centers, tolerance),
+        "smallest_size_fraction": float(counts.min() / counts.sum()),
+    }
+
+
+def _evaluate_k(arguments):
+    """
+    Fits and scores one value of k (process pool worker).
+    """
+    features, k, random_state, tolerance, minibatch_threshold, silhouette_sample = arguments
+    labels, centers, inertia, method = fit_sizes(features, k, random_state, minibatch_threshold)
+    scores = score_clustering(features, labels, centers, tolerance, silhouette_sample, random_state)
+    return {"k": k, "method": method, "inertia": inertia, **scores}
+
+
+def sweep_k(features, k_values=range(2, 8), workers=None, random_state=42, tolerance=DEFAULT_TOLERANCE,
+            minibatch_threshold=MINIBATCH_THRESHOLD, silhouette_sample=10000):
+    """
+    Fits and scores several numbers of sizes in parallel.
+
+    :param features: Array of shape (N_models, N_features).
+    :param k_values: Numbers of sizes to evaluate.
+    :param workers: Number of worker processes. None uses all CPUs, 1 runs serially.
+    :param random_state: Seed of the clusterings.
+    :param tolerance: Adjustability half-width used by coverage.
+    :param minibatch_threshold: Number of models from which MiniBatchKMeans is used.
+    :param silhouette_sample: Maximum number of models used by the silhouette score.
+    :return: DataFrame with one row of scores per k.
+    """
+    features = np.asarray(features, dtype=np.float64)
+    jobs = [(features, k, random_state, tolerance, minibatch_threshold, silhouette_sample) for k in k_values]
+    workers = min(workers or os.cpu_count() or 1, len(jobs))
+    if workers <= 1:
+        rows = [_evaluate_k(job) for job in jobs]
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            rows = list(executor.map(_evaluate_k, jobs))
+    return pd.DataFrame(rows).sort_values("k").reset_index(drop=True)
+
+
+def choose_k(scores, min_coverage=None, metric="silhouette"):
+    """
+    Chooses the number of sizes: the smallest k reaching min_coverage if given,
+    otherwise the k with the best value of metric.
+
+    :param scores: DataFrame returned by sweep_k.
+    :param min_coverage: Required fraction of the population within tolerance.
+    :param metric: Score maximized when min_coverage is None (davies_bouldin is minimized).
+    :return: Chosen k.
+    """
+    if min_coverage is not None:
+        reached = scores[scores["coverage"] >= min_coverage]
+        if len(reached):
+            return int(reached["k"].min())
+        return int(scores.loc[scores["coverage"].idxmax(), "k"])
+
+    if metric == "davies_bouldin":
+        return int(scores.loc[scores[metric].idxmin(), "k"])
+    return int(scores.loc[scores[metric].idxmax(), "k"])
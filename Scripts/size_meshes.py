@@ -0,0 +1,339 @@
+import os
+import csv
+import json
+import numpy as np
+
+# Este módulo sólo depende de numpy para poder importarse desde el Python de Blender
+
+# Percentiles de Std_Combined que se llevan a los pesos 0 y 1 (los valores fuera se recortan)
+DEFAULT_PERCENTILES = (1.0, 99.0)
+
+# Desviación mínima usada en la escala logarítmica
+LOG_FLOOR = 1e-9
+
+# Niveles de peso al pintar en Blender (una llamada a vertex_group.add por nivel). None pinta los
+# pesos exactos; un número entero los redondea a ese número de niveles (menos llamadas)
+WEIGHT_LEVELS = None
+
+
+def read_stats_table(csv_path):
+    """
+    Reads a statistics CSV into column arrays. Supports the flat '*_vertex_stats_by_size.csv'
+    (size, VertexIndex, X_mean, ...) and the two-level header of '*_vertex_statistics.csv'
+    ((X, mean), ...), whose columns are renamed to X_mean, ...
+
+    :param csv_path: Path to the CSV file.
+    :return: Dictionary column name -> array (the 'size' column is kept as strings).
+    """
+    with open(csv_path, newline="") as file:
+        reader = csv.reader(file)
+        header = next(reader)
+        second = next(reader)
+
+    if second and second[0] == "" and "mean" in second:
+        # Encabezado de dos niveles de DataFrame.describe: eje, estadístico y fila 'VertexIndex'
+        names = ["VertexIndex"] + [f"{axis}_{statistic}" if statistic else axis
+                                   for axis, statistic in zip(header[1:], second[1:])]
+        values = np.loadtxt(csv_path, delimiter=",", skiprows=3, ndmin=2)
+        return {name: values[:, position] for position, name in enumerate(names)}
+
+    text_columns = [position for position, name in enumerate(header) if name in ("size", "ObjectName")]
+    numeric_columns = [position for position in range(len(header)) if position not in text_columns]
+    values = np.loadtxt(csv_path, delimiter=",", skiprows=1, usecols=numeric_columns, ndmin=2)
+    table = {header[position]: values[:, column] for column, position in enumerate(numeric_columns)}
+    for position in text_columns:
+        table[header[position]] = np.loadtxt(csv_path, delimiter=",", skiprows=1, usecols=[position],
+                                             dtype=str, ndmin=1)
+    return table
+
+
+def load_mean_mesh(csv_path, statistic="mean"):
+    """
+    Loads the mean mesh (or the mesh of another per-vertex statistic) and combined std of a
+    '*_vertex_statistics.csv' file.
+
+    :param csv_path: Path to the statistics CSV.
+    :param statistic: Statistic used as vertex positions (mean, min, 50%, max, ...).
+    :return: Tuple (vertices (N_vertices, 3), std_combined (N_vertices,)).
+    """
+    table = read_stats_table(csv_path)
+    order = np.argsort(table["VertexIndex"], kind="stable")
+    vertices = np.column_stack([table[f"{axis}_{statistic}"] for axis in "XYZ"])[order]
+    return vertices, table["Std_Combined"][order]
+
+
+def load_size_meshes(csv_path):
+    """
+    Loads the mean mesh and combined std of every size of a '*_vertex_stats_by_size.csv' file.
+
+    :param csv_path: Path to the statistics CSV.
+    :return: Dictionary size -> (mean vertices (N_vertices, 3), std_combined (N_vertices,)).
+    """
+    table = read_stats_table(csv_path)
+    order = np.lexsort((table["VertexIndex"], table["size"]))
+    sizes = table["size"][order]
+    vertices = np.column_stack([table[f"{axis}_mean"] for axis in "XYZ"])[order]
+    std = table["Std_Combined"][order]
+
+    labels, starts = np.unique(sizes, return_index=True)
+    ends = np.r_[starts[1:], len(sizes)]
+    return {str(label): (vertices[start:end], std[start:end]) for label, start, end in zip(labels, starts, ends)}
+
+
+def scale_weights(std_devs, min_std, max_std, log=False):
+    """
+    Scales the combined standard deviation to weights in [0, 1].
+
+    :param std_devs: Array of standard deviations (any shape).
+    :param min_std: Deviation mapped to weight 0 (scalar or broadcastable array).
+    :param max_std: Deviation mapped to weight 1 (scalar or broadcastable array).
+    :param log: Whether to interpolate log(std) instead of std.
+    :return: float32 array of weights, clipped to [0, 1].
+    """
+    std_devs = np.asarray(std_devs, dtype=np.float64)
+    min_std = np.asarray(min_std, dtype=np.float64)
+    max_std = np.asarray(max_std, dtype=np.float64)
+    if log:
+        std_devs, min_std, max_std = (np.log(np.maximum(value, LOG_FLOOR)) for value in (std_devs, min_std, max_std))
+
+    span = max_std - min_std
+    with np.errstate(divide="ignore", invalid="ignore"):
+        weights = np.where(span > 0, (std_devs - min_std) / span, 0.5)
+    return np.clip(weights, 0.0, 1.0).astype(np.float32)
+
+
+def fit_weight_mapping(std_by_size, per_size=False, percentiles=DEFAULT_PERCENTILES, log=False):
+    """
+    Chooses the std range mapped to weights from the data: the given percentiles of the
+    combined std of all sizes together, or of every size separately.
+
+    :param std_by_size: Dictionary size -> std array, or a single array (stored under 'all').
+    :param per_size: Whether every size gets its own range.
+    :param percentiles: (low, high) percentiles mapped to weights 0 and 1.
+    :param log: Whether weights interpolate log(std).
+    :return: Mapping dictionary (JSON serializable) with the range of every size.
+    """
+    if not isinstance(std_by_size, dict):
+        std_by_size = {"all": std_by_size}
+    sizes = list(std_by_size)
+    low, high = percentiles
+
+    if per_size and len({len(values) for values in std_by_size.values()}) == 1:
+        # Todas las tallas tienen los mismos vértices: percentiles de todas en una sola llamada
+        limits = np.percentile(np.stack([std_by_size[size] for size in sizes]), [low, high], axis=1).T
+    elif per_size:
+        limits = np.array([np.percentile(std_by_size[size], [low, high]) for size in sizes])
+    else:
+        limits = np.tile(np.percentile(np.concatenate([std_by_size[size] for size in sizes]), [low, high]),
+                         (len(sizes), 1))
+
+    return {
+        "scope": "size" if per_size else "global",
+        "percentiles": [float(low), float(high)],
+        "log": bool(log),
+        "ranges": {str(size): [float(minimum), float(maximum)] for size, (minimum, maximum) in zip(sizes, limits)},
+    }
+
+
+def apply_weight_mapping(std_devs, mapping, size="all"):
+    """
+    Converts std values to weights with a mapping from fit_weight_mapping.
+
+    :param std_devs: Array of standard deviations.
+    :param mapping: Mapping dictionary.
+    :param size: Size whose range is used (any size for a global mapping).
+    :return: float32 array of weights in [0, 1].
+    """
+    ranges = mapping["ranges"]
+    minimum, maximum = ranges[str(size)] if str(size) in ranges else next(iter(ranges.values()))
+    return scale_weights(std_devs, minimum, maximum, mapping["log"])
+
+
+def save_weight_mapping(path, mapping):
+    """
+    Saves a weight mapping as JSON next to the meshes it was applied to.
+
+    :param path: Output path.
+    :param mapping: Mapping dictionary.
+    """
+    with open(path, "w") as file:
+        json.dump(mapping, file, indent=2)
+
+
+def load_weight_mapping(path):
+    """
+    Loads a weight mapping saved with save_weight_mapping.
+
+    :param path: Path of the JSON file.
+    :return: Mapping dictionary.
+    """
+    with open(path) as file:
+        return json.load(file)
+
+
+def quantize_weights(weights, levels=WEIGHT_LEVELS):
+    """
+    Groups the vertices by weight, so a vertex group can be painted with one call per distinct
+    weight. By default the weights are kept exactly (as the float32 Blender stores); with levels
+    they are first rounded to that number of levels.
+
+    :param weights: Array of weights in [0, 1].
+    :param levels: Optional number of weight levels.
+    :return: List of (weight, vertex index array) pairs.
+    """
+    weights = np.clip(weights, 0.0, 1.0)
+    if levels:
+        weights = np.rint(weights * (levels - 1)) / (levels - 1)
+    weights = weights.astype(np.float32)
+    order = np.argsort(weights, kind="stable")
+    values, starts = np.unique(weights[order], return_index=True)
+    groups = np.split(order, starts[1:])
+    return [(float(value), group) for value, group in zip(values, groups)]
+
+
+def weight_colors(weights):
+    """
+    Maps weights to the blue-green-red ramp of Blender's weight paint mode.
+
+    :param weights: Array of weights in [0, 1].
+    :return: uint8 array of shape (N, 3).
+    """
+    weights = np.clip(np.asarray(weights, dtype=np.float64), 0.0, 1.0)
+    stops = np.array([0.0, 0.25, 0.5, 0.75, 1.0])
+    ramp = np.array([[0, 0, 255], [0, 255, 255], [0, 255, 0], [255, 255, 0], [255, 0, 0]], dtype=np.float64)
+    colors = np.column_stack([np.interp(weights, stops, ramp[:, channel]) for channel in range(3)])
+    return np.rint(colors).astype(np.uint8)
+
+
+def write_obj(path, vertices, faces=None, colors=None):
+    """
+    Writes a mesh as OBJ. Vertex colors use the common 'v x y z r g b' extension (0-1 floats).
+
+    :param path: Output path.
+    :param vertices: Array of shape (N_vertices, 3).
+    :param faces: Optional zero-based int array of shape (N_faces, 3).
+    :param colors: Optional uint8 array of shape (N_vertices, 3).
+    """
+    vertices = np.asarray(vertices, dtype=np.float64)
+    with open(path, "w") as file:
+        if colors is None:
+            np.savetxt(file, vertices, fmt="v %.6f %.6f %.6f")
+        else:
+            np.savetxt(file, np.hstack([vertices, np.asarray(colors) / 255.0]),
+                       fmt="v %.6f %.6f %.6f %.4f %.4f %.4f")
+        if faces is not None:
+            np.savetxt(file, np.asarray(faces) + 1, fmt="f %d %d %d")
+
+
+def write_ply(path, vertices, faces=None, colors=None, weights=None):
+    """
+    Writes a mesh as binary little-endian PLY with optional vertex colors and a 'weight' property.
+
+    :param path: Output path.
+    :param vertices: Array of shape (N_vertices, 3).
+    :param faces: Optional zero-based int array of shape (N_faces, 3).
+    :param colors: Optional uint8 array of shape (N_vertices, 3).
+    :param weights: Optional array of shape (N_vertices,).
+    """
+    fields = [("x", "<f4"), ("y", "<f4"), ("z", "<f4")]
+    if colors is not None:
+        fields += [("red", "u1"), ("green", "u1"), ("blue", "u1")]
+    if weights is not None:
+        fields += [("weight", "<f4")]
+
+    vertex_data = np.empty(len(vertices), dtype=fields)
+    for position, axis in enumerate("xyz"):
+        vertex_data[axis] = vertices[:, position]
+    if colors is not None:
+        for position, channel in enumerate(["red", "green", "blue"]):
+            vertex_data[channel] = colors[:, position]
+    if weights is not None:
+        vertex_data["weight"] = weights
+
+    ply_types = {"<f4": "float", "u1": "uchar"}
+    header = ["ply", "format binary_little_endian 1.0", f"element vertex {len(vertices)}"]
+    header += [f"property {ply_types[dtype]} {name}" for name, dtype in fields]
+    if faces is not None:
+        header += [f"element face {len(faces)}", "property list uchar int vertex_indices"]
+    header.append("end_header")
+
+    with open(path, "wb") as file:
+        file.write(("\n".join(header) + "\n").encode("ascii"))
+        file.write(vertex_data.tobytes())
+        if faces is not None:
+            face_data = np.empty(len(faces), dtype=[("n", "u1"), ("indices", "<i4", (3,))])
+            face_data["n"] = 3
+            face_data["indices"] = faces
+            face_data.tofile(file)
+
+
+def export_mesh(path, vertices, weights, faces=None):
+    """
+    Writes a mean mesh with its weights as vertex colors. The format follows
+    the file extension (.obj or .ply).
+
+    :param path: Output path.
+    :param vertices: Array of shape (N_vertices, 3).
+    :param weights: Weight of every vertex in [0, 1] (see apply_weight_mapping).
+    :param faces: Optional zero-based int array of shape (N_faces, 3).
+    """
+    colors = weight_colors(weights)
+    if path.lower().endswith(".ply"):
+        write_ply(path, vertices, faces, colors, weights)
+    else:
+        write_obj(path, vertices, faces, colors)
+
+
+def export_size_meshes(csv_path, output_dir=".", faces=None, prefix=None, extension="ply", per_size=False,
+                       percentiles=DEFAULT_PERCENTILES, log=False):
+    """
+    Exports the mean mesh of every size of a '*_vertex_stats_by_size.csv' file, colored by weight,
+    and saves the weight mapping used as '{prefix}_weight_mapping.json'.
+
+    :param csv_path: Path to the statistics CSV.
+    :param output_dir: Directory where the meshes are written.
+    :param faces: Optional zero-based int array of shape (N_faces, 3) (see obj_loader.load_obj_faces).
+    :param prefix: File name prefix. Defaults to the CSV name without '_vertex_stats_by_size.csv'.
+    :param extension: 'ply' or 'obj'.
+    :param per_size: Whether every size gets its own std range.
+    :param percentiles: (low, high) percentiles mapped to weights 0 and 1.
+    :param log: Whether weights interpolate log(std).
+    :return: List of written paths.
+    """
+    if prefix is None:
+        prefix = os.path.basename(csv_path).replace("_vertex_stats_by_size.csv", "")
+    os.makedirs(output_dir, exist_ok=True)
+
+    meshes = load_size_meshes(csv_path)
+    mapping = fit_weight_mapping({size: std for size, (_, std) in meshes.items()}, per_size, percentiles, log)
+    paths = []
+    for size, (vertices, std_devs) in meshes.items():
+        path = os.path.join(output_dir, f"{prefix}_{size}.{extension}")
+        export_mesh(path, vertices, apply_weight_mapping(std_devs, mapping, size), faces)
+        paths.append(path)
+
+    mapping_path = os.path.join(output_dir, f"{prefix}_weight_mapping.json")
+    save_weight_mapping(mapping_path, mapping)
+    paths.append(mapping_path)
+    return paths
+
+
+if __name__ == "__main__":
+    import argparse
+    from obj_loader import load_obj_faces
+
+    parser = argparse.ArgumentParser(description="Exporta la malla media de cada talla sin Blender.")
+    parser.add_argument("stats_csv", help="Archivo '*_vertex_stats_by_size.csv'")
+    parser.add_argument("--faces-from", help="OBJ del segmento del que se toman las caras")
+    parser.add_argument("--output-dir", default=".")
+    parser.add_argument("--format", choices=["ply", "obj"], default="ply")
+    parser.add_argument("--per-size", action="store_true", help="Normalizar los pesos de cada talla por separado")
+    parser.add_argument("--percentiles", type=float, nargs=2, default=list(DEFAULT_PERCENTILES),
+                        help="Percentiles de Std_Combined que corresponden a los pesos 0 y 1")
+    parser.add_argument("--log", action="store_true", help="Escala logarítmica de la desviación")
+    args = parser.parse_args()
+
+    faces = load_obj_faces(args.faces_from) if args.faces_from else None
+    for path in export_size_meshes(args.stats_csv, args.output_dir, faces, extension=args.format,
+                                   per_size=args.per_size, percentiles=args.percentiles, log=args.log):
+        print(f"Saved {path}")
@@ -0,0 +1,231 @@
+import json
+import numpy as np
+import pandas as pd
+
+# Rango de ajuste por defecto de cada talla sobre la longitud total (m)
+DEFAULT_ADJUSTABILITY = 0.04
+
+
+def window_reach(sorted_values, width):
+    """
+    For every sorted value, the index one past the last value within [value, value + width].
+
+    :param sorted_values: Sorted 1-D array.
+    :param width: Window width.
+    :return: Integer array of the same length.
+    """
+    return np.searchsorted(sorted_values, sorted_values + width, side="right")
+
+
+def optimal_intervals(values, width, n_sizes):
+    """
+    Chooses n_sizes intervals of the given width that contain the largest number of values.
+    Dynamic programming over the sorted values: with best_c[i] the most values coverable
+    in values[i:] with c intervals, best_c is the suffix maximum of
+    (reach[i] - i) + best_{c-1}[reach[i]], so each level is one vectorized pass (O(n log n) overall).
+
+    :param values: 1-D array (e.g. total_length of every model).
+    :param width: Adjustability range of one size.
+    :param n_sizes: Number of sizes.
+    :return: Tuple (list of (low, high) intervals in increasing order, number of covered values).
+             Fewer than n_sizes intervals are returned when they already cover every value
+             (see split_intervals).
+    """
+    sorted_values = np.sort(np.asarray(values, dtype=np.float64))
+    n = len(sorted_values)
+    reach = window_reach(sorted_values, width)
+    counts = reach - np.arange(n)
+
+    # best[c][i] con i en [0, n]; best[c][n] = 0
+    best = [np.zeros(n + 1, dtype=np.int64)]
+    choice = []
+    for _ in range(n_sizes):
+        gain = counts + best[-1][reach]
+        # Máximo de gain[j] para j >= i y el primer j que lo alcanza
+        reversed_gain = gain[::-1]
+        running_max = np.maximum.accumulate(reversed_gain)
+        last_max_position = np.maximum.accumulate(np.where(reversed_gain >= running_max, np.arange(n), 0))
+        suffix_max = running_max[::-1]
+        suffix_argmax = (n - 1 - last_max_position)[::-1]
+        best.append(np.r_[suffix_max, 0])
+        choice.append(suffix_argmax)
+
+    # Reconstruir los intervalos
+    intervals = []
+    i = 0
+    for level in range(n_sizes, 0, -1):
+        if i >= n or best[level][i] == 0:
+            break
+        j = choice[level - 1][i]
+        intervals.append((sorted_values[j], sorted_values[j] + width))
+        i = reach[j]
+    return intervals, int(best[n_sizes][0])
+
+
+def split_intervals(values, intervals, n_sizes, width):
+    """
+    Completes a set of intervals that already covers every value up to n_sizes intervals: the
+    interval with the most values is replaced by two, centred on the lower and upper half of its
+    values, until there are n_sizes of them. Every value stays covered.
+
+    :param values: 1-D array.
+    :param intervals: List of (low, high) intervals covering every value.
+    :param n_sizes: Number of intervals wanted (at most the number of values).
+    :param width: Interval width.
+    :return: List of n_sizes (low, high) intervals in increasing order.
+    """
+    values = np.asarray(values, dtype=np.float64)
+    intervals = list(intervals)
+    while len(intervals) < n_sizes:
+        labels, _ = assign_to_intervals(values, intervals)
+        largest = int(np.argmax(np.bincount(labels, minlength=len(intervals))))
+        members = np.sort(values[labels == largest])
+        halves = members[:len(members) // 2], members[len(members) // 2:]
+        intervals[largest:largest + 1] = [((half[0] + half[-1] - width) / 2, (half[0] + half[-1] + width) / 2)
+                                          for half in halves]
+    return sorted(intervals)
+
+
+def assign_to_intervals(values, intervals):
+    """
+    Assigns every value to the interval containing it (the one with the nearest centre when
+    intervals overlap), or to the nearest one.
+
+    :param values: 1-D array.
+    :param intervals: List of (low, high) intervals in increasing order.
+    :return: Tuple (interval index of every value, boolean mask of values inside their interval).
+    """
+    values = np.asarray(values, dtype=np.float64)
+    lows = np.array([low for low, _ in intervals])
+    highs = np.array([high for _, high in intervals])
+    distance = np.maximum(lows[None, :] - values[:, None], 0) + np.maximum(values[:, None] - highs[None, :], 0)
+    inside = distance == 0
+    centre_distance = np.where(inside, np.abs(values[:, None] - (lows + highs)[None, :] / 2), np.inf)
+    labels = np.where(inside.any(axis=1), np.argmin(centre_distance, axis=1), np.argmin(distance, axis=1))
+    return labels, distance[np.arange(len(values)), labels] == 0
+
+
+def best_window_fraction(values, labels, n_sizes, width):
+    """
+    For every size, the largest fraction of its models that fits a window of the given width.
+
+    :param values: 1-D array of a secondary feature (e.g. a girth).
+    :param labels: Size index of every model.
+    :param n_sizes: Number of sizes.
+    :param width: Adjustability range of that feature.
+    :return: Tuple (fraction per size, boolean mask of models inside their size's best window).
+    """
+    values = np.asarray(values, dtype=np.float64)
+    fits = np.zeros(len(values), dtype=bool)
+    fractions = np.zeros(n_sizes)
+    for size in range(n_sizes):
+        members = np.flatnonzero(labels == size)
+        if not len(members):
+            continue
+        sorted_values = np.sort(values[members])
+        reach = window_reach(sorted_values, width)
+        start = np.argmax(reach - np.arange(len(sorted_values)))
+        low, high = sorted_values[start], sorted_values[start] + width
+        inside = (values[members] >= low) & (values[members] <= high)
+        fits[members] = inside
+        fractions[size] = inside.mean()
+    return fractions, fits
+
+
+def optimize_sizes(features, n_sizes, adjustability=None, primary="total_length", size_labels=None):
+    """
+    Computes the size ranges that maximize the fraction of the population accommodated.
+    Only the primary feature is optimized: the boundaries are placed on it alone, and secondary
+    features with an adjustability budget are only reported, as the share of each size that
+    also fits them (they do not move the boundaries). Exactly n_sizes ranges are returned; when
+    fewer ranges already accommodate everyone, the most populated ones are split.
+
+    :param features: DataFrame with one row per model (output of sizing_pipeline.compute_features).
+    :param n_sizes: Number of sizes.
+    :param adjustability: Dictionary feature -> adjustability range; must include the primary feature.
+    :param primary: Feature on which the size boundaries are placed.
+    :param size_labels: Labels from smallest to largest size (defaults to 0..n_sizes-1). A longer list
+                        is reduced to its central n_sizes labels.
+    :return: Dictionary with labels, cluster indices, ranges DataFrame, accommodation table and coverage.
+    """
+    adjustability = dict(adjustability or {primary: DEFAULT_ADJUSTABILITY})
+    if primary not in adjustability:
+        raise ValueError(f"The adjustability must include the primary feature '{primary}'.")
+    values = features[primary].to_numpy(dtype=np.float64)
+    if n_sizes < 1 or len(values) < n_sizes:
+        raise ValueError(f"Cannot place {n_sizes} sizes on {len(values)} models; "
+                         "at least one model per size is needed.")
+    intervals, covered_count = optimal_intervals(values, adjustability[primary], n_sizes)
+    intervals = split_intervals(values, intervals, n_sizes, adjustability[primary])
+    clusters, covered = assign_to_intervals(values, intervals)
+
+    if size_labels is None:
+        size_labels = [str(i) for i in range(n_sizes)]
+    if len(size_labels) < n_sizes:
+        raise ValueError(f"Got {len(size_labels)} size labels for {n_sizes} sizes.")
+    start = (len(size_labels) - n_sizes) // 2
+    size_labels = np.asarray(size_labels[start:start + n_sizes])
+
+    fits_all = covered.copy()
+    accommodation = pd.DataFrame({
+        "size": size_labels,
+        "min": [low for low, _ in intervals],
+        "max": [high for _, high in intervals],
+        "count": np.bincount(clusters, minlength=len(intervals)),
+        f"{primary}_fit": [covered[clusters == i].mean() if np.any(clusters == i) else 0.0
+                           for i in range(len(intervals))],
+    })
+    for feature, width in adjustability.items():
+        if feature == primary:
+            continue
+        fractions, fits = best_window_fraction(features[feature].to_numpy(), clusters, len(intervals), width)
+        accommodation[f"{feature}_fit"] = fractions
+        fits_all &= fits
+
+    return {
+        "cluster": clusters,
+        "size": size_labels[clusters],
+        "covered": covered,
+        "fits_all": fits_all,
+        "ranges": accommodation[["size", "min", "max"]].copy(),
+        "accommodation": accommodation,
+        "coverage": covered_count / len(values),
+        "coverage_all_features": float(fits_all.mean()),
+        "primary": primary,
+        "adjustability": adjustability,
+    }
+
+
+def save_size_boundaries(path, ranges, feature="total_length", adjustability=None, coverage=None):
+    """
+    Saves a size ranges table (size, min, max) as JSON (read back with load_size_boundaries).
+
+    :param path: Output path.
+    :param ranges: DataFrame with columns size, min, max (from optimize_sizes or compute_size_ranges).
+    :param feature: Feature the ranges refer to.
+    :param adjustability: Adjustability budgets used to compute the ranges, if any.
+    :param coverage: Fraction of the population accommodated, if known.
+    """
+    ranges = ranges.sort_values("min")
+    boundaries = {
+        "feature": feature,
+        "adjustability": adjustability,
+        "coverage": coverage,
+        "sizes": [
+            {"size": str(row["size"]), "min": float(row["min"]), "max": float(row["max"])}
+            for _, row in ranges.iterrows()
+        ],
+    }
+    with open(path, "w") as file:
+        json.dump(boundaries, file, indent=2)
+
+
+def load_size_boundaries(path):
+    """
+    Loads size ranges saved with save_size_boundaries.
+
+    :param path: Path of the JSON file.
+    :return: Dictionary with feature, adjustability, coverage and sizes.
+    """
+    with open(path) as file:
+        return json.load(file)
@@ -0,0 +1,230 @@
+import os
+import json
+import numpy as np
+import pandas as pd
+from sklearn.linear_model import LogisticRegression
+from sklearn.model_selection import StratifiedKFold
+
+from vertex_store import build_manifest, find_metadata
+from shape_space import beta_columns
+
+# Medidas corporales opcionales que se usan si están en model_metadata.csv (ver functions.get_model_metadata)
+BODY_MEASUREMENTS = ["height", "weight"]
+
+
+def predictor_inputs(manifest):
+    """
+    Extracts the predictor inputs (betas, genders and optional body measurements) of a manifest.
+
+    :param manifest: DataFrame with gender, beta_* and optionally height/weight columns.
+    :return: Tuple (betas, genders, measurements or None, beta column names).
+    """
+    columns = beta_columns(manifest)
+    measurements = [column for column in BODY_MEASUREMENTS if column in manifest.columns]
+    extra = manifest[measurements].to_numpy(dtype=np.float64) if measurements else None
+    return manifest[columns].to_numpy(dtype=np.float64), manifest["gender"].to_numpy(), extra, columns
+
+
+def predictor_features(betas, genders, genders_order, measurements=None):
+    """
+    Builds the feature matrix: betas, one indicator per extra gender and gender-beta interactions,
+    since each gender has its own template and shape basis.
+
+    :param betas: Array of shape (N, N_betas).
+    :param genders: Gender of every body.
+    :param genders_order: Genders known by the predictor; the first one is the reference.
+    :param measurements: Optional array of shape (N, N_measurements) (height, weight).
+    :return: Array of shape (N, N_features).
+    """
+    betas = np.atleast_2d(np.asarray(betas, dtype=np.float64))
+    genders = np.atleast_1d(np.asarray(genders))
+    blocks = [betas]
+    for gender in genders_order[1:]:
+        indicator = (genders == gender).astype(np.float64)[:, None]
+        blocks += [indicator, indicator * betas]
+    if measurements is not None:
+        blocks.append(np.atleast_2d(np.asarray(measurements, dtype=np.float64)))
+    return np.hstack(blocks)
+
+
+def train_size_predictor(betas, genders, sizes, measurements=None, C=100.0):
+    """
+    Trains a multinomial logistic regression from betas (and body measurements) to size labels,
+    and stores it as plain arrays so a prediction is one matrix multiply.
+
+    :param betas: Array of shape (N, N_betas).
+    :param genders: Gender of every body.
+    :param sizes: Size label of every body (from the mesh-based clustering).
+    :param measurements: Optional array of shape (N, N_measurements).
+    :param C: Inverse regularization strength.
+    :return: Dictionary with genders, mean, scale, coef, intercept and classes.
+    """
+    genders_order = np.array(sorted(set(np.asarray(genders).tolist())))
+    features = predictor_features(betas, genders, genders_order, measurements)
+    mean = features.mean(axis=0)
+    scale = features.std(axis=0)
+    scale[scale == 0] = 1.0
+
+    model = LogisticRegression(C=C, max_iter=5000)
+    model.fit((features - mean) / scale, np.asarray(sizes))
+    coef, intercept = model.coef_.T, model.intercept_
+    if len(model.classes_) == 2:
+        # Con dos tallas sklearn guarda una sola columna; la primera clase tiene puntaje cero
+        coef = np.hstack([np.zeros_like(coef), coef])
+        intercept = np.concatenate([[0.0], intercept])
+
+    return {
+        "genders": genders_order,
+        "mean": mean,
+        "scale": scale,
+        "coef": coef.copy(),
+        "intercept": intercept.copy(),
+        "classes": model.classes_.astype(str),
+        "uses_measurements": np.array(measurements is not None),
+    }
+
+
+def predict_sizes(predictor, betas, genders, measurements=None, return_proba=False):
+    """
+    Predicts the size of a batch of bodies.
+
+    :param predictor: Dictionary returned by train_size_predictor or load_size_predictor.
+    :param betas: Array of shape (N, N_betas) or (N_betas,).
+    :param genders: Gender of every body (or a single gender).
+    :param measurements: Body measurements if the predictor was trained with them.
+    :param return_proba: Whether to also return the class probabilities.
+    :return: Array of size labels (and probabilities of shape (N, N_sizes) if return_proba).
+    """
+    betas = np.atleast_2d(np.asarray(betas, dtype=np.float64))
+    genders = np.broadcast_to(np.asarray(genders), (len(betas),))
+    unknown = sorted(set(genders.tolist()) - set(predictor["genders"].tolist()))
+    if unknown:
+        raise ValueError(f"Unknown genders {unknown}; the predictor knows {predictor['genders'].tolist()}.")
+    if (measurements is not None) != bool(predictor["uses_measurements"]):
+        raise ValueError("The predictor was trained " + ("with" if predictor["uses_measurements"] else "without")
+                         + f" the body measurements {BODY_MEASUREMENTS}.")
+    n_measurements = 0
+    if measurements is not None:
+        measurements = np.atleast_2d(np.asarray(measurements, dtype=np.float64))
+        if len(measurements) != len(betas):
+            raise ValueError(f"Got measurements for {len(measurements)} bodies and betas for {len(betas)}.")
+        n_measurements = measurements.shape[1]
+    # Ancho de predictor_features: betas, indicador e interacciones por género extra y medidas
+    width = betas.shape[1] + (len(predictor["genders"]) - 1) * (betas.shape[1] + 1) + n_measurements
+    if width != len(predictor["mean"]):
+        raise ValueError("The betas and measurements do not match the predictor "
+                         f"({len(predictor['mean'])} features).")
+    features = predictor_features(betas, genders, predictor["genders"], measurements)
+    scores = ((features - predictor["mean"]) / predictor["scale"]) @ predictor["coef"] + predictor["intercept"]
+    labels = predictor["classes"][np.argmax(scores, axis=1)]
+    if not return_proba:
+        return labels
+
+    scores -= scores.max(axis=1, keepdims=True)
+    probabilities = np.exp(scores)
+    probabilities /= probabilities.sum(axis=1, keepdims=True)
+    return labels, probabilities
+
+
+def evaluate_size_predictor(betas, genders, sizes, measurements=None, folds=5, random_state=0, C=100.0):
+    """
+    Cross-validates the predictor against the mesh-based size labels.
+
+    :param betas: Array of shape (N, N_betas).
+    :param genders: Gender of every body.
+    :param sizes: Mesh-based size label of every body.
+    :param measurements: Optional array of shape (N, N_measurements).
+    :param folds: Number of stratified folds.
+    :param random_state: Seed of the fold split.
+    :param C: Inverse regularization strength.
+    :return: Dictionary with accuracy, per-size recall, confusion matrix and microseconds per query.
+    """
+    import time
+
+    sizes = np.asarray(sizes).astype(str)
+    genders = np.asarray(genders)
+    predicted = np.empty_like(sizes)
+    splitter = StratifiedKFold(n_splits=folds, shuffle=True, random_state=random_state)
+    for train, test in splitter.split(betas, sizes):
+        predictor = train_size_predictor(betas[train], genders[train], sizes[train],
+                                         None if measurements is None else measurements[train], C)
+        predicted[test] = predict_sizes(predictor, betas[test], genders[test],
+                                        None if measurements is None else measurements[test])
+
+    confusion = pd.crosstab(pd.Series(sizes, name="mesh"), pd.Series(predicted, name="predicted"))
+    recall = {size: float(np.mean(predicted[sizes == size] == size)) for size in np.unique(sizes)}
+
+    # Tiempo por consulta con el modelo entrenado sobre todos los datos
+    predictor = train_size_predictor(betas, genders, sizes, measurements, C)
+    repeats = 200
+    start = time.perf_counter()
+    for _ in range(repeats):
+        predict_sizes(predictor, betas[:1], genders[:1], None if measurements is None else measurements[:1])
+    single = (time.perf_counter() - start) / repeats * 1e6
+    start = time.perf_counter()
+    predict_sizes(predictor, betas, genders, measurements)
+    batched = (time.perf_counter() - start) / len(betas) * 1e6
+
+    return {
+        "accuracy": float(np.mean(predicted == sizes)),
+        "recall_by_size": recall,
+        "confusion": confusion,
+        "us_per_single_query": single,
+        "us_per_batched_query": batched,
+    }
+
+
+def save_size_predictor(predictor, path):
+    """
+    Saves a predictor as a .npz file.
+
+    :param predictor: Dictionary returned by train_size_predictor.
+    :param path: Output path.
+    """
+    np.savez(path, **predictor)
+
+
+def load_size_predictor(path):
+    """
+    Loads a predictor saved with save_size_predictor.
+
+    :param path: Path of the .npz file.
+    :return: Predictor dictionary.
+    """
+    with np.load(path) as data:
+        return {key: data[key] for key in data.files}
+
+
+def training_data(sizes_csv, metadata_path):
+    """
+    Joins the clustering output with the model metadata.
+
+    :param sizes_csv: Path to the '*_sizes.csv' written by sizing_pipeline (ObjectName, size, ...).
+    :param metadata_path: Path to 'model_metadata.csv'.
+    :return: Tuple (betas, genders, measurements or None, sizes).
+    """
+    sizes = pd.read_csv(sizes_csv)
+    manifest = build_manifest(sizes["ObjectName"].tolist(), metadata_path)
+    betas, genders, measurements, _ = predictor_inputs(manifest)
+    return betas, genders, measurements, sizes["size"].to_numpy().astype(str)
+
+
+if __name__ == "__main__":
+    from obj_loader import models_directory
+    from sizing_pipeline import run_sizing
+
+    for segment, prefix in [("arm", "leftarm"), ("leg", "leg")]:
+        obj_directory = os.path.join(models_directory, segment)
+        run_sizing(segment, obj_directory, verbose=False)
+        betas, genders, measurements, sizes = training_data(f"{prefix}_sizes.csv",
+                                                           find_metadata(obj_directory))
+
+        report = evaluate_size_predictor(betas, genders, sizes, measurements)
+        print(f"\n{segment}: cross-validated accuracy {report['accuracy']:.3f}")
+        print(json.dumps(report["recall_by_size"], indent=2))
+        print(report["confusion"])
+        print(f"{report['us_per_single_query']:.1f} us per single query, "
+              f"{report['us_per_batched_query']:.3f} us per query in a batch")
+
+        save_size_predictor(train_size_predictor(betas, genders, sizes, measurements),
+                            f"{prefix}_size_predictor.npz")
@@ -0,0 +1,660 @@
+import os
+import copy
+import argparse
+import numpy as np
+import pandas as pd
+
+from obj_loader import load_obj_directory, models_directory
+from vertex_store import load_vertex_data, load_vertex_store, vertex_store_path, vertices_to_long_dataframe, \
+    VERTICES_FILE, MANIFEST_FILE
+from perimeter import ring_lengths
+from vertex_stats_accumulator import VertexStatsAccumulator
+from size_clustering import fit_sizes, sweep_k, choose_k, DEFAULT_TOLERANCE
+from size_optimizer import optimize_sizes, save_size_boundaries
+from outliers import flag_outliers
+from alignment import align_vertices
+from artifact_cache import ArtifactCache, parameters_hash
+from girth_profile import load_segment_faces, segment_mesh_file, girth_profiles, profile_dataframe, profile_summary
+from joint_landmarks import detect_joints, joint_lengths, joints_dataframe
+
+# Configuración por segmento: landmarks, longitudes, anillos de perímetro y número de tallas.
+# Cada longitud es (landmark_a, landmark_b, eje, operación); '-' mide abs(a - b) y '+' abs(a + b).
+# 'n_sizes' puede ser "auto": se evalúan los k de 'k_range' y se elige con choose_k
+# (el menor k con cobertura >= 'min_coverage', o el de mejor silueta si no se indica).
+# 'sizing' elige el método: "kmeans" (por defecto) o "accommodation", que calcula los rangos que
+# acomodan a más modelos dado el rango de ajuste de cada talla en 'adjustability' (m). Sólo se optimiza
+# la longitud total; las demás medidas de 'adjustability' sólo se informan (fracción de cada talla que
+# también cabe en su rango), no mueven los límites.
+# 'alignment' alinea los modelos antes de las estadísticas por vértice de cada talla: None (por defecto),
+# "anchor" (vértice 'anchor' en el origen), "procrustes" (ajuste rígido óptimo a la forma media) o "gpa"
+# (Procrustes generalizado). Las medidas y las tallas se calculan siempre sobre los vértices originales,
+# porque las longitudes por eje (y la operación '+') dependen de la posición y la orientación.
+# 'girth_stations' > 0 corta cada modelo con ese número de planos perpendiculares al eje 'girth_axis'
+# (usando las caras de 'mesh') y guarda el perfil de perímetros; None lo desactiva.
+# 'landmark_detection' = "geometric" estima hombro/codo/muñeca (cadera/rodilla/tobillo) a partir de la
+# línea central de cada malla y mide las longitudes en 3D, en lugar de usar los vértices de 'landmarks';
+# 'joint_detection' son las opciones de joint_landmarks.detect_joints (en el codo, que se dobla
+# gradualmente, el perímetro de las secciones ayuda a situar la articulación).
+SEGMENT_CONFIGS = {
+    "arm": {
+        "data": "leftarm_vertex_data.csv",
+        "prefix": "leftarm",
+        # hombro (367), codo (264) y muñeca (530)
+        "landmarks": {"shoulder": 367, "elbow": 264, "wrist": 530},
+        # vértice de alineación de set_origin.py (codo)
+        "anchor": 268,
+        "mesh": os.path.join(models_directory, "arm"),
+        "girth_axis": ("shoulder", "wrist"),
+        "girth_stations": None,
+        "joint_detection": {"trim": 0.25, "girth_weight": 0.5},
+        "lengths": {
+            "upper_arm_length": ("shoulder", "elbow", "X", "-"),
+            "forearm_length": ("elbow", "wrist", "X", "-"),
+        },
+        "rings": {
+            "upper_arm_width": [4, 5, 46, 73, 75, 86, 87, 101, 102, 98, 99, 56, 57, 95, 92, 91, 106, 107],
+            "forearm_width": [208, 294, 295, 330, 170, 169, 335, 161, 162, 188, 187, 300, 159, 155, 156, 209],
+        },
+        "n_sizes": 3,
+        "random_state": 42,
+        "plot_labels": {
+            "total_length": "Longitud Total del Brazo (m)",
+            "upper_arm_width": "Ancho de la zona proximal (m)",
+            "forearm_width": "Ancho de la zona distal (m)",
+            "title": "Rangos de Longitudes Totales del Brazo por Talla",
+        },
+    },
+    "leg": {
+        "data": "leg_vertex_data.csv",
+        "prefix": "leg",
+        # cadera (8), rodilla (95) y tobillo (332)
+        "landmarks": {"hip": 8, "knee": 95, "ankle": 332},
+        # vértice de alineación de set_origin.py (rodilla)
+        "anchor": 128,
+        "mesh": os.path.join(models_directory, "leg"),
+        "girth_axis": ("hip", "ankle"),
+        "girth_stations": None,
+        "joint_detection": {},
+        "lengths": {
+            "upper_leg_length": ("hip", "knee", "Y", "+"),
+            "lower_leg_length": ("knee", "ankle", "Y", "+"),
+        },
+        "rings": {
+            "upper_leg_width": [35, 221, 253, 254, 306, 58, 59, 61, 62, 65, 66, 68, 69, 74, 75, 290, 34],
+            "lower_leg_width": [170, 232, 264, 183, 181, 180, 176, 177, 283, 281, 279, 173, 172, 301, 169],
+        },
+        "n_sizes": 3,
+        "random_state": 42,
+        "plot_labels": {
+            "total_length": "Longitud Total de la Pierna (m)",
+            "upper_leg_width": "Ancho del Muslo (m)",
+            "lower_leg_width": "Ancho de la Tibia (m)",
+            "title": "Rangos de Longitudes Totales de la Pierna por Talla",
+        },
+    },
+}
+
+# Etiquetas de talla según el número de tallas
+SIZE_LABELS = {
+    1: ["U"],
+    2: ["S", "L"],
+    3: ["S", "M", "L"],
+    4: ["S", "M", "L", "XL"],
+    5: ["XS", "S", "M", "L", "XL"],
+    6: ["XS", "S", "M", "L", "XL", "XXL"],
+    7: ["XXS", "XS", "S", "M", "L", "XL", "XXL"],
+}
+
+SIZE_COLORS = ["blue", "green", "red", "orange", "purple", "brown", "gray"]
+
+
+def get_config(segment, **overrides):
+    """
+    Returns a copy of a segment configuration with some entries replaced.
+
+    :param segment: Segment name ('arm' or 'leg').
+    :param overrides: Configuration entries to replace (e.g. n_sizes=4).
+    :return: Configuration dictionary.
+    """
+    if segment not in SEGMENT_CONFIGS:
+        raise KeyError(f"Unknown segment '{segment}'. Available: {list(SEGMENT_CONFIGS)}")
+    config = copy.deepcopy(SEGMENT_CONFIGS[segment])
+    config.update(overrides)
+    return config
+
+
+def size_labels_for(n_sizes):
+    """
+    Returns the size labels for a number of sizes, from smallest to largest.
+
+    :param n_sizes: Number of sizes.
+    :return: List of labels.
+    """
+    if n_sizes in SIZE_LABELS:
+        return SIZE_LABELS[n_sizes]
+    return [f"T{i + 1}" for i in range(n_sizes)]
+
+
+def load_segment_vertices(source):
+    """
+    Loads the vertex tensor of a segment from a long CSV, a vertex store or an OBJ directory.
+
+    :param source: Path to a long-format CSV, a vertex store directory or a directory of OBJ files.
+    :return: Tuple (vertices of shape (N_models, N_vertices, 3), list of model names).
+    """
+    if os.path.isdir(source):
+        if os.path.exists(os.path.join(source, VERTICES_FILE)):
+            vertices, manifest = load_vertex_store(source)
+            names = manifest["ObjectName"].tolist()
+        else:
+            vertices, names = load_obj_directory(source)
+    else:
+        vertices, manifest = load_vertex_data(source)
+        names = manifest["ObjectName"].tolist()
+    return vertices, names
+
+
+def segment_source_files(source):
+    """
+    Files read by load_segment_vertices for a source, used to fingerprint it: the vertex store
+    (its tensor and manifest), the OBJ directory, or the CSV, falling back to the store of the
+    CSV when only the store exists.
+
+    :param source: Same as in load_segment_vertices.
+    :return: List of paths (files or directories).
+    """
+    if os.path.isdir(source) and not os.path.exists(os.path.join(source, VERTICES_FILE)):
+        return [source]
+    if os.path.isdir(source):
+        store_path = source
+    elif os.path.exists(source):
+        return [source]
+    else:
+        store_path = vertex_store_path(source)
+    return [os.path.join(store_path, VERTICES_FILE), os.path.join(store_path, MANIFEST_FILE)]
+
+
+def compute_landmarks(vertices, names, config):
+    """
+    Extracts the landmark coordinates of every model.
+
+    :param vertices: Array of shape (N_models, N_vertices, 3).
+    :param names: List of model names.
+    :param config: Segment configuration.
+    :return: DataFrame with ObjectName and one X/Y/Z column per landmark vertex (e.g. X_367).
+    """
+    indices = list(config["landmarks"].values())
+    points = np.asarray(vertices)[:, indices].astype(np.float64)
+
+    landmarks = pd.DataFrame({"ObjectName": names})
+    for axis_index, axis in enumerate("XYZ"):
+        for column, vertex in enumerate(indices):
+            landmarks[f"{axis}_{vertex}"] = points[:, column, axis_index]
+    return landmarks
+
+
+def compute_features(vertices, names, config):
+    """
+    Computes the anatomical features (lengths, total length and ring perimeters) of every model.
+    Lengths come from the landmark vertices, or from the geometrically detected joints when
+    config['landmark_detection'] is 'geometric'.
+
+    :param vertices: Array of shape (N_models, N_vertices, 3).
+    :param names: List of model names.
+    :param config: Segment configuration.
+    :return: DataFrame with one row per model.
+    """
+    length_columns = list(config["lengths"])
+    if config.get("landmark_detection", "vertices") == "geometric":
+        joints = detect_joints(vertices, load_segment_faces(config["mesh"]), **config.get("joint_detection", {}))
+        features = joints_dataframe(names, joints, list(config["landmarks"]))
+        for length_name, values in zip(length_columns, joint_lengths(joints)):
+            features[length_name] = values
+    else:
+        features = compute_landmarks(vertices, names, config)
+        for length_name, (start, end, axis, operation) in config["lengths"].items():
+            a = features[f"{axis}_{config['landmarks'][start]}"]
+            b = features[f"{axis}_{config['landmarks'][end]}"]
+            features[length_name] = abs(a - b) if operation == "-" else abs(a + b)
+    features["total_length"] = features[length_columns].sum(axis=1)
+
+    for ring_name, values in ring_lengths(vertices, config["rings"]).items():
+        features[ring_name] = values
+    return features
+
+
+def compute_girth_profile(vertices, names, config):
+    """
+    Slices every model with config['girth_stations'] planes perpendicular to its limb axis.
+
+    :param vertices: Array of shape (N_models, N_vertices, 3).
+    :param names: List of model names.
+    :param config: Segment configuration.
+    :return: DataFrame with ObjectName, axis_length and one girth column per station.
+    """
+    start, end = (config["landmarks"][name] for name in config["girth_axis"])
+    girths, lengths = girth_profiles(vertices, load_segment_faces(config["mesh"]), start, end,
+                                     config["girth_stations"])
+    return profile_dataframe(names, girths, lengths)
+
+
+def assign_sizes(features, config):
+    """
+    Assigns a size to every model. By default the models are clustered on the length features
+    (KMeans, or mini-batch KMeans for large populations); with config['sizing'] == 'accommodation'
+    the size ranges maximize the share of models within the adjustability of their size.
+    Sizes are labelled in order of total length.
+
+    :param features: DataFrame returned by compute_features.
+    :param config: Segment configuration.
+    :return: Copy of features with 'cluster' and 'size' columns ('fits' too for accommodation).
+    """
+    features = features.copy()
+    n_sizes = config["n_sizes"]
+
+    if config.get("sizing", "kmeans") == "accommodation":
+        return accommodate_sizes(features, config)[0]
+
+    labels, _, _, _ = fit_sizes(features[list(config["lengths"])].to_numpy(), n_sizes, config["random_state"])
+    features["cluster"] = labels
+
+    # Asignar etiquetas de talla ordenadas por longitud total
+    cluster_order = features.groupby("cluster")["total_length"].mean().sort_values().index
+    size_labels = dict(zip(cluster_order, size_labels_for(n_sizes)))
+    features["size"] = features["cluster"].map(size_labels)
+    return features
+
+
+def accommodate_sizes(features, config):
+    """
+    Assigns sizes with the accommodation-optimal size ranges of size_optimizer.
+
+    :param features: DataFrame returned by compute_features.
+    :param config: Segment configuration ('n_sizes' and 'adjustability').
+    :return: Tuple (copy of features with 'cluster', 'size' and 'fits' columns, optimize_sizes result).
+    """
+    features = features.copy()
+    n_sizes = config["n_sizes"]
+    result = optimize_sizes(features, n_sizes, config.get("adjustability"), size_labels=size_labels_for(n_sizes))
+    features["cluster"] = result["cluster"]
+    features["size"] = result["size"]
+    features["fits"] = result["fits_all"]
+    return features, result
+
+
+def choose_n_sizes(features, config, workers=None):
+    """
+    Evaluates every number of sizes in config['k_range'] in parallel and chooses one.
+
+    :param features: DataFrame returned by compute_features.
+    :param config: Segment configuration.
+    :param workers: Number of worker processes for the sweep.
+    :return: Tuple (chosen number of sizes, DataFrame of scores per k).
+    """
+    low, high = config.get("k_range", (2, 7))
+    scores = sweep_k(features[list(config["lengths"])].to_numpy(), range(low, high + 1), workers,
+                     config["random_state"], config.get("tolerance", DEFAULT_TOLERANCE))
+    return choose_k(scores, config.get("min_coverage")), scores
+
+
+def compute_size_ranges(features, column="total_length"):
+    """
+    Computes the min/max range of a feature for every size.
+
+    :param features: DataFrame with a 'size' column.
+    :param column: Feature to summarize.
+    :return: DataFrame with columns size, min, max.
+    """
+    return features.groupby("size")[column].agg(["min", "max"]).reset_index()
+
+
+def count_by_size(features, column="total_length"):
+    """
+    Counts the models of every size and their IQR outliers on a feature.
+
+    :param features: DataFrame with a 'size' column.
+    :param column: Feature used to detect outliers.
+    :return: DataFrame with columns size, count, percentage, outlier_count, outlier_percentage.
+    """
+    counts = features["size"].value_counts().reset_index()
+    counts.columns = ["size", "count"]
+    counts["percentage"] = 100 * counts["count"] / counts["count"].sum()
+
+    flags, _ = flag_outliers(features, [column])
+    outlier_counts = flags[f"{column}_iqr"].groupby(features["size"].to_numpy()).sum()
+    counts["outlier_count"] = outlier_counts.reindex(counts["size"]).to_numpy().astype(int)
+    counts["outlier_percentage"] = 100 * counts["outlier_count"] / counts["count"]
+    return counts
+
+
+def compute_vertex_stats_by_size(vertices, sizes, batch_size=4096):
+    """
+    Computes mean, std, min and max of every vertex coordinate for each size with
+    masked reductions along the model axis of the vertex tensor. Models are read in
+    batches, so memory stays bounded for large (or memory-mapped) populations.
+
+    :param vertices: Array of shape (N_models, N_vertices, 3).
+    :param sizes: Size label of every model, in the same order as vertices.
+    :param batch_size: Number of models reduced per step.
+    :return: DataFrame with the same columns as '*_vertex_stats_by_size.csv'.
+    """
+    sizes = np.asarray(sizes)
+    labels, inverse = np.unique(sizes, return_inverse=True)
+
+    # Un acumulador (sin cuantiles) por talla
+    accumulators = [VertexStatsAccumulator(vertices.shape[1], quantiles=None) for _ in labels]
+    for start in range(0, len(sizes), batch_size):
+        batch = np.asarray(vertices[start:start + batch_size])
+        batch_labels = inverse[start:start + batch_size]
+        for position in np.unique(batch_labels):
+            accumulators[position].update(batch[batch_labels == position])
+
+    mean = np.stack([accumulator.mean for accumulator in accumulators])
+    std = np.stack([accumulator.std for accumulator in accumulators])
+    minimum = np.stack([accumulator.min for accumulator in accumulators])
+    maximum = np.stack([accumulator.max for accumulator in accumulators])
+
+    n_sizes, n_vertices, _ = mean.shape
+    stats_by_size = pd.DataFrame({
+        "size": np.repeat(labels, n_vertices),
+        "VertexIndex": np.tile(np.arange(n_vertices), n_sizes),
+    })
+    for axis_index, axis in enumerate("XYZ"):
+        for name, values in [("mean", mean), ("std", std), ("min", minimum), ("max", maximum)]:
+            stats_by_size[f"{axis}_{name}"] = values[:, :, axis_index].ravel()
+    stats_by_size["Std_Combined"] = np.sqrt((std ** 2).sum(axis=2)).ravel()
+    return stats_by_size
+
+
+def save_vertex_data_with_sizes(vertices, names, per_model, output_path):
+    """
+    Saves the long vertex table joined with per-model columns ('*_vertex_data_with_sizes.csv').
+
+    :param vertices: Array of shape (N_models, N_vertices, 3).
+    :param names: List of model names.
+    :param per_model: DataFrame with ObjectName and the columns to join (size, cluster, ...).
+    :param output_path: Path of the CSV file.
+    """
+    merged_data = vertices_to_long_dataframe(vertices, names).merge(per_model, on="ObjectName", how="left")
+    merged_data.to_csv(output_path, index=False)
+
+
+def plot_size_features(features, config, output_path):
+    """
+    Saves the scatter plots of every ring perimeter against total length, colored by size.
+
+    :param features: DataFrame returned by assign_sizes.
+    :param config: Segment configuration.
+    :param output_path: Path of the image file.
+    """
+    from matplotlib.figure import Figure
+
+    labels = config.get("plot_labels", {})
+    rings = list(config["rings"])
+    order = size_labels_for(config["n_sizes"])
+
+    fig = Figure(figsize=(6 * len(rings), 5))
+    axes = fig.subplots(1, len(rings), squeeze=False)[0]
+    for ax, ring_name in zip(axes, rings):
+        for size, color in zip(order, SIZE_COLORS):
+            subset = features[features["size"] == size]
+            ax.scatter(subset["total_length"], subset[ring_name], c=color, label=size, s=50)
+        ax.set_xlabel(labels.get("total_length", "total_length"))
+        ax.set_ylabel(labels.get(ring_name, ring_name))
+        ax.legend(title="Talla", loc="lower right")
+    fig.tight_layout()
+    fig.savefig(output_path)
+
+
+def plot_size_ranges(size_ranges, config, output_path):
+    """
+    Saves the bar plot of the total length range of every size.
+
+    :param size_ranges: DataFrame returned by compute_size_ranges.
+    :param config: Segment configuration.
+    :param output_path: Path of the image file.
+    """
+    from matplotlib.figure import Figure
+
+    labels = config.get("plot_labels", {})
+    order = size_labels_for(config["n_sizes"])
+    size_ranges = size_ranges.set_index("size").reindex([s for s in order if s in set(size_ranges["size"])]).reset_index()
+
+    fig = Figure(figsize=(10, 6))
+    ax = fig.subplots()
+    ax.bar(size_ranges["size"], size_ranges["max"] - size_ranges["min"], bottom=size_ranges["min"],
+           color=SIZE_COLORS[:len(size_ranges)])
+    ax.set_xlabel("Talla")
+    ax.set_ylabel(labels.get("total_length", "total_length"))
+    ax.set_title(labels.get("title", ""))
+    for _, row in size_ranges.iterrows():
+        ax.text(row["size"], row["min"], f"{row['min']:.2f}", ha="center", va="bottom")
+        ax.text(row["size"], row["max"], f"{row['max']:.2f}", ha="center", va="top")
+    fig.savefig(output_path)
+
+
+def sizing_stage(features, config):
+    """
+    Chooses the number of sizes if needed and assigns the sizes.
+
+    :param features: DataFrame returned by compute_features.
+    :param config: Segment configuration.
+    :return: Tuple (number of sizes, k sweep or None, features with sizes, accommodation result or None).
+    """
+    k_sweep = None
+    n_sizes = config["n_sizes"]
+    if n_sizes == "auto":
+        n_sizes, k_sweep = choose_n_sizes(features, config)
+    config = dict(config, n_sizes=n_sizes)
+
+    accommodation = None
+    if config.get("sizing", "kmeans") == "accommodation":
+        features, accommodation = accommodate_sizes(features, config)
+    else:
+        features = assign_sizes(features, config)
+    return n_sizes, k_sweep, features, accommodation
+
+
+def run_sizing(segment, source=None, output_dir=".", plots=False, save_merged=False,
+               vertex_data=None, verbose=True, cache_dir=None, **overrides):
+    """
+    Runs the complete sizing pipeline for a segment without any interactive window.
+
+    :param segment: Segment name ('arm' or 'leg').
+    :param source: Long CSV, vertex store or OBJ directory. Defaults to the configured CSV.
+    :param output_dir: Directory where the CSV files (and plots) are written.
+    :param plots: Whether to save the plots as PNG files.
+    :param save_merged: Whether to also save the long '*_vertex_data_with_sizes.csv' table.
+    :param vertex_data: Optional (vertices, names) already loaded from source, to avoid reading it again.
+    :param verbose: Whether to print the summary tables.
+    :param cache_dir: Optional directory (or ArtifactCache) where the features, sizes and per-size
+                      statistics are cached; stages whose source data and parameters are unchanged
+                      are loaded instead of recomputed.
+    :param overrides: Configuration entries to replace (e.g. n_sizes=4).
+    :return: Dictionary with the features, size ranges, counts, outlier flags, per-size statistics
+             and girth profiles (None unless config['girth_stations'] is set).
+    """
+    config = get_config(segment, **overrides)
+    prefix = config["prefix"]
+    source = source or config["data"]
+    os.makedirs(output_dir, exist_ok=True)
+    cache = ArtifactCache(cache_dir) if isinstance(cache_dir, str) else cache_dir
+
+    loaded = {}
+
+    def load():
+        # Los vértices sólo se leen si alguna etapa no está en la caché
+        if not loaded:
+            vertices, names = load_segment_vertices(source) if vertex_data is None else vertex_data
+            loaded.update(vertices=vertices, names=names)
+        return loaded["vertices"], loaded["names"]
+
+    def load_aligned():
+        # La alineación sólo se aplica a las estadísticas por vértice, no a las medidas
+        if "aligned" not in loaded:
+            loaded["aligned"] = align_vertices(load()[0], config.get("alignment"), config.get("anchor"))
+        return loaded["aligned"], loaded["names"]
+
+    def stage(name, parts, function):
+        if cache is None:
+            return None, function()
+        key = cache.key(name, *parts)
+        return key, cache.cached(key, function)
+
+    source_fingerprints = [cache.fingerprint(path) for path in segment_source_files(source)] if cache is not None else None
+    vertices_parts = [source_fingerprints]
+    aligned_parts = vertices_parts + [config.get("alignment"), config.get("anchor")]
+    geometric = config.get("landmark_detection", "vertices") == "geometric"
+    # Las caras de la malla sólo se usan para los landmarks geométricos y el perfil de perímetros
+    uses_mesh = geometric or bool(config.get("girth_stations"))
+    mesh_fingerprint = cache.fingerprint(segment_mesh_file(config["mesh"])) if cache is not None and uses_mesh else None
+    features_key, features = stage(
+        "features", vertices_parts + [config["landmarks"], config["lengths"], config["rings"],
+                                      config.get("landmark_detection", "vertices"),
+                                      [mesh_fingerprint, config.get("joint_detection")] if geometric else None],
+        lambda: compute_features(*load(), config))
+
+    girth_profile = None
+    if config.get("girth_stations"):
+        _, girth_profile = stage(
+            "girth_profile", vertices_parts + [mesh_fingerprint, config["landmarks"], config["girth_axis"],
+                                               config["girth_stations"]],
+            lambda: compute_girth_profile(*load(), config))
+        summary = profile_summary(girth_profile.iloc[:, 2:].to_numpy())
+        features = pd.concat([features, summary], axis=1)
+
+    sizing_parameters = {key: value for key, value in config.items()
+                         if key not in ("data", "prefix", "plot_labels", "alignment", "anchor")}
+    sizes_key, (config["n_sizes"], k_sweep, features, accommodation) = stage(
+        "sizes", [features_key, sizing_parameters], lambda: sizing_stage(features, config))
+    if k_sweep is not None:
+        k_sweep.to_csv(os.path.join(output_dir, f"{prefix}_k_sweep.csv"), index=False)
+        if verbose:
+            print(k_sweep)
+            print(f"Chosen number of sizes: {config['n_sizes']}")
+
+    size_ranges = compute_size_ranges(features)
+    counts = count_by_size(features)
+    outlier_columns = [*config["lengths"], "total_length", *config["rings"]]
+    if girth_profile is not None:
+        outlier_columns += ["max_girth", "min_girth"]
+    outliers, _ = flag_outliers(features, outlier_columns)
+
+    _, stats_by_size = stage("stats_by_size", aligned_parts + [sizes_key],
+                             lambda: compute_vertex_stats_by_size(load_aligned()[0], features["size"]))
+    if save_merged:
+        per_model_columns = ["ObjectName", "total_length", *config["rings"], "cluster", "size"]
+        save_vertex_data_with_sizes(*load_aligned(), features[per_model_columns],
+                                    os.path.join(output_dir, f"{prefix}_vertex_data_with_sizes.csv"))
+
+    features.to_csv(os.path.join(output_dir, f"{prefix}_sizes.csv"), index=False)
+    boundaries_path = os.path.join(output_dir, f"{prefix}_size_boundaries.json")
+    if accommodation is not None:
+        save_size_boundaries(boundaries_path, accommodation["ranges"],
+                             adjustability=accommodation["adjustability"], coverage=accommodation["coverage"])
+    else:
+        save_size_boundaries(boundaries_path, size_ranges)
+    stats_by_size.to_csv(os.path.join(output_dir, f"{prefix}_vertex_stats_by_size.csv"), index=False)
+    if girth_profile is not None:
+        girth_profile.to_csv(os.path.join(output_dir, f"{prefix}_girth_profile.csv"), index=False)
+    pd.concat([features[["ObjectName", "size"]], outliers], axis=1).to_csv(
+        os.path.join(output_dir, f"{prefix}_outliers.csv"), index=False)
+
+    if plots:
+        plot_size_features(features, config, os.path.join(output_dir, f"{prefix}_sizes_scatter.png"))
+        plot_size_ranges(size_ranges, config, os.path.join(output_dir, f"{prefix}_size_ranges.png"))
+
+    if verbose:
+        print(features[["ObjectName", *config["lengths"], "total_length", "cluster", "size"]])
+        print(size_ranges)
+        print(counts)
+        print(f"Outside all sizes: {int(outliers['outside_all_sizes'].sum())} models")
+        if accommodation is not None:
+            print(accommodation["accommodation"])
+            print(f"Accommodated: {accommodation['coverage']:.1%} on {accommodation['primary']}, "
+                  f"{accommodation['coverage_all_features']:.1%} on all features")
+
+    return {
+        "config": config,
+        "features": features,
+        "size_ranges": size_ranges,
+        "counts": counts,
+        "outliers": outliers,
+        "stats_by_size": stats_by_size,
+        "k_sweep": k_sweep,
+        "accommodation": accommodation,
+        "girth_profile": girth_profile,
+    }
+
+
+def source_tag(source):
+    """
+    Short name of a data source for output directories: its file or directory name plus a hash
+    of its absolute path, so different sources with the same name do not collide.
+
+    :param source: Same as in load_segment_vertices.
+    :return: Tag string, e.g. 'leftarm_vertex_data-3f9a1c'.
+    """
+    name = os.path.splitext(os.path.basename(os.path.normpath(source)))[0]
+    return f"{name}-{parameters_hash(os.path.abspath(source))[:6]}"
+
+
+def run_batch(jobs, output_dir=".", plots=False, verbose=False, cache_dir=None):
+    """
+    Runs several segment/configuration combinations, loading each data source only once.
+
+    :param jobs: List of dictionaries with 'segment' and optional 'source' and configuration overrides.
+    :param output_dir: Base directory; each job writes to its own subdirectory, named after the segment,
+                       the source (see source_tag) and the overrides.
+    :param plots: Whether to save the plots of every job.
+    :param verbose: Whether to print the summary tables of every job.
+    :param cache_dir: Optional artifact cache directory shared by all jobs (see run_sizing).
+    :return: List of the results returned by run_sizing, in the same order as jobs.
+    """
+    cache = ArtifactCache(cache_dir) if cache_dir else None
+    loaded = {}
+    results = []
+    for job in jobs:
+        job = dict(job)
+        segment = job.pop("segment")
+        source = job.pop("source", None) or SEGMENT_CONFIGS[segment]["data"]
+        if source not in loaded:
+            loaded[source] = load_segment_vertices(source)
+
+        job_name = "_".join([segment, source_tag(source)] + [f"{key}{value}" for key, value in sorted(job.items())])
+        results.append(run_sizing(segment, source, os.path.join(output_dir, job_name), plots=plots,
+                                  vertex_data=loaded[source], verbose=verbose, cache_dir=cache, **job))
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Asignación de tallas por segmento sin interfaz gráfica.")
+    parser.add_argument("segments", nargs="+", choices=list(SEGMENT_CONFIGS))
+    parser.add_argument("--source", help="CSV largo, almacén de vértices o directorio de OBJ")
+    parser.add_argument("--sizes", nargs="+", help="Número(s) de tallas a evaluar, o 'auto'")
+    parser.add_argument("--output-dir", default=".")
+    parser.add_argument("--plots", action="store_true", help="Guardar las gráficas como PNG")
+    parser.add_argument("--sizing", choices=["kmeans", "accommodation"],
+                        help="Método de asignación de tallas (por defecto el de la configuración)")
+    parser.add_argument("--align", choices=["anchor", "procrustes", "gpa"],
+                        help="Alinear los modelos antes de las estadísticas por vértice (no cambia las tallas)")
+    parser.add_argument("--cache-dir", help="Directorio de caché de las etapas intermedias")
+    parser.add_argument("--girth-stations", type=int, help="Número de planos del perfil de perímetros")
+    parser.add_argument("--landmarks", choices=["vertices", "geometric"],
+                        help="Landmarks por vértices fijos o detectados geométricamente (longitudes 3D)")
+    args = parser.parse_args()
+
+    jobs = [
+        {"segment": segment, "source": args.source, **({"n_sizes": k if k == "auto" else int(k)} if k else {}),
+         **({"sizing": args.sizing} if args.sizing else {}), **({"alignment": args.align} if args.align else {}),
+         **({"girth_stations": args.girth_stations} if args.girth_stations else {}),
+         **({"landmark_detection": args.landmarks} if args.landmarks else {})}
+        for segment in args.segments
+        for k in (args.sizes or [None])
+    ]
+    if len(jobs) == 1:
+        job = jobs[0]
+        run_sizing(job.pop("segment"), job.pop("source"), args.output_dir, plots=args.plots,
+                   cache_dir=args.cache_dir, **job)
+    else:
+        run_batch(jobs, args.output_dir, plots=args.plots, verbose=True, cache_dir=args.cache_dir)
@@ -0,0 +1,535 @@
+import os
+import json
+import time
+import asyncio
+import http.client
+import socket
+import numbers
+from collections import deque
+import numpy as np
+
+from size_optimizer import load_size_boundaries, assign_to_intervals
+from size_predictor import load_size_predictor, predict_sizes, BODY_MEASUREMENTS
+
+# Dirección por defecto del servicio (sólo local)
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8765
+
+# Micro-lotes: máximo de peticiones por predicción y espera máxima (s) para juntar peticiones concurrentes
+DEFAULT_MAX_BATCH = 256
+DEFAULT_MAX_DELAY = 0.002
+
+# Latencias recientes usadas para los percentiles de /stats
+LATENCY_WINDOW = 10000
+
+# Tamaño máximo del cuerpo de una petición (bytes)
+MAX_BODY_BYTES = 1 << 20
+
+HTTP_REASONS = {200: "OK", 400: "Bad Request", 404: "Not Found", 405: "Method Not Allowed",
+                413: "Payload Too Large", 500: "Internal Server Error"}
+
+
+def finite_numbers(values, name):
+    """
+    Converts the numbers of a request to a float64 array. Booleans, strings and non-finite
+    values (NaN, Infinity) are rejected, since float() would accept them silently.
+
+    :param values: Number or (nested) list of numbers.
+    :param name: Name of the field, used in the error message.
+    :return: Flat float64 array.
+    """
+    try:
+        array = np.asarray(values, dtype=object).ravel()
+        if all(isinstance(value, numbers.Real) and not isinstance(value, (bool, np.bool_)) for value in array):
+            array = array.astype(np.float64)
+            if np.isfinite(array).all():
+                return array
+    except (ValueError, OverflowError):
+        pass
+    raise ValueError(f"'{name}' must contain only finite numbers.")
+
+
+class SizingModel:
+    """
+    Fitted sizing model held in memory: the size boundaries of the clustering pipeline
+    ('<prefix>_size_boundaries.json') and, optionally, the betas -> size predictor
+    ('<prefix>_size_predictor.npz'). Predictions are made for whole batches of requests.
+
+    A request is a dictionary with either the boundary feature among its measurements
+    ({"measurements": {"total_length": 3.3}}) or a beta vector ({"betas": [...], "gender": "female",
+    "measurements": {"height": 1.7, "weight": 60}}), the latter only when a predictor is loaded.
+    """
+
+    def __init__(self, boundaries, predictor=None):
+        """
+        :param boundaries: Dictionary returned by size_optimizer.load_size_boundaries.
+        :param predictor: Optional dictionary returned by size_predictor.load_size_predictor.
+        """
+        self.feature = boundaries["feature"]
+        sizes = sorted(boundaries["sizes"], key=lambda size: size["min"])
+        self.labels = np.array([size["size"] for size in sizes], dtype=str)
+        self.intervals = [(size["min"], size["max"]) for size in sizes]
+        self.predictor = predictor
+
+    @classmethod
+    def load(cls, boundaries_path, predictor_path=None):
+        """
+        Loads the model files once.
+
+        :param boundaries_path: Path of '<prefix>_size_boundaries.json'.
+        :param predictor_path: Optional path of '<prefix>_size_predictor.npz'.
+        :return: SizingModel.
+        """
+        predictor = load_size_predictor(predictor_path) if predictor_path else None
+        return cls(load_size_boundaries(boundaries_path), predictor)
+
+    def describe(self):
+        """
+        Summary of the loaded model (for /health).
+        """
+        return {
+            "feature": self.feature,
+            "sizes": self.labels.tolist(),
+            "predictor": self.predictor is not None,
+            "predictor_genders": [] if self.predictor is None else self.predictor["genders"].tolist(),
+        }
+
+    def parse(self, request):
+        """
+        Validates a request and returns its kind and its values.
+
+        :param request: Request dictionary (see the class docstring).
+        :return: Tuple ("boundaries", feature value) or ("predictor", (betas, gender, measurements)).
+        """
+        if not isinstance(request, dict):
+            raise ValueError("A request must be a JSON object.")
+        measurements = request.get("measurements") or {}
+        if not isinstance(measurements, (dict, list)):
+            raise ValueError("'measurements' must be an object or a list.")
+
+        if request.get("betas") is None:
+            if not isinstance(measurements, dict) or self.feature not in measurements:
+                raise ValueError(f"The request needs 'betas' or the measurement '{self.feature}'.")
+            value = finite_numbers(measurements[self.feature], self.feature)
+            if len(value) != 1:
+                raise ValueError(f"'{self.feature}' must be a single number.")
+            return "boundaries", float(value[0])
+
+        if self.predictor is None:
+            raise ValueError("No size predictor is loaded; send the measurement "
+                             f"'{self.feature}' instead of betas.")
+        betas = finite_numbers(request["betas"], "betas")
+        genders = self.predictor["genders"]
+        gender = request.get("gender", genders[0] if len(genders) == 1 else None)
+        if gender not in genders:
+            raise ValueError(f"'gender' must be one of {genders.tolist()}.")
+        if isinstance(measurements, dict):
+            measurements = [measurements[name] for name in BODY_MEASUREMENTS if name in measurements]
+        measurements = finite_numbers(measurements, "measurements")
+
+        # Ancho de predictor_features: betas, indicador e interacciones por género extra y medidas
+        width = len(betas) + (len(genders) - 1) * (len(betas) + 1) + len(measurements)
+        if width != len(self.predictor["mean"]) or (len(measurements) > 0) != bool(self.predictor["uses_measurements"]):
+            raise ValueError("The betas and measurements do not match the predictor "
+                             f"({len(self.predictor['mean'])} features).")
+        return "predictor", (betas, gender, measurements)
+
+    def predict(self, requests):
+        """
+        Size of every request of a batch, with one vectorized prediction per kind of request.
+        Invalid requests get their error without affecting the rest of the batch.
+
+        :param requests: List of request dictionaries.
+        :return: List with a result dictionary or a ValueError per request.
+        """
+        results = [None] * len(requests)
+        boundaries, predictor = [], {}
+        for position, request in enumerate(requests):
+            try:
+                kind, values = self.parse(request)
+            except (ValueError, TypeError, KeyError) as error:
+                results[position] = ValueError(str(error))
+                continue
+            if kind == "boundaries":
+                boundaries.append((position, values))
+            else:
+                # Se agrupan por número de betas y de medidas para poder apilarlas
+                predictor.setdefault((len(values[0]), len(values[2])), []).append((position, values))
+
+        if boundaries:
+            positions, values = zip(*boundaries)
+            clusters, inside = assign_to_intervals(np.array(values), self.intervals)
+            for position, cluster, fits in zip(positions, clusters, inside):
+                results[position] = {"size": str(self.labels[cluster]), "method": "boundaries",
+                                     "inside": bool(fits)}
+
+        for group in predictor.values():
+            positions = [position for position, _ in group]
+            betas = np.stack([values[0] for _, values in group])
+            genders = np.array([values[1] for _, values in group])
+            measurements = np.stack([values[2] for _, values in group]) if group[0][1][2].size else None
+            labels, probabilities = predict_sizes(self.predictor, betas, genders, measurements, return_proba=True)
+            classes = self.predictor["classes"].tolist()
+            for position, label, row in zip(positions, labels, probabilities):
+                results[position] = {"size": str(label), "method": "predictor",
+                                     "probabilities": dict(zip(classes, row.round(6).tolist()))}
+        return results
+
+
+class ServiceStats:
+    """
+    Latency and throughput counters of the service.
+    """
+
+    def __init__(self, window=LATENCY_WINDOW):
+        self.started = time.perf_counter()
+        self.requests = 0
+        self.errors = 0
+        self.batches = 0
+        self.max_batch_size = 0
+        self.predict_seconds = 0.0
+        self.latencies = deque(maxlen=window)
+
+    def record_batch(self, size, seconds):
+        self.batches += 1
+        self.max_batch_size = max(self.max_batch_size, size)
+        self.predict_seconds += seconds
+
+    def record_request(self, latency, failed=False):
+        self.requests += 1
+        self.errors += failed
+        self.latencies.append(latency)
+
+    def snapshot(self):
+        """
+        Current counters: totals, throughput since start, batch sizes and latency percentiles (ms)
+        over the most recent requests.
+        """
+        uptime = time.perf_counter() - self.started
+        latencies = np.array(self.latencies) * 1000
+        percentiles = np.percentile(latencies, [50, 95, 99]) if len(latencies) else [0.0] * 3
+        return {
+            "uptime_s": uptime,
+            "requests": self.requests,
+            "errors": self.errors,
+            "batches": self.batches,
+            "mean_batch_size": self.requests / self.batches if self.batches else 0.0,
+            "max_batch_size": self.max_batch_size,
+            "throughput_rps": self.requests / uptime if uptime > 0 else 0.0,
+            "predict_ms_per_batch": self.predict_seconds * 1000 / self.batches if self.batches else 0.0,
+            "latency_ms": {
+                "mean": float(latencies.mean()) if len(latencies) else 0.0,
+                "p50": float(percentiles[0]),
+                "p95": float(percentiles[1]),
+                "p99": float(percentiles[2]),
+            },
+        }
+
+
+class MicroBatcher:
+    """
+    Gathers the requests that arrive concurrently into batches: the first request of a batch waits
+    at most max_delay seconds for others (or until max_batch are queued), and the whole batch is
+    predicted with a single call.
+    """
+
+    def __init__(self, model, stats, max_batch=DEFAULT_MAX_BATCH, max_delay=DEFAULT_MAX_DELAY):
+        """
+        :param model: SizingModel.
+        :param stats: ServiceStats updated with every batch and request.
+        :param max_batch: Maximum number of requests per prediction.
+        :param max_delay: Maximum time (s) a request waits for others to join its batch.
+        """
+        self.model = model
+        self.stats = stats
+        self.max_batch = max_batch
+        self.max_delay = max_delay
+        self.queue = asyncio.Queue()
+        self.task = None
+
+    def start(self):
+        self.task = asyncio.get_running_loop().create_task(self.run())
+
+    async def stop(self):
+        if self.task:
+            self.task.cancel()
+            try:
+                await self.task
+            except asyncio.CancelledError:
+                pass
+
+    async def submit(self, request):
+        """
+        Queues a request and waits for its result.
+
+        :param request: Request dictionary.
+        :return: Result dictionary (raises ValueError for an invalid request).
+        """
+        future = asyncio.get_running_loop().create_future()
+        await self.queue.put((request, future, time.perf_counter()))
+        return await future
+
+    def drain(self, batch):
+        while len(batch) < self.max_batch and not self.queue.empty():
+            batch.append(self.queue.get_nowait())
+
+    async def run(self):
+        while True:
+            batch = [await self.queue.get()]
+            self.drain(batch)
+            if len(batch) < self.max_batch and self.max_delay > 0:
+                await asyncio.sleep(self.max_delay)
+                self.drain(batch)
+
+            start = time.perf_counter()
+            try:
+                results = self.model.predict([request for request, _, _ in batch])
+            except Exception as error:
+                results = [error] * len(batch)
+            finished = time.perf_counter()
+            self.stats.record_batch(len(batch), finished - start)
+
+            for (_, future, queued), result in zip(batch, results):
+                failed = isinstance(result, Exception)
+                self.stats.record_request(finished - queued, failed)
+                if future.done():
+                    continue
+                if failed:
+                    future.set_exception(result)
+                else:
+                    future.set_result(result)
+
+
+class SizingService:
+    """
+    Minimal HTTP/1.1 server (asyncio streams, keep-alive) over TCP or a Unix socket:
+
+    - POST /predict: one request object, or {"requests": [...]} for several; returns the result(s).
+    - GET /stats: latency and throughput counters.
+    - GET /health: loaded model summary.
+    """
+
+    def __init__(self, model, max_batch=DEFAULT_MAX_BATCH, max_delay=DEFAULT_MAX_DELAY):
+        """
+        :param model: SizingModel.
+        :param max_batch: Maximum number of requests per prediction.
+        :param max_delay: Maximum time (s) a request waits for others to join its batch.
+        """
+        self.model = model
+        self.stats = ServiceStats()
+        self.batcher = MicroBatcher(model, self.stats, max_batch, max_delay)
+        self.server = None
+
+    async def start(self, host=DEFAULT_HOST, port=DEFAULT_PORT, unix_path=None):
+        """
+        Starts listening (on a Unix socket if unix_path is given) and the batching task.
+
+        :return: asyncio Server.
+        """
+        self.batcher.start()
+        if unix_path:
+            if os.path.exists(unix_path):
+                os.remove(unix_path)
+            self.server = await asyncio.start_unix_server(self.handle, path=unix_path)
+        else:
+            self.server = await asyncio.start_server(self.handle, host, port)
+        return self.server
+
+    async def stop(self):
+        if self.server:
+            self.server.close()
+            await self.server.wait_closed()
+        await self.batcher.stop()
+
+    async def route(self, method, path, body):
+        """
+        Answers one HTTP request.
+
+        :return: Tuple (status code, JSON-serializable payload).
+        """
+        if path == "/stats":
+            return 200, self.stats.snapshot()
+        if path == "/health":
+            return 200, dict(self.model.describe(), status="ok")
+        if path != "/predict":
+            return 404, {"error": f"Unknown path {path}"}
+        if method != "POST":
+            return 405, {"error": "Use POST"}
+
+        try:
+            payload = json.loads(body or b"null")
+        except ValueError:
+            return 400, {"error": "The body is not valid JSON."}
+        if isinstance(payload, dict) and isinstance(payload.get("requests"), list):
+            # Todas las peticiones se encolan a la vez y caen en el mismo lote
+            results = await asyncio.gather(*(self.batcher.submit(request) for request in payload["requests"]),
+                                           return_exceptions=True)
+            return 200, {"results": [{"error": str(result)} if isinstance(result, Exception) else result
+                                     for result in results]}
+        try:
+            return 200, await self.batcher.submit(payload)
+        except ValueError as error:
+            return 400, {"error": str(error)}
+
+    async def handle(self, reader, writer):
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                method, path, version = line.decode("latin-1").split(maxsplit=2)
+                headers = {}
+                while True:
+                    header = await reader.readline()
+                    if header in (b"\r\n", b"\n", b""):
+                        break
+                    name, _, value = header.decode("latin-1").partition(":")
+                    headers[name.strip().lower()] = value.strip()
+
+                length = int(headers.get("content-length", 0))
+                if length > MAX_BODY_BYTES:
+                    status, payload = 413, {"error": "Request too large"}
+                    keep_alive = False
+                else:
+                    body = await reader.readexactly(length) if length else b""
+                    try:
+                        status, payload = await self.route(method, path.split("?")[0], body)
+                    except Exception as error:
+                        status, payload = 500, {"error": str(error)}
+                    connection = headers.get("connection", "").lower()
+                    keep_alive = connection != "close" and (version.strip() != "HTTP/1.0" or connection == "keep-alive")
+
+                content = json.dumps(payload).encode()
+                writer.write(f"HTTP/1.1 {status} {HTTP_REASONS.get(status, '')}\r\n"
+                             f"Content-Type: application/json\r\nContent-Length: {len(content)}\r\n"
+                             f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n".encode() + content)
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError, ValueError):
+            pass
+        finally:
+            writer.close()
+
+
+class UnixHTTPConnection(http.client.HTTPConnection):
+    """
+    HTTPConnection over a Unix socket.
+    """
+
+    def __init__(self, path, timeout=10):
+        super().__init__("localhost", timeout=timeout)
+        self.path = path
+
+    def connect(self):
+        self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.sock.settimeout(self.timeout)
+        self.sock.connect(self.path)
+
+
+class SizingClient:
+    """
+    Blocking client of the sizing service (one keep-alive connection, standard library only).
+    """
+
+    def __init__(self, host=DEFAULT_HOST, port=DEFAULT_PORT, unix_path=None, timeout=10):
+        """
+        :param host: Host of the service.
+        :param port: Port of the service.
+        :param unix_path: Unix socket of the service (instead of host and port).
+        :param timeout: Socket timeout (s).
+        """
+        if unix_path:
+            self.connection = UnixHTTPConnection(unix_path, timeout)
+        else:
+            self.connection = http.client.HTTPConnection(host, port, timeout=timeout)
+
+    def call(self, method, path, payload=None):
+        """
+        Sends one HTTP request.
+
+        :return: Tuple (status code, decoded JSON response).
+        """
+        body = None if payload is None else json.dumps(payload)
+        headers = {"Content-Type": "application/json"} if body is not None else {}
+        self.connection.request(method, path, body, headers)
+        response = self.connection.getresponse()
+        return response.status, json.loads(response.read())
+
+    def predict(self, request):
+        """
+        Size of one request, or of a list of requests (sent together so they share a batch).
+
+        :param request: Request dictionary or list of them (see SizingModel).
+        :return: Result dictionary, or list of result dictionaries.
+        """
+        if isinstance(request, list):
+            return self.call("POST", "/predict", {"requests": request})[1]["results"]
+        status, result = self.call("POST", "/predict", request)
+        if status != 200:
+            raise ValueError(result.get("error"))
+        return result
+
+    def stats(self):
+        return self.call("GET", "/stats")[1]
+
+    def health(self):
+        return self.call("GET", "/health")[1]
+
+    def close(self):
+        self.connection.close()
+
+
+async def serve(model, host=DEFAULT_HOST, port=DEFAULT_PORT, unix_path=None, max_batch=DEFAULT_MAX_BATCH,
+                max_delay=DEFAULT_MAX_DELAY):
+    """
+    Runs the service until cancelled.
+    """
+    service = SizingService(model, max_batch, max_delay)
+    server = await service.start(host, port, unix_path)
+    print(f"Serving {model.describe()} on {unix_path or f'http://{host}:{port}'}")
+    try:
+        async with server:
+            await server.serve_forever()
+    finally:
+        await service.stop()
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Servicio local de recomendación de tallas.")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    server_parser = subparsers.add_parser("serve", help="Cargar el modelo y atender peticiones")
+    server_parser.add_argument("prefix", help="Prefijo de las salidas del pipeline (leftarm, leg)")
+    server_parser.add_argument("--boundaries", help="Por defecto '<prefijo>_size_boundaries.json'")
+    server_parser.add_argument("--predictor", help="Por defecto '<prefijo>_size_predictor.npz' si existe")
+    server_parser.add_argument("--max-batch", type=int, default=DEFAULT_MAX_BATCH)
+    server_parser.add_argument("--max-delay", type=float, default=DEFAULT_MAX_DELAY, help="Segundos")
+    client_parser = subparsers.add_parser("query", help="Enviar una petición JSON (o 'stats', 'health')")
+    client_parser.add_argument("request", help="Objeto JSON, lista JSON, 'stats' o 'health'")
+    for subparser in (server_parser, client_parser):
+        subparser.add_argument("--host", default=DEFAULT_HOST)
+        subparser.add_argument("--port", type=int, default=DEFAULT_PORT)
+        subparser.add_argument("--unix", help="Socket Unix en lugar de TCP")
+    args = parser.parse_args()
+
+    if args.command == "serve":
+        predictor_path = args.predictor or f"{args.prefix}_size_predictor.npz"
+        model = SizingModel.load(args.boundaries or f"{args.prefix}_size_boundaries.json",
+                                 predictor_path if os.path.exists(predictor_path) else None)
+        try:
+            asyncio.run(serve(model, args.host, args.port, args.unix, args.max_batch, args.max_delay))
+        except KeyboardInterrupt:
+            pass
+    else:
+        client = SizingClient(args.host, args.port, args.unix)
+        if args.request in ("stats", "health"):
+            response = getattr(client, args.request)()
+        else:
+            try:
+                response = client.predict(json.loads(args.request))
+            except ValueError as error:
+                response = {"error": str(error)}
+        print(json.dumps(response, indent=2))
+        client.close()
@@ -0,0 +1,190 @@
+import os
+import csv
+import numpy as np
+
+# Este módulo sólo depende de numpy para poder importarse desde el Python de Blender
+
+# Número de vértices de la malla SMPL-X completa
+N_SMPLX_VERTICES = 10475
+
+
+class VertexGroupRegistry:
+    """
+    Named vertex groups stored as sorted, unique int32 index arrays, with a boolean mask
+    per group (built on first use) for O(1) membership tests and set operations.
+    """
+
+    def __init__(self, groups=None, n_vertices=N_SMPLX_VERTICES):
+        """
+        :param groups: Optional dictionary name -> iterable of vertex indices.
+        :param n_vertices: Number of vertices of the mesh the indices refer to.
+        """
+        self.n_vertices = n_vertices
+        self._groups = {}
+        self._masks = {}
+        for name, indices in (groups or {}).items():
+            self.add(name, indices)
+
+    def add(self, name, indices):
+        """
+        Adds (or replaces) a group.
+
+        :param name: Group name.
+        :param indices: Iterable of vertex indices.
+        """
+        indices = np.unique(np.asarray(indices, dtype=np.int64)).astype(np.int32)
+        if len(indices) and (indices[0] < 0 or indices[-1] >= self.n_vertices):
+            raise ValueError(f"Group '{name}' has indices outside [0, {self.n_vertices}).")
+        self._groups[name] = indices
+        self._masks.pop(name, None)
+
+    def __getitem__(self, name):
+        return self._groups[name]
+
+    def __contains__(self, name):
+        return name in self._groups
+
+    def __iter__(self):
+        return iter(self._groups)
+
+    def __len__(self):
+        return len(self._groups)
+
+    def items(self):
+        return self._groups.items()
+
+    def names(self):
+        return list(self._groups)
+
+    def mask(self, name):
+        """
+        Boolean mask over all vertices of a group.
+
+        :param name: Group name.
+        :return: Boolean array of shape (n_vertices,).
+        """
+        if name not in self._masks:
+            mask = np.zeros(self.n_vertices, dtype=bool)
+            mask[self._groups[name]] = True
+            self._masks[name] = mask
+        return self._masks[name]
+
+    def contains(self, name, vertices):
+        """
+        Membership of one or several vertices in a group.
+
+        :param name: Group name.
+        :param vertices: Vertex index or array of indices.
+        :return: Boolean (or boolean array).
+        """
+        return self.mask(name)[vertices]
+
+    def union(self, *names):
+        """
+        Sorted indices of the vertices in any of the groups.
+        """
+        return np.flatnonzero(np.logical_or.reduce([self.mask(name) for name in names])).astype(np.int32)
+
+    def intersection(self, *names):
+        """
+        Sorted indices of the vertices in all of the groups.
+        """
+        return np.flatnonzero(np.logical_and.reduce([self.mask(name) for name in names])).astype(np.int32)
+
+    def difference(self, name, *others):
+        """
+        Sorted indices of the vertices in the first group and in none of the others.
+        """
+        mask = self.mask(name).copy()
+        for other in others:
+            mask &= ~self.mask(other)
+        return np.flatnonzero(mask).astype(np.int32)
+
+    def to_dict(self):
+        """
+        Groups as plain lists of ints (the format of functions.load_csv).
+        """
+        return {name: indices.tolist() for name, indices in self._groups.items()}
+
+    def save(self, path):
+        """
+        Saves the registry as a binary .npz file (names, offsets and concatenated indices).
+
+        :param path: Output path.
+        """
+        lengths = [len(indices) for indices in self._groups.values()]
+        indices = np.concatenate(list(self._groups.values())) if self._groups else np.empty(0, dtype=np.int32)
+        np.savez(path, names=np.array(self.names(), dtype=str), offsets=np.cumsum([0] + lengths),
+                 indices=indices.astype(np.int32), n_vertices=np.array(self.n_vertices))
+
+    @classmethod
+    def load(cls, path):
+        """
+        Loads a registry saved with save().
+
+        :param path: Path of the .npz file.
+        :return: VertexGroupRegistry.
+        """
+        with np.load(path) as data:
+            registry = cls(n_vertices=int(data["n_vertices"]))
+            offsets = data["offsets"]
+            for position, name in enumerate(data["names"]):
+                # Los índices ya están ordenados y sin repetir
+                registry._groups[str(name)] = data["indices"][offsets[position]:offsets[position + 1]]
+        return registry
+
+    def save_csv(self, path):
+        """
+        Writes the groups as 'vertex_groups.csv': one column per group, shorter columns padded
+        with empty cells.
+
+        :param path: Output path.
+        """
+        columns = list(self._groups.values())
+        n_rows = max((len(indices) for indices in columns), default=0)
+        table = np.full((n_rows, len(columns)), "", dtype=object)
+        for position, indices in enumerate(columns):
+            table[:len(indices), position] = indices.astype(str)
+        with open(path, mode='w', newline='') as file:
+            writer = csv.writer(file)
+            writer.writerow(self.names())
+            writer.writerows(table.tolist())
+
+    @classmethod
+    def load_csv(cls, path, n_vertices=N_SMPLX_VERTICES):
+        """
+        Reads a 'vertex_groups.csv' file (one padded column per group).
+
+        :param path: Path of the CSV file.
+        :param n_vertices: Number of vertices of the mesh the indices refer to.
+        :return: VertexGroupRegistry.
+        """
+        with open(path, newline='') as file:
+            names = next(csv.reader(file))
+        table = np.genfromtxt(path, delimiter=",", skip_header=1, filling_values=-1, dtype=np.int64, ndmin=2)
+        table = table.reshape(-1, len(names))
+        return cls({name: column[column >= 0] for name, column in zip(names, table.T)}, n_vertices)
+
+
+def load_vertex_groups(path, n_vertices=N_SMPLX_VERTICES):
+    """
+    Loads vertex groups from a CSV or .npz file. For a CSV, a binary copy ('.npz' next to it)
+    is written on the first read and used while it is newer than the CSV.
+
+    :param path: Path of 'vertex_groups.csv' or of a binary registry.
+    :param n_vertices: Number of vertices of the mesh the indices refer to.
+    :return: VertexGroupRegistry.
+    """
+    if path.endswith(".npz"):
+        return VertexGroupRegistry.load(path)
+
+    binary_path = os.path.splitext(path)[0] + ".npz"
+    if os.path.exists(binary_path) and os.path.getmtime(binary_path) >= os.path.getmtime(path):
+        return VertexGroupRegistry.load(binary_path)
+
+    registry = VertexGroupRegistry.load_csv(path, n_vertices)
+    try:
+        registry.save(binary_path)
+    except OSError:
+        pass
+    return registry
@@ -1,47 +1,38 @@
-import pandas as pd
-import numpy as np
 import os
+from vertex_store import load_vertex_data, vertex_store_path, VERTICES_FILE
+from vertex_stats_accumulator import accumulate_vertices
+from alignment import align_vertices
 
-def analyze_vertex_data(csv_path):
+def analyze_vertex_data(csv_path, output_csv="leftarm_vertex_statistics.csv", batch_size=64, alignment=None):
     """
-    Load the CSV file, perform statistical analysis, and generate key visualizations.
+    Load the vertex data and compute the per-vertex statistics in batches.
+    Quartiles are exact (computed over blocks of vertices), as in pandas.DataFrame.describe.
+    With alignment='gpa' (or 'procrustes') the rigid misalignment between models is removed
+    first, so Std_Combined only reflects shape variation.
     """
-    # Verificar si el archivo existe
-    if not os.path.exists(csv_path):
-        print(f"Error: El archivo {csv_path} no existe.")
+    # Verificar si existe el CSV o su almacén binario (basta con el almacén)
+    store_file = os.path.join(vertex_store_path(csv_path), VERTICES_FILE)
+    if not os.path.exists(csv_path) and not os.path.exists(store_file):
+        print(f"Error: No existen {csv_path} ni su almacén binario.")
         return
 
-    # Cargar el CSV
-    df = pd.read_csv(csv_path)
+    # Cargar los vértices (el CSV se convierte a un almacén binario la primera vez)
+    vertices, manifest = load_vertex_data(csv_path)
+    vertices = align_vertices(vertices, alignment)
 
-    # Verificar que las columnas necesarias existen
-    required_columns = {"VertexIndex", "X", "Y", "Z"}
-    if not required_columns.issubset(df.columns):
-        print(f"Error: El CSV debe contener las columnas {required_columns}, pero tiene {df.columns}.")
-        return
-
-    # Convertir las columnas a valores numéricos
-    df[["X", "Y", "Z"]] = df[["X", "Y", "Z"]].apply(pd.to_numeric, errors='coerce')
-    df.dropna(inplace=True)
-
-    # Calcular estadísticas para cada coordenada
-    stats_summary = df.groupby("VertexIndex")[["X", "Y", "Z"]].describe()
-
-    # Calcular la desviación estándar combinada para cada vértice
-    stats_summary["Std_Combined"] = np.sqrt(
-        stats_summary[("X", "std")]**2 + stats_summary[("Y", "std")]**2 + stats_summary[("Z", "std")]**2
-    )
+    # Calcular estadísticas para cada coordenada y la desviación estándar combinada
+    accumulator = accumulate_vertices(vertices, batch_size=batch_size)
+    stats_summary = accumulator.to_dataframe()
 
     # Guardar estadísticas en CSV
-    output_csv = "leftarm_vertex_statistics.csv"
     stats_summary.to_csv(output_csv)
-    
+
     print("\nDataset Overview:")
-    print(df.head())
+    print(f"{vertices.shape[0]} models, {vertices.shape[1]} vertices")
     print("\nStatistical Summary:")
     print(stats_summary)
     print(f"\nStatistical summary saved to {output_csv}")
 
 # Llamar a la función
 csv_path = "leftarm_vertex_data.csv"
-analyze_vertex_data(csv_path)
\ No newline at end of file
+analyze_vertex_data(csv_path)
@@ -0,0 +1,244 @@
+import numpy as np
+import pandas as pd
+
+from obj_loader import load_obj_vertices
+
+# Cuantiles reportados por pandas.DataFrame.describe
+DEFAULT_QUANTILES = (0.25, 0.5, 0.75)
+
+# Valores (modelos x vértices) leídos por paso al calcular los cuantiles exactos
+QUANTILE_BATCH_VALUES = 1 << 22
+
+
+class P2Quantiles:
+    """
+    Streaming quantile estimator (P² algorithm, Jain & Chlamtac 1985) run in parallel
+    over many cells. Memory is constant: five markers per cell and quantile.
+    """
+
+    def __init__(self, n_cells, quantiles=DEFAULT_QUANTILES):
+        """
+        :param n_cells: Number of independent streams (e.g. vertices * 3 coordinates).
+        :param quantiles: Quantiles to estimate, in (0, 1).
+        """
+        self.quantiles = tuple(quantiles)
+        p = np.repeat(np.asarray(self.quantiles, dtype=np.float64), n_cells)
+        self.n_rows = len(p)
+        self.count = 0
+        self.heights = np.zeros((self.n_rows, 5))
+        self.positions = np.tile(np.arange(1.0, 6.0), (self.n_rows, 1))
+        self.desired = np.stack([np.ones_like(p), 1 + 2 * p, 1 + 4 * p, 3 + 2 * p, np.full_like(p, 5.0)], axis=1)
+        self.increments = np.stack([np.zeros_like(p), p / 2, p, (1 + p) / 2, np.ones_like(p)], axis=1)
+        self.n_cells = n_cells
+
+    def update(self, values):
+        """
+        Adds one observation to every cell.
+
+        :param values: Array of shape (n_cells,).
+        """
+        x = np.tile(np.asarray(values, dtype=np.float64).ravel(), len(self.quantiles))
+
+        # Las primeras cinco observaciones inicializan los marcadores
+        if self.count < 5:
+            self.heights[:, self.count] = x
+            self.count += 1
+            if self.count == 5:
+                self.heights.sort(axis=1)
+            return
+        self.count += 1
+
+        q = self.heights
+        n = self.positions
+        k = np.clip((x[:, None] >= q[:, 1:4]).sum(axis=1), 0, 3)
+        np.minimum(q[:, 0], x, out=q[:, 0])
+        np.maximum(q[:, 4], x, out=q[:, 4])
+        n += np.arange(5)[None, :] > k[:, None]
+        self.desired += self.increments
+
+        # Ajustar los marcadores centrales con interpolación parabólica (o lineal)
+        for i in range(1, 4):
+            d = self.desired[:, i] - n[:, i]
+            move = ((d >= 1) & (n[:, i + 1] - n[:, i] > 1)) | ((d <= -1) & (n[:, i - 1] - n[:, i] < -1))
+            if not move.any():
+                continue
+            d = np.sign(d[move])
+            qi, qp, qm = q[move, i], q[move, i + 1], q[move, i - 1]
+            ni, np_, nm = n[move, i], n[move, i + 1], n[move, i - 1]
+
+            parabolic = qi + d / (np_ - nm) * (
+                (ni - nm + d) * (qp - qi) / (np_ - ni) + (np_ - ni - d) * (qi - qm) / (ni - nm)
+            )
+            neighbour = np.where(d > 0, qp, qm)
+            neighbour_n = np.where(d > 0, np_, nm)
+            linear = qi + d * (neighbour - qi) / (neighbour_n - ni)
+            q[move, i] = np.where((qm < parabolic) & (parabolic < qp), parabolic, linear)
+            n[move, i] += d
+
+    def result(self):
+        """
+        Returns the current estimates.
+
+        :return: Array of shape (n_quantiles, n_cells).
+        """
+        if self.count >= 5:
+            estimates = self.heights[:, 2]
+        else:
+            # Con menos de cinco muestras se interpola exactamente como pandas
+            samples = np.sort(self.heights[:, :self.count], axis=1)
+            p = np.repeat(np.asarray(self.quantiles), self.n_cells)
+            estimates = np.array([np.quantile(row, quantile) for row, quantile in zip(samples, p)]) \
+                if self.count else np.full(self.n_rows, np.nan)
+        return estimates.reshape(len(self.quantiles), self.n_cells)
+
+
+class VertexStatsAccumulator:
+    """
+    One-pass per-vertex statistics (count, mean, std, min, max and optional quantiles)
+    that consumes models one at a time or in batches with constant memory.
+    """
+
+    def __init__(self, n_vertices, quantiles=None):
+        """
+        :param n_vertices: Number of vertices of every model.
+        :param quantiles: Quantiles to estimate with P² sketches (approximate), or None to skip them.
+        """
+        self.n_vertices = n_vertices
+        self.count = 0
+        self.mean = np.zeros((n_vertices, 3))
+        self.m2 = np.zeros((n_vertices, 3))
+        self.min = np.full((n_vertices, 3), np.inf)
+        self.max = np.full((n_vertices, 3), -np.inf)
+        self.sketch = P2Quantiles(n_vertices * 3, quantiles) if quantiles else None
+        self.exact_quantiles = None
+
+    def update(self, vertices):
+        """
+        Adds one model of shape (N_vertices, 3) or a batch of shape (N_models, N_vertices, 3).
+
+        :param vertices: Vertex coordinates.
+        """
+        batch = np.asarray(vertices, dtype=np.float64)
+        if batch.ndim == 2:
+            batch = batch[None]
+        if batch.shape[1:] != (self.n_vertices, 3):
+            raise ValueError(f"Expected models of shape ({self.n_vertices}, 3), got {batch.shape[1:]}")
+
+        # Combinar media y M2 del lote con las acumuladas (Chan et al.)
+        n_batch = batch.shape[0]
+        batch_mean = batch.mean(axis=0)
+        batch_m2 = ((batch - batch_mean) ** 2).sum(axis=0)
+        total = self.count + n_batch
+        delta = batch_mean - self.mean
+        self.mean += delta * n_batch / total
+        self.m2 += batch_m2 + delta ** 2 * self.count * n_batch / total
+        self.count = total
+
+        np.minimum(self.min, batch.min(axis=0), out=self.min)
+        np.maximum(self.max, batch.max(axis=0), out=self.max)
+
+        if self.sketch is not None:
+            for model in batch:
+                self.sketch.update(model)
+
+    def set_exact_quantiles(self, quantiles, values):
+        """
+        Reports exact quantiles (see vertex_quantiles) instead of the sketch estimates.
+
+        :param quantiles: Quantile levels, in (0, 1).
+        :param values: Array of shape (n_quantiles, N_vertices, 3).
+        """
+        self.exact_quantiles = (tuple(quantiles), np.asarray(values))
+
+    @property
+    def std(self):
+        """Sample standard deviation (ddof=1), as pandas computes it."""
+        if self.count < 2:
+            return np.full_like(self.mean, np.nan)
+        return np.sqrt(self.m2 / (self.count - 1))
+
+    def to_dataframe(self):
+        """
+        Builds the statistics table with the columns of 'leftarm_vertex_statistics.csv':
+        (axis, statistic) column pairs plus Std_Combined, indexed by VertexIndex.
+
+        :return: DataFrame with one row per vertex.
+        """
+        std = self.std
+        levels, quantiles = (), None
+        if self.exact_quantiles is not None:
+            levels, quantiles = self.exact_quantiles
+        elif self.sketch is not None:
+            levels = self.sketch.quantiles
+            quantiles = self.sketch.result().reshape(len(levels), self.n_vertices, 3)
+
+        columns = {}
+        for axis_index, axis in enumerate("XYZ"):
+            columns[(axis, "count")] = np.full(self.n_vertices, float(self.count))
+            columns[(axis, "mean")] = self.mean[:, axis_index]
+            columns[(axis, "std")] = std[:, axis_index]
+            columns[(axis, "min")] = self.min[:, axis_index]
+            if quantiles is not None:
+                for position, quantile in enumerate(levels):
+                    columns[(axis, f"{quantile * 100:g}%")] = quantiles[position, :, axis_index]
+            columns[(axis, "max")] = self.max[:, axis_index]
+
+        stats = pd.DataFrame(columns, index=pd.RangeIndex(self.n_vertices, name="VertexIndex"))
+        stats["Std_Combined"] = np.sqrt((std ** 2).sum(axis=1))
+        return stats
+
+
+def accumulate_obj_files(file_paths, quantiles=None):
+    """
+    Computes the per-vertex statistics reading the OBJ files one at a time, with constant memory.
+    Quantiles are only available here as P² estimates, so they are opt-in.
+
+    :param file_paths: List of OBJ paths with the same number of vertices.
+    :param quantiles: Quantiles to estimate with P² sketches, or None to skip them.
+    :return: VertexStatsAccumulator with every model added.
+    """
+    accumulator = None
+    for file_path in file_paths:
+        vertices = load_obj_vertices(file_path)
+        if accumulator is None:
+            accumulator = VertexStatsAccumulator(len(vertices), quantiles)
+        accumulator.update(vertices)
+    return accumulator
+
+
+def vertex_quantiles(vertices, quantiles=DEFAULT_QUANTILES, batch_values=QUANTILE_BATCH_VALUES):
+    """
+    Exact per-vertex quantiles (linear interpolation, as pandas.DataFrame.describe) of a
+    (possibly memory-mapped) vertex tensor, computed over blocks of vertices so that only
+    N_models x block values are in memory at a time.
+
+    :param vertices: Array of shape (N_models, N_vertices, 3).
+    :param quantiles: Quantiles to compute, in (0, 1).
+    :param batch_values: Approximate number of models x vertices read per step.
+    :return: Array of shape (n_quantiles, N_vertices, 3).
+    """
+    n_models, n_vertices = vertices.shape[:2]
+    step = max(1, batch_values // max(n_models, 1))
+    result = np.empty((len(quantiles), n_vertices, 3))
+    for start in range(0, n_vertices, step):
+        block = np.asarray(vertices[:, start:start + step], dtype=np.float64)
+        result[:, start:start + step] = np.quantile(block, quantiles, axis=0)
+    return result
+
+
+def accumulate_vertices(vertices, batch_size=64, quantiles=DEFAULT_QUANTILES):
+    """
+    Computes the per-vertex statistics of a (possibly memory-mapped) vertex tensor in batches
+    of models. The whole tensor is available, so the quantiles are exact (see vertex_quantiles).
+
+    :param vertices: Array of shape (N_models, N_vertices, 3).
+    :param batch_size: Number of models read per step.
+    :param quantiles: Quantiles to compute, or None to skip them.
+    :return: VertexStatsAccumulator with every model added.
+    """
+    accumulator = VertexStatsAccumulator(vertices.shape[1])
+    for start in range(0, vertices.shape[0], batch_size):
+        accumulator.update(vertices[start:start + batch_size])
+    if quantiles:
+        accumulator.set_exact_quantiles(quantiles, vertex_quantiles(vertices, quantiles))
+    return accumulator
@@ -0,0 +1,191 @@
+import os
+import numpy as np
+import pandas as pd
+
+from obj_loader import load_obj_directory, model_sort_key, models_directory
+
+# Nombres de los archivos dentro de un almacén de vértices
+VERTICES_FILE = "vertices.npy"
+MANIFEST_FILE = "manifest.csv"
+
+
+def vertex_store_path(csv_path):
+    """
+    Directory of the binary store of a long-format CSV: the CSV path without its extension
+    (e.g. 'leftarm_vertex_data.csv' -> 'leftarm_vertex_data').
+
+    :param csv_path: Path to the long-format CSV.
+    :return: Path of the store directory.
+    """
+    return os.path.splitext(csv_path)[0]
+
+
+def find_metadata(obj_directory):
+    """
+    Returns the model_metadata.csv of a segment directory: its own, or the one shared by all
+    segments in the parent directory (layout written by models_generator).
+
+    :param obj_directory: Directory with the '*_model_*.obj' files of a segment.
+    :return: Path to the metadata file (the segment's own path if neither exists).
+    """
+    own = os.path.join(obj_directory, "model_metadata.csv")
+    shared = os.path.join(os.path.dirname(os.path.abspath(obj_directory)), "model_metadata.csv")
+    if not os.path.exists(own) and os.path.exists(shared):
+        return shared
+    return own
+
+
+def build_manifest(names, metadata_path=None):
+    """
+    Builds the per-model manifest (object name, gender, index and betas).
+
+    :param names: List of model names, e.g. 'female_model_12'.
+    :param metadata_path: Optional path to the 'model_metadata.csv' written by the generator.
+    :return: DataFrame with one row per model, in the same order as names.
+    """
+    keys = [model_sort_key(name) for name in names]
+    manifest = pd.DataFrame({
+        "ObjectName": names,
+        "gender": [gender if index >= 0 else "" for gender, index in keys],
+        "index": [index for _, index in keys],
+    })
+
+    if metadata_path and os.path.exists(metadata_path):
+        # Un modelo regenerado puede tener varias filas; vale la última
+        metadata = pd.read_csv(metadata_path).drop_duplicates(["index", "gender"], keep="last")
+        manifest = manifest.merge(metadata, on=["index", "gender"], how="left")
+
+    return manifest
+
+
+def save_vertex_store(store_path, vertices, names, manifest=None, dtype=np.float32):
+    """
+    Saves a vertex tensor as a binary store: a .npy array plus a CSV manifest.
+    float32 is exact for coordinates read from OBJ files (the loader already returns float32);
+    stores converted from a CSV keep float64 so the tables computed from them keep the CSV digits.
+
+    :param store_path: Directory of the store (created if missing).
+    :param vertices: Array of shape (N_models, N_vertices, 3).
+    :param names: List of model names (one per row of vertices).
+    :param manifest: Optional DataFrame with per-model metadata, built from names if None.
+    :param dtype: Type of the stored coordinates.
+    """
+    vertices = np.ascontiguousarray(vertices, dtype=dtype)
+    if vertices.ndim != 3 or vertices.shape[2] != 3:
+        raise ValueError(f"Expected an array of shape (models, vertices, 3), got {vertices.shape}")
+    if len(names) != vertices.shape[0]:
+        raise ValueError(f"Got {len(names)} names for {vertices.shape[0]} models")
+
+    if manifest is None:
+        manifest = build_manifest(names)
+
+    os.makedirs(store_path, exist_ok=True)
+    np.save(os.path.join(store_path, VERTICES_FILE), vertices)
+    manifest.to_csv(os.path.join(store_path, MANIFEST_FILE), index=False)
+    print(f"Vertex store saved at {store_path} ({vertices.shape[0]} models, {vertices.shape[1]} vertices)")
+
+
+def load_vertex_store(store_path, mmap=True):
+    """
+    Opens a vertex store. With mmap=True the tensor is memory-mapped (zero-copy, read-only).
+
+    :param store_path: Directory of the store.
+    :param mmap: Whether to memory-map the vertex tensor instead of reading it into memory.
+    :return: Tuple (vertices, manifest).
+    """
+    vertices = np.load(os.path.join(store_path, VERTICES_FILE), mmap_mode="r" if mmap else None)
+    manifest = pd.read_csv(os.path.join(store_path, MANIFEST_FILE), keep_default_na=False)
+    return vertices, manifest
+
+
+def build_vertex_store_from_obj(obj_directory, store_path, metadata_path=None):
+    """
+    Loads every model OBJ of a segment directory and saves it as a vertex store.
+
+    :param obj_directory: Directory with the '*_model_*.obj' files.
+    :param store_path: Directory of the store.
+    :param metadata_path: Path to 'model_metadata.csv'. Defaults to the one of obj_directory (see find_metadata).
+    :return: Tuple (vertices, manifest).
+    """
+    if metadata_path is None:
+        metadata_path = find_metadata(obj_directory)
+    vertices, names = load_obj_directory(obj_directory)
+    manifest = build_manifest(names, metadata_path)
+    save_vertex_store(store_path, vertices, names, manifest)
+    return vertices, manifest
+
+
+def long_dataframe_to_vertices(df):
+    """
+    Converts a long-format vertex table (ObjectName, VertexIndex, X, Y, Z) to a tensor.
+
+    :param df: DataFrame as written by vertex_data.py.
+    :return: Tuple (vertices of shape (N_models, N_vertices, 3), list of object names).
+    """
+    # Conservar el orden de aparición de los objetos
+    names = df["ObjectName"].unique().tolist()
+    codes = pd.Categorical(df["ObjectName"], categories=names).codes
+    vertex_index = df["VertexIndex"].to_numpy()
+    order = np.lexsort((vertex_index, codes))
+    n_vertices = df["VertexIndex"].nunique()
+
+    # Cada objeto debe tener exactamente los mismos índices de vértice, sin repeticiones
+    counts = np.bincount(codes, minlength=len(names))
+    ragged = np.flatnonzero(counts != n_vertices)
+    if len(ragged) == 0:
+        indices = vertex_index[order].reshape(len(names), n_vertices)
+        ragged = np.flatnonzero((indices != indices[0]).any(axis=1) | (np.diff(indices, axis=1) == 0).any(axis=1))
+    if len(ragged):
+        raise ValueError(f"Every object must contain the same set of {n_vertices} vertex indices; "
+                         f"{len(ragged)} do not (e.g. {names[ragged[0]]})")
+
+    coordinates = df[["X", "Y", "Z"]].to_numpy(dtype=np.float64)[order]
+    vertices = coordinates.reshape(len(names), n_vertices, 3)
+    return vertices, names
+
+
+def vertices_to_long_dataframe(vertices, names):
+    """
+    Converts a vertex tensor back to the long format (ObjectName, VertexIndex, X, Y, Z).
+
+    :param vertices: Array of shape (N_models, N_vertices, 3).
+    :param names: List of model names.
+    :return: DataFrame with one row per model and vertex.
+    """
+    n_models, n_vertices, _ = vertices.shape
+    flat = np.asarray(vertices).reshape(-1, 3)
+    return pd.DataFrame({
+        "ObjectName": np.repeat(np.asarray(names, dtype=object), n_vertices),
+        "VertexIndex": np.tile(np.arange(n_vertices), n_models),
+        "X": flat[:, 0],
+        "Y": flat[:, 1],
+        "Z": flat[:, 2],
+    })
+
+
+def load_vertex_data(csv_path, store_path=None):
+    """
+    Loads the vertex tensor for a long-format CSV, converting the CSV to a binary
+    store the first time so later runs skip the text parsing.
+
+    :param csv_path: Path to the long-format CSV (e.g. 'leftarm_vertex_data.csv').
+    :param store_path: Directory of the store. Defaults to vertex_store_path(csv_path).
+    :return: Tuple (vertices, manifest).
+    """
+    if store_path is None:
+        store_path = vertex_store_path(csv_path)
+
+    store_file = os.path.join(store_path, VERTICES_FILE)
+    csv_is_newer = os.path.exists(csv_path) and os.path.exists(store_file) and \
+        os.path.getmtime(csv_path) > os.path.getmtime(store_file)
+    if not os.path.exists(store_file) or csv_is_newer:
+        vertices, names = long_dataframe_to_vertices(pd.read_csv(csv_path))
+        save_vertex_store(store_path, vertices, names, dtype=np.float64)
+
+    return load_vertex_store(store_path)
+
+
+if __name__ == "__main__":
+    # Convertir los OBJ de cada segmento al almacén binario que load_vertex_data busca para su CSV
+    build_vertex_store_from_obj(os.path.join(models_directory, "arm"), vertex_store_path("leftarm_vertex_data.csv"))
+    build_vertex_store_from_obj(os.path.join(models_directory, "leg"), vertex_store_path("leg_vertex_data.csv"))